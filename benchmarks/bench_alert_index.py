@@ -0,0 +1,65 @@
+"""Evaluation cost of one price tick as the number of alerts grows.
+
+Compares the sorted AlertIndex against the previous linear scan over every alert.
+
+    poetry run python benchmarks/bench_alert_index.py
+"""
+
+import random
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from alert_index import AlertIndex  # noqa: E402
+from models import Alert  # noqa: E402
+
+SYMBOLS = [f"C{i}" for i in range(20)]
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+TICKS = 200
+
+
+def build(size: int) -> tuple[AlertIndex, list[tuple[int, Alert]]]:
+    rng = random.Random(size)
+    entries = []
+    for user_id in range(size):
+        direction = rng.choice(("above", "below"))
+        # Thresholds sit 5-50% away from the reference price of 100
+        offset = rng.uniform(5, 50)
+        target = 100 + offset if direction == "above" else 100 - offset
+        entries.append((user_id, Alert(rng.choice(SYMBOLS), direction, target)))
+    index = AlertIndex()
+    index.add_many(entries)
+    return index, entries
+
+
+def time_per_tick(func: Callable[[dict[str, float]], int], prices: list[dict[str, float]]) -> float:
+    start = time.perf_counter()
+    for snapshot in prices:
+        func(snapshot)
+    return (time.perf_counter() - start) / len(prices)
+
+
+def main() -> None:
+    rng = random.Random(0)
+    prices = [{symbol: rng.uniform(96, 104) for symbol in SYMBOLS} for _ in range(TICKS)]
+
+    print(f"{'alerts':>10} {'index us/tick':>14} {'scan us/tick':>14}")
+    for size in SIZES:
+        index, entries = build(size)
+
+        def indexed(snapshot: dict[str, float], index: AlertIndex = index) -> int:
+            return sum(len(index.fired(symbol, price)) for symbol, price in snapshot.items())
+
+        def scan(snapshot: dict[str, float], entries: list[tuple[int, Alert]] = entries) -> int:
+            return sum(1 for _, alert in entries if alert.matches(snapshot[alert.crypto]))
+
+        indexed_cost = time_per_tick(indexed, prices) * 1e6
+        scan_cost = time_per_tick(scan, prices[:5]) * 1e6
+        print(f"{size:>10} {indexed_cost:>14.1f} {scan_cost:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
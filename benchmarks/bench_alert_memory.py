@@ -0,0 +1,91 @@
+"""Resident memory per alert, before and after the compact Alert representation.
+
+"Before" is the previous plain dataclass (a __dict__ and its own symbol/direction strings
+per instance) held in an index of float lists and (user_id, alert) tuples. "After" is the
+slotted, interned Alert in the array-backed AlertIndex. Symbols are built per alert, as
+they are when parsed from a command.
+
+    poetry run python benchmarks/bench_alert_memory.py
+"""
+
+import gc
+import random
+import sys
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from alert_index import AlertIndex  # noqa: E402
+from models import Alert  # noqa: E402
+
+SYMBOLS = [f"c{i}" for i in range(20)]
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+@dataclass
+class LegacyAlert:
+    crypto: str
+    direction: str
+    target_price: float
+    alert_id: int = 0
+
+
+def rows(size: int) -> list[tuple[str, str, float]]:
+    rng = random.Random(size)
+    return [
+        (rng.choice(SYMBOLS), rng.choice(("above", "below")), rng.uniform(50, 150))
+        for _ in range(size)
+    ]
+
+
+def legacy(data: list[tuple[str, str, float]]) -> Any:
+    alerts = [
+        LegacyAlert(symbol.upper(), "".join(direction), target, alert_id)
+        for alert_id, (symbol, direction, target) in enumerate(data, 1)
+    ]
+    index: dict[tuple[str, str], tuple[list[float], list[tuple[int, LegacyAlert]]]] = {}
+    for user_id, alert in enumerate(alerts):
+        index.setdefault((alert.crypto, alert.direction), ([], []))[1].append((user_id, alert))
+    for targets, entries in index.values():
+        entries.sort(key=lambda entry: entry[1].target_price)
+        targets.extend(alert.target_price for _, alert in entries)
+    return alerts, index
+
+
+def compact(data: list[tuple[str, str, float]]) -> Any:
+    alerts = [
+        Alert(symbol.upper(), "".join(direction), target, alert_id)  # type: ignore[arg-type]
+        for alert_id, (symbol, direction, target) in enumerate(data, 1)
+    ]
+    index = AlertIndex()
+    index.add_many(enumerate(alerts))
+    return alerts, index
+
+
+def bytes_per_alert(build: Callable[[list[tuple[str, str, float]]], Any], size: int) -> float:
+    data = rows(size)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build(data)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del built
+    return used / size
+
+
+def main() -> None:
+    print(f"{'alerts':>10} {'before B/alert':>15} {'after B/alert':>14} {'saved':>7}")
+    for size in SIZES:
+        before = bytes_per_alert(legacy, size)
+        after = bytes_per_alert(compact, size)
+        print(f"{size:>10} {before:>15.1f} {after:>14.1f} {1 - after / before:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""End-to-end load test of the real bot against local Binance and Telegram stand-ins.
+
+Builds the Application from bot.build_application(), points it at FakeBinance (REST and
+websocket) and FakeTelegram, and lets synthetic users run /price, /addalert and /plot,
+each waiting for its reply before the next command. Prices then sweep up and down so every
+alert fires. Reported: command throughput, p50/p99 reply latency per command, the delay
+from the first crossing tick to the alert notification, and resident memory. The result
+is printed as JSON and, with --output, appended as one line to a JSON lines file so runs
+can be compared over time.
+
+    poetry run python benchmarks/bench_load.py [--users 50] [--output results.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from fake_services import FakeBinance, FakeTelegram  # noqa: E402
+
+TOKEN = "123456:BENCH"
+SYMBOLS = {"BTC": 60000.0, "ETH": 3000.0, "SOL": 150.0, "ADA": 0.5, "XRP": 0.6, "DOT": 7.0}
+ALERT_LINE = re.compile(r"Alert: (\w+) is now (above|below) €([\d.]+)")
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def summary_ms(values: list[float]) -> dict[str, Any]:
+    p50, p99 = percentile(values, 0.5), percentile(values, 0.99)
+    return {
+        "count": len(values),
+        "p50_ms": None if p50 is None else round(p50 * 1000, 2),
+        "p99_ms": None if p99 is None else round(p99 * 1000, 2),
+    }
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm", encoding="utf-8") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+class User:
+    def __init__(self, user_id: int, telegram: FakeTelegram, binance: FakeBinance) -> None:
+        self.user_id = user_id
+        self.telegram = telegram
+        self.binance = binance
+        self.rng = random.Random(user_id)
+        self.latencies: dict[str, list[float]] = {}
+        self.alerts: list[tuple[str, str, float, float]] = []  # symbol, direction, target, set at
+        self.failures = 0
+
+    async def command(self, text: str, timeout: float) -> str | None:
+        started = time.monotonic()
+        self.telegram.push_command(self.user_id, text)
+        try:
+            reply = await self.telegram.next_reply(self.user_id, timeout)
+        except TimeoutError:
+            self.failures += 1
+            return None
+        name = text.split()[0].lstrip("/")
+        self.latencies.setdefault(name, []).append(reply.at - started)
+        return reply.text
+
+    async def run(self, alerts: int, think: float, timeout: float) -> None:
+        symbols = list(SYMBOLS)
+        await self.command(f"/price {self.rng.choice(symbols)}", timeout)
+        for _ in range(alerts):
+            await asyncio.sleep(self.rng.uniform(0, think))
+            symbol = self.rng.choice(symbols)
+            direction = self.rng.choice(("above", "below"))
+            # Within half a percent of the current price, so the sweep crosses every target
+            offset = self.rng.uniform(0.001, 0.005)
+            current = self.binance.prices[symbol]
+            target = float(f"{current * (1 + offset if direction == 'above' else 1 - offset):.6g}")
+            reply = await self.command(f"/addalert {symbol} {direction} {target}", timeout)
+            if reply and reply.startswith("Alert #"):
+                self.alerts.append((symbol, direction, target, time.monotonic()))
+        await asyncio.sleep(self.rng.uniform(0, think))
+        await self.command(f"/price {' '.join(self.rng.sample(symbols, 3))}", timeout)
+        await asyncio.sleep(self.rng.uniform(0, think))
+        await self.command(f"/plot {self.rng.choice(symbols)}", timeout)
+
+
+def first_crossing(
+    ticks: list[tuple[float, float]], direction: str, target: float, since: float
+) -> float | None:
+    for at, price in ticks:
+        if at < since:
+            continue
+        if (direction == "above" and price >= target) or (direction == "below" and price <= target):
+            return at
+    return None
+
+
+async def sweep(binance: FakeBinance, seconds: float) -> None:
+    # Up by ~3%, then down by ~6%, then back: wide enough to cross every target even after
+    # the random walk drifted during the command phase
+    steps = max(1, int(seconds / 4 / binance.tick_interval))
+    for trend in (0.03, -0.06, 0.03):
+        binance.trend = trend / steps
+        await asyncio.sleep(steps * binance.tick_interval)
+    binance.trend = 0.0
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    logging.basicConfig(level=logging.WARNING)
+    binance = FakeBinance(SYMBOLS)
+    telegram = FakeTelegram(TOKEN)
+    await binance.start()
+    await telegram.start()
+
+    # Configuration is read from the environment at import time
+    settings = {
+        "BINANCE_API_URL": binance.url,
+        "BINANCE_WS_URL": binance.ws_url,
+        "ALERT_STORE": "memory",
+        "CANDLE_STORE_PATH": ":memory:",
+        "METRICS_PORT": "0",
+        "SYMBOLS_SNAPSHOT_PATH": "",
+    }
+    os.environ.update(settings)
+    import config
+    from bot import build_application
+
+    overridden = [name for name, value in settings.items() if str(getattr(config, name)) != value]
+    if overridden:
+        raise SystemExit(f"Unset {', '.join(overridden)} in .env before running the load test")
+
+    rss_start = rss_mb()
+    application = build_application(TOKEN, base_url=telegram.base_url)
+    await application.initialize()
+    assert application.post_init is not None and application.updater is not None
+    await application.post_init(application)
+    await application.updater.start_polling(poll_interval=0.0)
+    await application.start()
+
+    try:
+        users = [User(1000 + index, telegram, binance) for index in range(args.users)]
+        started = time.monotonic()
+        await asyncio.gather(*(user.run(args.alerts, args.think, args.timeout) for user in users))
+        command_seconds = time.monotonic() - started
+
+        await sweep(binance, args.sweep)
+        # Give notifications still in the send queue time to arrive
+        expected = sum(len(user.alerts) for user in users)
+        deadline = time.monotonic() + args.timeout
+        while time.monotonic() < deadline and telegram.alert_lines() < expected:
+            await asyncio.sleep(0.1)
+        rss_end = rss_mb()
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        if application.post_shutdown is not None:
+            await application.post_shutdown(application)
+        await application.shutdown()
+        await telegram.close()
+        await binance.close()
+
+    # Match each notification line to the alert it reports and its first crossing tick
+    pending: dict[tuple[int, str, str, float], float] = {}
+    for user in users:
+        for symbol, direction, target, set_at in user.alerts:
+            pending[(user.user_id, symbol, direction, target)] = set_at
+    delays = []
+    for message in telegram.alerts:
+        for line in message.text.splitlines():
+            match = ALERT_LINE.match(line)
+            if match is None:
+                continue
+            symbol, direction, target = match[1], match[2], float(match[3])
+            set_at = pending.pop((message.chat_id, symbol, direction, target), None)
+            if set_at is None:
+                continue
+            crossed = first_crossing(binance.ticks[symbol], direction, target, set_at)
+            if crossed is not None:
+                delays.append(message.at - crossed)
+
+    latencies = [value for user in users for values in user.latencies.values() for value in values]
+    by_command: dict[str, list[float]] = {}
+    for user in users:
+        for name, values in user.latencies.items():
+            by_command.setdefault(name, []).extend(values)
+
+    return {
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "config": vars(args),
+        "commands": {
+            **summary_ms(latencies),
+            "failed": sum(user.failures for user in users),
+            "seconds": round(command_seconds, 2),
+            "per_second": round(len(latencies) / command_seconds, 2),
+            "by_command": {name: summary_ms(values) for name, values in sorted(by_command.items())},
+        },
+        "alerts": {
+            "set": expected,
+            "notified": expected - len(pending),
+            "delay": summary_ms(delays),
+        },
+        "telegram_messages": len(telegram.sent),
+        "binance_requests": binance.requests,
+        "memory": {
+            "rss_start_mb": round(rss_start, 1),
+            "rss_end_mb": round(rss_end, 1),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--alerts", type=int, default=3, help="alerts set per user")
+    parser.add_argument("--think", type=float, default=2.0, help="max seconds between commands")
+    parser.add_argument("--sweep", type=float, default=8.0, help="seconds of price sweep")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait per reply")
+    parser.add_argument("--output", help="append the result as a JSON line to this file")
+    result = asyncio.run(main(parser.parse_args()))
+    print(json.dumps(result, indent=2))
+    if result["config"]["output"]:
+        with open(result["config"]["output"], "a", encoding="utf-8") as output:
+            output.write(json.dumps(result) + "\n")
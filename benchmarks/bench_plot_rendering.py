@@ -0,0 +1,74 @@
+"""Event-loop latency while N /plot charts render concurrently.
+
+A probe task sleeps 5 ms in a loop and records how late it wakes up. Rendering inline (the
+old pyplot path) stalls the loop for the whole chart; the thread and process pools should
+keep the lag flat as N grows.
+
+    poetry run python benchmarks/bench_plot_rendering.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from collections.abc import Awaitable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from charts import ChartRenderer, render_price_chart  # noqa: E402
+
+PRICES = [100 + (i % 7) * 1.5 for i in range(30)]
+PROBE_INTERVAL = 0.005
+CONCURRENCY = [1, 4, 16]
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def inline(count: int) -> None:
+    for index in range(count):
+        render_price_chart(f"C{index}", PRICES)
+        await asyncio.sleep(0)
+
+
+async def pooled(renderer: ChartRenderer, count: int) -> None:
+    await asyncio.gather(*(renderer.render(f"C{index}", PRICES) for index in range(count)))
+
+
+async def measure(name: str, count: int, work: Awaitable[None]) -> None:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    await work
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"{name:>8} {count:>4} {elapsed:>9.2f}s {statistics.median(lags_ms):>9.1f} "
+        f"{p99:>9.1f} {lags_ms[-1]:>9.1f}"
+    )
+
+
+async def main() -> None:
+    print(f"{'mode':>8} {'N':>4} {'total':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for count in CONCURRENCY:
+        await measure("inline", count, inline(count))
+    for mode in ("thread", "process"):
+        renderer = ChartRenderer(mode=mode, workers=2, queue_size=max(CONCURRENCY))
+        # Warm the workers up so start-up cost is not counted
+        await pooled(renderer, 2)
+        for count in CONCURRENCY:
+            await measure(mode, count, pooled(renderer, count))
+        renderer.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
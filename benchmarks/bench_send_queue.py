@@ -0,0 +1,81 @@
+"""Load test of the outbound send queue against a fake Bot enforcing Telegram's limits.
+
+The fake Bot raises RetryAfter whenever more than 30 messages go out in any second, or a
+chat gets a second message within a second, like the Bot API does. A burst of alerts (two
+per chat, as when BTC moves) plus command replies is pushed through the queue and the
+sustained sendMessage rate, merges, retries and drops are reported.
+
+    poetry run python benchmarks/bench_send_queue.py [chats]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from sender import PRIORITY_ALERT, PRIORITY_REPLY, SendQueue  # noqa: E402
+from telegram.error import RetryAfter  # noqa: E402
+
+GLOBAL_LIMIT = 30  # messages per second
+CHAT_INTERVAL = 1.0  # seconds between messages to one chat
+LATENCY = 0.05  # seconds per Bot API call
+
+
+class LimitedBot:
+    def __init__(self) -> None:
+        self.recent: deque[float] = deque()
+        self.last_per_chat: dict[int, float] = {}
+        self.delivered = 0
+        self.rejected = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        await asyncio.sleep(LATENCY)
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] >= 1.0:
+            self.recent.popleft()
+        if (
+            len(self.recent) >= GLOBAL_LIMIT
+            or now - self.last_per_chat.get(chat_id, float("-inf")) < CHAT_INTERVAL
+        ):
+            self.rejected += 1
+            raise RetryAfter(1)
+        self.recent.append(now)
+        self.last_per_chat[chat_id] = now
+        self.delivered += 1
+
+
+async def main(chats: int) -> None:
+    logging.disable(logging.WARNING)
+    bot = LimitedBot()
+    # A small safety margin under the hard limits absorbs timer jitter
+    queue = SendQueue(bot, global_rate=GLOBAL_LIMIT * 0.95, chat_rate=0.95, chat_burst=1)  # type: ignore[arg-type]
+    queue.start()
+
+    start = time.monotonic()
+    futures = []
+    for chat_id in range(chats):
+        futures.append(queue.submit(chat_id, f"Alert: BTC crossed #{chat_id}", PRIORITY_ALERT))
+        futures.append(queue.submit(chat_id, f"Alert #{chat_id} has been removed.", PRIORITY_ALERT))
+    for chat_id in range(0, chats, 10):
+        futures.append(queue.submit(chat_id, "The current price of BTC is €51000", PRIORITY_REPLY))
+    results = await asyncio.gather(*futures)
+    elapsed = time.monotonic() - start
+    await queue.stop()
+
+    dropped = sum(1 for result in results if result != "Message sent successfully")
+    print(f"logical messages   {len(futures)}")
+    print(f"sendMessage calls  {bot.delivered}")
+    print(f"merged             {queue.merged}")
+    print(f"RetryAfter         {bot.rejected}")
+    print(f"dropped            {dropped}")
+    print(f"elapsed            {elapsed:.1f}s")
+    print(f"throughput         {bot.delivered / elapsed:.1f} calls/s (limit {GLOBAL_LIMIT})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
@@ -0,0 +1,137 @@
+"""Cold start: time from launching the bot process to its first handled update.
+
+Each run starts src/bot.py's Application in a fresh interpreter, pointed at local Binance
+and Telegram stand-ins that answer after --latency seconds, with --alerts alerts waiting in
+a SQLite store. A /start and a /listalerts are queued before the process launches; their
+reply times show how soon the bot serves commands and how soon alert commands (which wait
+for the restore) are answered, with FAST_START off and on.
+
+    poetry run python benchmarks/bench_startup.py [--runs 5] [--latency 0.1] [--alerts 50000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+if TYPE_CHECKING:
+    from fake_services import FakeTelegram
+
+TOKEN = "123456:BENCH"
+SETTINGS = (
+    "BINANCE_API_URL",
+    "BINANCE_WS_URL",
+    "ALERT_STORE",
+    "ALERT_STORE_PATH",
+    "METRICS_PORT",
+    "SYMBOLS_SNAPSHOT_PATH",
+)
+SYMBOLS = {"BTC": 60000.0, "ETH": 3000.0, "SOL": 150.0, "ADA": 0.5, "XRP": 0.6, "DOT": 7.0}
+
+
+# Runs in the launched process: everything from interpreter start on is being measured
+def serve(base_url: str) -> None:
+    import config
+    from bot import build_application
+
+    # Configuration is read from the environment at import time, where .env may override it
+    overridden = [name for name in SETTINGS if str(getattr(config, name)) != os.environ[name]]
+    if overridden:
+        raise SystemExit(f"Unset {', '.join(overridden)} in .env before running this benchmark")
+    build_application(TOKEN, base_url=base_url).run_polling()
+
+
+def seed_alerts(path: str, count: int) -> None:
+    from models import Alert, Direction
+    from store import SQLiteAlertStore
+
+    rng = random.Random(0)
+    store = SQLiteAlertStore(path)
+    for alert_id in range(1, count + 1):
+        symbol = rng.choice(list(SYMBOLS))
+        target = SYMBOLS[symbol] * rng.uniform(1.1, 2.0)
+        store.add(
+            100 + alert_id % 1000,
+            100 + alert_id % 1000,
+            Alert(symbol, Direction.ABOVE, target, alert_id),
+        )
+    store.close()
+
+
+async def run_once(
+    telegram: "FakeTelegram", env: dict[str, str], timeout: float
+) -> tuple[float, float]:
+    telegram.push_command(1, "/start")
+    telegram.push_command(2, "/listalerts")
+    started = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, __file__, "--serve", telegram.base_url, env=env
+    )
+    try:
+        first = await telegram.next_reply(1, timeout)
+        alerts = await telegram.next_reply(2, timeout)
+    finally:
+        process.terminate()
+        await process.wait()
+    return first.at - started, alerts.at - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    from fake_services import FakeBinance, FakeTelegram
+
+    binance = FakeBinance(SYMBOLS, latency=args.latency)
+    telegram = FakeTelegram(TOKEN, latency=args.latency)
+    await binance.start()
+    await telegram.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store_path = os.path.join(directory, "alerts.db")
+        await asyncio.to_thread(seed_alerts, store_path, args.alerts)
+        env = {
+            **os.environ,
+            "BINANCE_API_URL": binance.url,
+            "BINANCE_WS_URL": binance.ws_url,
+            "ALERT_STORE": "sqlite",
+            "ALERT_STORE_PATH": store_path,
+            "CANDLE_STORE_PATH": ":memory:",
+            "METRICS_PORT": "0",
+            "SYMBOLS_SNAPSHOT_PATH": "",
+        }
+        print(f"{args.alerts} stored alerts, {args.latency * 1000:.0f} ms per API call")
+        print(f"{'FAST_START':>10} {'first reply':>12} {'/listalerts':>12}")
+        try:
+            for fast_start in ("false", "true"):
+                results = [
+                    await run_once(telegram, {**env, "FAST_START": fast_start}, args.timeout)
+                    for _ in range(args.runs)
+                ]
+                first = statistics.median(result[0] for result in results)
+                alerts = statistics.median(result[1] for result in results)
+                print(f"{fast_start:>10} {first * 1000:>10.0f}ms {alerts * 1000:>10.0f}ms")
+        finally:
+            await telegram.close()
+            await binance.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per API response")
+    parser.add_argument("--alerts", type=int, default=50_000, help="alerts in the store")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--serve", metavar="BASE_URL", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+    else:
+        asyncio.run(main(args))
@@ -0,0 +1,291 @@
+"""Local stand-ins for the Binance REST/websocket API and the Telegram Bot API.
+
+Both run on aiohttp test servers on ephemeral ports. FakeBinance publishes a simulated
+price path per symbol and remembers every tick it published; FakeTelegram feeds queued
+updates to getUpdates and records every message the bot sends, so the load harness can
+measure reply latency and alert delivery against the real Application.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import WSMsgType, web
+from aiohttp.test_utils import TestServer
+
+QUOTE = "EUR"
+INTERVAL_UNITS_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+# Delays every response by the server's latency, standing in for the network round trip
+@web.middleware
+async def _delay(request: web.Request, handler: Any) -> web.StreamResponse:
+    await asyncio.sleep(request.app["latency"])
+    return await handler(request)
+
+
+class FakeBinance:
+    def __init__(
+        self,
+        prices: dict[str, float],
+        tick_interval: float = 0.1,
+        volatility: float = 0.0005,
+        latency: float = 0.0,
+    ) -> None:
+        self.prices = dict(prices)
+        self.latency = latency
+        self.tick_interval = tick_interval
+        self.volatility = volatility
+        self.trend = 0.0  # drift per tick, as a fraction of the price
+        self.ticks: dict[str, list[tuple[float, float]]] = {s: [] for s in prices}  # (time, price)
+        self.requests = 0
+        self._sockets: dict[web.WebSocketResponse, set[str]] = {}
+        self._rng = random.Random(0)
+        self._task: asyncio.Task[None] | None = None
+        self.server = TestServer(self._make_app())
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+    @property
+    def ws_url(self) -> str:
+        return self.url.replace("http://", "ws://") + "/ws"
+
+    def _make_app(self) -> web.Application:
+        app = web.Application(middlewares=[_delay])
+        app["latency"] = self.latency
+        app.router.add_get("/api/v3/ticker/price", self._ticker_price)
+        app.router.add_get("/api/v3/klines", self._klines)
+        app.router.add_get("/api/v3/exchangeInfo", self._exchange_info)
+        app.router.add_get("/ws", self._websocket)
+        return app
+
+    async def start(self) -> None:
+        await self.server.start_server()
+        self._record(time.monotonic())
+        self._task = asyncio.create_task(self._simulate())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        for ws in list(self._sockets):
+            await ws.close()
+        await self.server.close()
+
+    def _record(self, now: float) -> None:
+        for symbol, price in self.prices.items():
+            self.ticks[symbol].append((now, price))
+
+    async def _simulate(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            for symbol, price in self.prices.items():
+                shock = self._rng.gauss(0.0, self.volatility)
+                self.prices[symbol] = price * math.exp(shock + self.trend)
+            self._record(time.monotonic())
+            for ws, streams in list(self._sockets.items()):
+                for symbol in streams:
+                    event = {"e": "24hrMiniTicker", "s": f"{symbol}{QUOTE}"}
+                    event["c"] = f"{self.prices[symbol]:.8f}"
+                    with contextlib.suppress(ConnectionError):
+                        await ws.send_json(event)
+
+    def _symbol(self, pair: str) -> str | None:
+        symbol = pair.removesuffix(QUOTE)
+        return symbol if pair.endswith(QUOTE) and symbol in self.prices else None
+
+    async def _ticker_price(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if "symbols" in request.query:
+            pairs = json.loads(request.query["symbols"])
+            symbols = [self._symbol(pair) for pair in pairs]
+            if None in symbols:
+                return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+            return web.json_response(
+                [{"symbol": f"{s}{QUOTE}", "price": f"{self.prices[s]:.8f}"} for s in symbols if s]
+            )
+        symbol = self._symbol(request.query["symbol"])
+        if symbol is None:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+        return web.json_response({"symbol": f"{symbol}{QUOTE}", "price": f"{self.prices[symbol]}"})
+
+    async def _klines(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        symbol = self._symbol(request.query["symbol"])
+        if symbol is None:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+        interval = request.query.get("interval", "1d")
+        step = int(interval[:-1]) * INTERVAL_UNITS_MS[interval[-1]]
+        limit = min(int(request.query.get("limit", "500")), 1000)
+        now = int(time.time() * 1000)
+        end = min(int(request.query.get("endTime", now)), now)
+        start = int(request.query.get("startTime", end - (limit - 1) * step))
+        candles = []
+        # Aligned candles whose closes wander around the current price, the same on every call
+        for open_time in range(-(-start // step) * step, end + 1, step)[:limit]:
+            rng = random.Random(f"{symbol}{open_time}")
+            close = f"{self.prices[symbol] * math.exp(rng.gauss(0.0, 0.05)):.8f}"
+            candles.append([open_time, close, close, close, close, "1", open_time + step - 1])
+        return web.json_response(candles)
+
+    async def _exchange_info(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        return web.json_response(
+            {
+                "symbols": [
+                    {"symbol": f"{s}{QUOTE}", "baseAsset": s, "quoteAsset": QUOTE}
+                    for s in self.prices
+                ]
+            }
+        )
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        streams = self._sockets[ws] = set()
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                command = json.loads(message.data)
+                symbols = {
+                    param.split("@")[0].upper().removesuffix(QUOTE) for param in command["params"]
+                }
+                if command["method"] == "SUBSCRIBE":
+                    streams.update(symbols & self.prices.keys())
+                elif command["method"] == "UNSUBSCRIBE":
+                    streams.difference_update(symbols)
+                await ws.send_json({"result": None, "id": command["id"]})
+        finally:
+            self._sockets.pop(ws, None)
+        return ws
+
+
+@dataclass
+class SentMessage:
+    chat_id: int
+    text: str
+    at: float
+    photo: bool = False
+
+
+@dataclass
+class _Chat:
+    replies: asyncio.Queue[SentMessage] = field(default_factory=asyncio.Queue)
+
+
+class FakeTelegram:
+    def __init__(self, token: str, latency: float = 0.0) -> None:
+        self.token = token
+        self.latency = latency
+        self.sent: list[SentMessage] = []
+        self.alerts: list[SentMessage] = []  # alert summaries, split out of merged messages
+        self._updates: list[dict[str, Any]] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._has_updates = asyncio.Event()
+        self._chats: dict[int, _Chat] = {}
+        self.server = TestServer(self._make_app())
+
+    @property
+    def base_url(self) -> str:
+        return str(self.server.make_url("/bot"))
+
+    def _make_app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024, middlewares=[_delay])
+        app["latency"] = self.latency
+        app.router.add_post(f"/bot{self.token}/{{method}}", self._call)
+        return app
+
+    async def start(self) -> None:
+        await self.server.start_server()
+
+    async def close(self) -> None:
+        await self.server.close()
+
+    def push_command(self, user_id: int, text: str) -> None:
+        command = text.split()[0]
+        self._updates.append(
+            {
+                "update_id": next(self._update_ids),
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+                    "text": text,
+                    "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+                },
+            }
+        )
+        self._has_updates.set()
+
+    def alert_lines(self) -> int:
+        return sum(line.startswith("Alert:") for m in self.alerts for line in m.text.splitlines())
+
+    async def next_reply(self, chat_id: int, timeout: float) -> SentMessage:
+        chat = self._chats.setdefault(chat_id, _Chat())
+        return await asyncio.wait_for(chat.replies.get(), timeout)
+
+    def _message(self, chat_id: int, text: str | None = None) -> dict[str, Any]:
+        message: dict[str, Any] = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+        }
+        if text is not None:
+            message["text"] = text
+        return message
+
+    # The send queue may merge an alert summary and a command reply into one message
+    def _deliver(self, message: SentMessage) -> None:
+        self.sent.append(message)
+        replies = []
+        for part in message.text.split("\n\n") if message.text else [""]:
+            if part.startswith("Alert:"):
+                self.alerts.append(SentMessage(message.chat_id, part, message.at))
+            else:
+                replies.append(part)
+        if replies:
+            reply = SentMessage(message.chat_id, "\n\n".join(replies), message.at, message.photo)
+            self._chats.setdefault(message.chat_id, _Chat()).replies.put_nowait(reply)
+
+    async def _call(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await request.post()
+        result: Any = True
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method == "getUpdates":
+            result = await self._get_updates(params)
+        elif method == "sendMessage":
+            chat_id, text = int(str(params["chat_id"])), str(params["text"])
+            self._deliver(SentMessage(chat_id, text, time.monotonic()))
+            result = self._message(chat_id, text)
+        elif method == "sendPhoto":
+            chat_id = int(str(params["chat_id"]))
+            self._deliver(SentMessage(chat_id, "", time.monotonic(), photo=True))
+            result = self._message(chat_id)
+            file_id = f"photo-{result['message_id']}"
+            result["photo"] = [
+                {"file_id": file_id, "file_unique_id": file_id, "width": 800, "height": 600}
+            ]
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, params: Any) -> list[dict[str, Any]]:
+        offset = int(params.get("offset", 0))
+        self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates:
+            self._has_updates.clear()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._has_updates.wait(), float(params.get("timeout", 0)))
+        return self._updates[: int(params.get("limit", 100))]
@@ -0,0 +1,175 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+
+from models import Alert, Direction
+
+# (user_id, alert) pairs as stored in the index
+Entry = tuple[int, Alert]
+
+
+# Columnar: thresholds and owners live in typed arrays (8 bytes each) instead of per-alert
+# float objects and (user_id, alert) tuples; entries are only materialised when they fire.
+@dataclass
+class _SortedTargets:
+    # Parallel columns kept sorted by target price so that bisect works on plain doubles
+    targets: "array[float]" = field(default_factory=lambda: array("d"))
+    user_ids: "array[int]" = field(default_factory=lambda: array("q"))
+    alerts: list[Alert] = field(default_factory=list)
+    # Removed alert IDs still physically present; dropped lazily so removal is O(1)
+    dead: set[int] = field(default_factory=set)
+
+    def add(self, user_id: int, alert: Alert) -> None:
+        position = bisect_right(self.targets, alert.target_price)
+        self.targets.insert(position, alert.target_price)
+        self.user_ids.insert(position, user_id)
+        self.alerts.insert(position, alert)
+
+    def extend(self, entries: Iterable[Entry]) -> None:
+        self._compact()
+        merged = sorted([*self._entries(0, len(self.alerts)), *entries], key=_target_price)
+        self._replace(0, len(self.alerts), merged)
+
+    def remove(self, alert_id: int) -> None:
+        self.dead.add(alert_id)
+        if len(self.dead) > 64 and len(self.dead) * 2 > len(self.alerts):
+            self._compact()
+
+    def _compact(self) -> None:
+        if not self.dead:
+            return
+        live = [entry for entry in self._entries(0, len(self.alerts)) if not self._is_dead(entry)]
+        self._replace(0, len(self.alerts), live)
+        self.dead.clear()
+
+    def _is_dead(self, entry: Entry) -> bool:
+        return entry[1].alert_id in self.dead
+
+    def _entries(self, start: int, end: int) -> list[Entry]:
+        return list(zip(self.user_ids[start:end], self.alerts[start:end], strict=True))
+
+    def _replace(self, start: int, end: int, entries: list[Entry]) -> None:
+        self.targets[start:end] = array("d", [alert.target_price for _, alert in entries])
+        self.user_ids[start:end] = array("q", [user_id for user_id, _ in entries])
+        self.alerts[start:end] = [alert for _, alert in entries]
+
+    # Live entries in [start:end); tombstones found there are purged while we are at it
+    def live(self, start: int, end: int) -> list[Entry]:
+        entries = self._entries(start, end)
+        if not self.dead:
+            return entries
+        live = [entry for entry in entries if not self._is_dead(entry)]
+        if len(live) != len(entries):
+            self.dead.difference_update(
+                alert.alert_id for _, alert in entries if alert.alert_id in self.dead
+            )
+            self._replace(start, end, live)
+        return live
+
+    # Target of the first live alert from start, walking by step (1 or -1)
+    def first_live(self, start: int, step: int) -> float | None:
+        position = start
+        while 0 <= position < len(self.alerts):
+            if self.alerts[position].alert_id not in self.dead:
+                return self.targets[position]
+            position += step
+        return None
+
+    def __len__(self) -> int:
+        return len(self.alerts) - len(self.dead)
+
+
+def _target_price(entry: Entry) -> float:
+    return entry[1].target_price
+
+
+@dataclass
+class _SymbolAlerts:
+    above: _SortedTargets = field(default_factory=_SortedTargets)
+    below: _SortedTargets = field(default_factory=_SortedTargets)
+
+    def side(self, alert: Alert) -> _SortedTargets:
+        return self.above if alert.direction is Direction.ABOVE else self.below
+
+    def __len__(self) -> int:
+        return len(self.above) + len(self.below)
+
+
+# Per-symbol index of alert thresholds, so a new price finds the fired alerts by binary search.
+# Alerts are identified by their alert_id, which must be unique among indexed alerts.
+class AlertIndex:
+    def __init__(self) -> None:
+        self._symbols: dict[str, _SymbolAlerts] = {}
+        # Called whenever a symbol gains its first alert or loses its last one
+        self.on_symbols_changed: Callable[[set[str]], None] | None = None
+
+    def _notify(self) -> None:
+        if self.on_symbols_changed is not None:
+            self.on_symbols_changed(self.symbols())
+
+    def add(self, user_id: int, alert: Alert) -> None:
+        new_symbol = alert.crypto not in self._symbols
+        self._symbols.setdefault(alert.crypto, _SymbolAlerts()).side(alert).add(user_id, alert)
+        if new_symbol:
+            self._notify()
+
+    def add_many(self, entries: Iterable[Entry]) -> None:
+        # Bulk load: sort each side once instead of inserting one by one
+        known = len(self._symbols)
+        grouped: dict[tuple[str, Direction], list[Entry]] = {}
+        for user_id, alert in entries:
+            grouped.setdefault((alert.crypto, alert.direction), []).append((user_id, alert))
+        for (crypto, direction), group in grouped.items():
+            symbol_alerts = self._symbols.setdefault(crypto, _SymbolAlerts())
+            side = symbol_alerts.above if direction is Direction.ABOVE else symbol_alerts.below
+            side.extend(group)
+        if len(self._symbols) != known:
+            self._notify()
+
+    # The caller guarantees the alert is indexed (state keeps the authoritative alerts_by_id)
+    def remove(self, alert: Alert) -> None:
+        symbol_alerts = self._symbols.get(alert.crypto)
+        if symbol_alerts is None:
+            return
+        symbol_alerts.side(alert).remove(alert.alert_id)
+        if not symbol_alerts:
+            del self._symbols[alert.crypto]
+            self._notify()
+
+    def fired(self, symbol: str, price: float) -> list[Entry]:
+        symbol_alerts = self._symbols.get(symbol)
+        if symbol_alerts is None:
+            return []
+        above, below = symbol_alerts.above, symbol_alerts.below
+        # "above" alerts fire when target <= price, "below" alerts when target >= price
+        return above.live(0, bisect_right(above.targets, price)) + below.live(
+            bisect_left(below.targets, price), len(below.alerts)
+        )
+
+    # Closest threshold not yet crossed at this price, on either side
+    def nearest(self, symbol: str, price: float) -> float | None:
+        symbol_alerts = self._symbols.get(symbol)
+        if symbol_alerts is None:
+            return None
+        above, below = symbol_alerts.above, symbol_alerts.below
+        candidates = [
+            target
+            for target in (
+                above.first_live(bisect_right(above.targets, price), 1),
+                below.first_live(bisect_left(below.targets, price) - 1, -1),
+            )
+            if target is not None
+        ]
+        return min(candidates, key=lambda target: abs(target - price), default=None)
+
+    def symbols(self) -> set[str]:
+        return set(self._symbols)
+
+    def clear(self) -> None:
+        if self._symbols:
+            self._symbols.clear()
+            self._notify()
+
+    def __len__(self) -> int:
+        return sum(len(symbol_alerts) for symbol_alerts in self._symbols.values())
@@ -1,17 +1,27 @@
+import asyncio
 import logging
 
-from config import TOKEN
-from handlers.admin import list_users
+from config import TOKEN, WEBHOOK_URL
+from handlers.admin import broadcast, list_users
 from handlers.alerts import add_alert, clear_alerts, list_alerts, remove_alert
-from handlers.base import help, plot, post_init, price, start
+from handlers.base import help, plot, post_init, post_shutdown, price, start
 from telegram.ext import Application, CommandHandler
+from update_processor import OrderedUpdateProcessor
+from webhook import run_webhook
 
-if __name__ == "__main__":
-    logging.basicConfig(
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-    )
 
-    application = Application.builder().token(TOKEN).post_init(post_init).build()
+# Build the bot with all its handlers; base_url points it at another Bot API server
+def build_application(token: str = TOKEN or "", base_url: str | None = None) -> Application:
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(OrderedUpdateProcessor())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if base_url is not None:
+        builder = builder.base_url(base_url).base_file_url(base_url)
+    application = builder.build()
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help))
@@ -22,5 +32,17 @@ if __name__ == "__main__":
     application.add_handler(CommandHandler("removealert", remove_alert))
     application.add_handler(CommandHandler("clearalerts", clear_alerts))
     application.add_handler(CommandHandler("listusers", list_users))
+    application.add_handler(CommandHandler("broadcast", broadcast))
+    return application
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+    )
 
-    application.run_polling()
+    application = build_application()
+    if WEBHOOK_URL:
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling()
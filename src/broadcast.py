@@ -0,0 +1,145 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from config import BROADCAST_CONCURRENCY, BROADCAST_PROGRESS_INTERVAL, BROADCAST_STATE_PATH
+from sender import MESSAGE_SENT, PRIORITY_BROADCAST
+from telegram import Bot
+from utils import safe_send
+
+
+# One message fanned out to many chats. `pending` lists the chats still to be reached, so a
+# saved broadcast picks up where it stopped; chats that were mid-send when it was
+# interrupted may receive the message twice.
+@dataclass
+class Broadcast:
+    text: str
+    admin_chat: int
+    pending: list[int]
+    total: int = 0
+    delivered: int = 0
+    failed: int = 0
+    done: set[int] = field(default_factory=set, repr=False)
+
+    def __post_init__(self) -> None:
+        self.total = self.total or len(self.pending)
+
+    def progress(self) -> str:
+        return (
+            f"{self.delivered + self.failed}/{self.total} chats reached: "
+            f"{self.delivered} delivered, {self.failed} failed"
+        )
+
+    def save(self, path: str) -> None:
+        state = asdict(self)
+        del state["done"]
+        state["pending"] = [chat_id for chat_id in self.pending if chat_id not in self.done]
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(state, file, separators=(",", ":"))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Broadcast | None":
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as file:
+                return cls(**json.load(file))
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable broadcast state: {e}")
+            return None
+
+    # Sends to every pending chat with at most `concurrency` messages waiting on the send
+    # queue, which keeps to Telegram's rate limits; reports progress to the admin chat and
+    # saves the remaining chats every `interval` seconds
+    async def run(
+        self,
+        bot: Bot,
+        path: str = BROADCAST_STATE_PATH,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        interval: float = BROADCAST_PROGRESS_INTERVAL,
+    ) -> None:
+        chats = iter(list(self.pending))
+
+        async def deliver() -> None:
+            # Workers share the iterator, each taking the next chat once its send is done
+            for chat_id in chats:
+                result = await safe_send(bot, chat_id, self.text, priority=PRIORITY_BROADCAST)
+                if result == MESSAGE_SENT:
+                    self.delivered += 1
+                else:
+                    self.failed += 1
+                self.done.add(chat_id)
+
+        async def report() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.save, path)
+                await safe_send(bot, self.admin_chat, f"Broadcast in progress: {self.progress()}")
+
+        await asyncio.to_thread(self.save, path)
+        reporter = asyncio.create_task(report())
+        try:
+            await asyncio.gather(*(deliver() for _ in range(max(1, concurrency))))
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.save, path)
+            raise
+        finally:
+            reporter.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await reporter
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        await safe_send(bot, self.admin_chat, f"Broadcast finished: {self.progress()}")
+
+
+_task: asyncio.Task[None] | None = None
+_current: Broadcast | None = None
+
+
+def running_broadcast() -> Broadcast | None:
+    return _current if _task is not None and not _task.done() else None
+
+
+def _finished(task: asyncio.Task[None]) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Broadcast stopped: {task.exception()!r}")
+
+
+# Runs a broadcast in the background; False if another one is still running
+def start_broadcast(bot: Bot, broadcast: Broadcast, path: str = BROADCAST_STATE_PATH) -> bool:
+    global _task, _current
+    if running_broadcast() is not None:
+        return False
+    _current = broadcast
+    _task = asyncio.create_task(broadcast.run(bot, path), name="broadcast")
+    _task.add_done_callback(_finished)
+    return True
+
+
+# Interrupts the running broadcast, which saves the chats it has not reached yet
+async def stop_broadcast() -> Broadcast | None:
+    global _task, _current
+    task, broadcast = _task, _current
+    _task = _current = None
+    if task is None or task.done():
+        return None
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    return broadcast
+
+
+# Forgets an interrupted broadcast instead of resuming it
+def discard_broadcast(path: str = BROADCAST_STATE_PATH) -> bool:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
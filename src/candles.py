@@ -0,0 +1,330 @@
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+from chart_cache import INTERVAL_SECONDS, next_candle_close
+from config import CANDLE_CACHE_SERIES, CANDLE_RETENTION, CANDLE_STORE_PATH
+from market import get_client
+from metrics import BINANCE_LATENCY, BINANCE_RESPONSES, binance_response
+
+# (symbol, interval), e.g. ("BTC", "1h")
+SeriesKey = tuple[str, str]
+
+KLINES_PAGE = 1000  # the most candles Binance returns per klines request
+_SPAN = re.compile(r"^(\d+)([mhdw])$")
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+_KLINES_LATENCY = BINANCE_LATENCY.labels("klines")
+_NETWORK_ERRORS = BINANCE_RESPONSES.labels("error")
+
+
+# Parses a time span such as "90m", "12h", "7d" or "4w" into seconds
+def parse_span(text: str) -> int | None:
+    match = _SPAN.match(text.lower())
+    if match is None or int(match[1]) == 0:
+        return None
+    return int(match[1]) * _UNIT_SECONDS[match[2]]
+
+
+# OHLCV columns for a range of candles, oldest first. The arrays are read-only views into
+# the store's buffers: nothing is copied per query. A later refresh may update the last,
+# still open candle in place.
+@dataclass(frozen=True, slots=True)
+class Candles:
+    open_time: np.ndarray  # milliseconds since the epoch
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+
+# In-memory copy of one stored series: open times plus one contiguous row per OHLCV column,
+# with spare capacity so appending new candles rarely reallocates
+class _Series:
+    def __init__(self, times: np.ndarray, values: np.ndarray, step_ms: int) -> None:
+        self.step_ms = step_ms
+        self.size = 0
+        self.times = np.empty(0, dtype=np.int64)
+        self.values = np.empty((5, 0), dtype=np.float64)
+        self.fresh_until = 0.0  # close of the newest candle when the tail was last fetched
+        # Earliest open time asked of Binance, which has nothing from before a symbol's listing
+        self.covered_from: int | None = int(times[0]) if len(times) else None
+        self.merge(times, values)
+
+    def _reserve(self, size: int) -> None:
+        if size <= len(self.times):
+            return
+        capacity = max(size, 2 * len(self.times), 64)
+        times = np.empty(capacity, dtype=np.int64)
+        values = np.empty((5, capacity), dtype=np.float64)
+        times[: self.size] = self.times[: self.size]
+        values[:, : self.size] = self.values[:, : self.size]
+        self.times, self.values = times, values
+
+    # Candles arrive sorted and contiguous, either before the stored range or from some
+    # stored candle onwards to the newest, which replaces everything from that point on.
+    # Candles starting past the newest with a gap replace the whole series, which stays
+    # contiguous.
+    def merge(self, times: np.ndarray, values: np.ndarray) -> None:
+        if not len(times):
+            return
+        if self.size and times[0] > self.times[self.size - 1] + self.step_ms:
+            # New buffers: views handed out earlier keep the old candles
+            self.times = np.empty(0, dtype=np.int64)
+            self.values = np.empty((5, 0), dtype=np.float64)
+            self.size = 0
+            self.covered_from = int(times[0])
+        stored = self.times[: self.size]
+        if self.size and times[0] < stored[0]:
+            after = int(np.searchsorted(stored, times[-1], side="right"))
+            kept = self.size - after
+            size = len(times) + kept
+            new_times = np.empty(max(size, 64), dtype=np.int64)
+            new_values = np.empty((5, len(new_times)), dtype=np.float64)
+            new_times[: len(times)] = times
+            new_times[len(times) : size] = stored[after:]
+            new_values[:, : len(times)] = values
+            new_values[:, len(times) : size] = self.values[:, after : self.size]
+            self.times, self.values, self.size = new_times, new_values, size
+            return
+        start = int(np.searchsorted(stored, times[0]))
+        self._reserve(start + len(times))
+        self.times[start : start + len(times)] = times
+        self.values[:, start : start + len(times)] = values
+        self.size = start + len(times)
+
+    # Drops all but the newest `keep` candles, into new buffers like merge()
+    def trim(self, keep: int) -> None:
+        if self.size <= keep:
+            return
+        dropped = self.size - keep
+        times = np.empty(max(keep, 64), dtype=np.int64)
+        values = np.empty((5, len(times)), dtype=np.float64)
+        times[:keep] = self.times[dropped : self.size]
+        values[:, :keep] = self.values[:, dropped : self.size]
+        self.times, self.values, self.size = times, values, keep
+        self.covered_from = int(times[0])
+
+    def view(self, start_ms: int, end_ms: int) -> Candles:
+        stored = self.times[: self.size]
+        first = int(np.searchsorted(stored, start_ms))
+        last = int(np.searchsorted(stored, end_ms, side="right"))
+        columns = [self.times[first:last], *(self.values[i, first:last] for i in range(5))]
+        for column in columns:
+            column.flags.writeable = False
+        return Candles(*columns)
+
+
+# Local OHLCV history per symbol and interval, persisted in SQLite. Queries are answered
+# from memory; only candles missing before the stored range or after its newest candle
+# are fetched from Binance, and the newest is refreshed at most once per candle. Each
+# series keeps its newest `retention` candles.
+class CandleStore:
+    def __init__(
+        self,
+        path: str = CANDLE_STORE_PATH,
+        max_series: int = CANDLE_CACHE_SERIES,
+        retention: int = CANDLE_RETENTION,
+    ):
+        self.path = path
+        self.max_series = max_series
+        self.retention = retention
+        self._series: OrderedDict[SeriesKey, _Series] = OrderedDict()
+        self._locks: dict[SeriesKey, asyncio.Lock] = {}
+        self._connection: sqlite3.Connection | None = None
+        # asyncio.to_thread may run reads and writes on different threads
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS candles ("
+                "symbol TEXT NOT NULL, interval TEXT NOT NULL, open_time INTEGER NOT NULL, "
+                "open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, "
+                "close REAL NOT NULL, volume REAL NOT NULL, "
+                "PRIMARY KEY (symbol, interval, open_time)) WITHOUT ROWID"
+            )
+            self._connection = connection
+        return self._connection
+
+    def _read(self, key: SeriesKey) -> tuple[np.ndarray, np.ndarray]:
+        with self._db_lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT open_time, open, high, low, close, volume FROM candles "
+                    "WHERE symbol = ? AND interval = ? ORDER BY open_time DESC LIMIT ?",
+                    (*key, self.retention),
+                )
+                .fetchall()
+            )
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((5, 0), dtype=np.float64)
+        table = np.array(rows[::-1], dtype=np.float64)
+        return table[:, 0].astype(np.int64), np.ascontiguousarray(table[:, 1:].T)
+
+    # Stores candles and deletes the series' candles opening before `first`
+    def _write(self, key: SeriesKey, times: np.ndarray, values: np.ndarray, first: int) -> None:
+        rows = [
+            (*key, int(t), *map(float, row))
+            for t, row in zip(times, values.T, strict=True)
+            if t >= first
+        ]
+        with self._db_lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "DELETE FROM candles WHERE symbol = ? AND interval = ? AND open_time < ?",
+                    (*key, first),
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO candles "
+                    "(symbol, interval, open_time, open, high, low, close, volume) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    async def _load(self, key: SeriesKey) -> _Series:
+        series = self._series.get(key)
+        if series is None:
+            series = _Series(
+                *await asyncio.to_thread(self._read, key), INTERVAL_SECONDS[key[1]] * 1000
+            )
+            self._series[key] = series
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+        self._series.move_to_end(key)
+        return series
+
+    # Candles of `interval` opening within [start, end] (unix seconds, end defaults to now)
+    async def get(
+        self, symbol: str, interval: str, start: float, end: float | None = None
+    ) -> Candles:
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unsupported interval: {interval}")
+        key = (symbol, interval)
+        step = INTERVAL_SECONDS[interval]
+        now = time.time()
+        now_ms = int(now * 1000)
+        start_ms = int(start // step * step) * 1000
+        end_ms = now_ms if end is None else min(int(end * 1000), now_ms)
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            series = await self._load(key)
+            if series.size == 0:
+                if await self._fetch_into(series, key, start_ms, end_ms):
+                    series.covered_from = start_ms
+                    if end_ms == now_ms:
+                        series.fresh_until = next_candle_close(interval, now)
+                return series.view(start_ms, end_ms)
+
+            first = int(series.times[0])
+            covered_from = first if series.covered_from is None else series.covered_from
+            if start_ms < covered_from and await self._fetch_into(series, key, start_ms, first - 1):
+                series.covered_from = start_ms
+            newest = int(series.times[series.size - 1])
+            if now >= series.fresh_until and end_ms >= newest:
+                # The newest stored candle may still have been open when fetched: fetch it again.
+                # Candles between it and a later start are not needed, merge() drops the old ones.
+                if await self._fetch_into(series, key, max(newest, start_ms), now_ms):
+                    series.fresh_until = next_candle_close(interval, now)
+            return series.view(start_ms, end_ms)
+
+    # Fetches and stores a range of candles; False if Binance could not be reached
+    async def _fetch_into(
+        self, series: _Series, key: SeriesKey, start_ms: int, end_ms: int
+    ) -> bool:
+        fetched = await fetch_klines(*key, start_ms, end_ms)
+        if fetched is None:
+            return False
+        times, values = fetched
+        if len(times):
+            series.merge(times, values)
+            series.trim(self.retention)
+            await asyncio.to_thread(self._write, key, times, values, int(series.times[0]))
+        return True
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+        self._series.clear()
+
+
+# Downloads the candles opening within [start_ms, end_ms], a page of up to KLINES_PAGE at a
+# time. Returns open times and a (5, n) array of open, high, low, close and volume, or None
+# if any page fails.
+async def fetch_klines(
+    symbol: str, interval: str, start_ms: int, end_ms: int
+) -> tuple[np.ndarray, np.ndarray] | None:
+    step_ms = INTERVAL_SECONDS[interval] * 1000
+    candles: list[list[str | int | float]] = []
+    while start_ms <= end_ms:
+        params = {
+            "symbol": f"{symbol}EUR",
+            "interval": interval,
+            "startTime": str(start_ms),
+            "endTime": str(end_ms),
+            "limit": str(KLINES_PAGE),
+        }
+        started = time.perf_counter()
+        try:
+            async with get_client().get("/api/v3/klines", params=params) as response:
+                _KLINES_LATENCY.observe(time.perf_counter() - started)
+                binance_response(response.status).inc()
+                if response.status != 200:
+                    logging.error(f"Could not fetch {symbol} {interval} klines: {response.status}")
+                    return None
+                page = await response.json()
+        except (aiohttp.ClientError, TimeoutError) as e:
+            _NETWORK_ERRORS.inc()
+            logging.warning(f"Network error fetching {symbol} {interval} klines: {e!r}")
+            return None
+        page = [candle for candle in page if start_ms <= candle[0] <= end_ms]
+        if not page:
+            break
+        candles.extend(page)
+        if len(page) < KLINES_PAGE:
+            break
+        start_ms = int(page[-1][0]) + step_ms
+
+    if not candles:
+        return np.empty(0, dtype=np.int64), np.empty((5, 0), dtype=np.float64)
+    times = np.array([candle[0] for candle in candles], dtype=np.int64)
+    values = np.array([candle[1:6] for candle in candles], dtype=np.float64).T
+    return times, np.ascontiguousarray(values)
+
+
+_store: CandleStore | None = None
+
+
+def get_candle_store() -> CandleStore:
+    global _store
+    if _store is None:
+        _store = CandleStore()
+    return _store
+
+
+def close_candle_store() -> None:
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+
+from config import CHART_CACHE_BYTES, CHART_CACHE_SIZE
+from metrics import CHART_CACHE_EVICTIONS, CHART_CACHE_LOOKUPS
+
+_HITS = CHART_CACHE_LOOKUPS.labels("hit")
+_MISSES = CHART_CACHE_LOOKUPS.labels("miss")
+
+# (symbol, interval, number of candles) of a /plot chart
+ChartKey = tuple[str, str, int]
+
+# Binance kline intervals whose candles divide a day evenly (weekly and monthly ones do not
+# start at the epoch)
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "3m": 180,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "2h": 2 * 3600,
+    "4h": 4 * 3600,
+    "6h": 6 * 3600,
+    "8h": 8 * 3600,
+    "12h": 12 * 3600,
+    "1d": 86400,
+}
+
+
+# Binance candles are aligned to the UTC epoch, so the current one closes at the next multiple
+def next_candle_close(interval: str, now: float | None = None) -> float:
+    seconds = INTERVAL_SECONDS[interval]
+    now = time.time() if now is None else now
+    return (now // seconds + 1) * seconds
+
+
+# /plot cache of rendered charts (PNG bytes until Telegram hands back a reusable file_id),
+# expiring at candle close. The candles themselves live in the candle store.
+class ChartCache:
+    def __init__(self, max_entries: int = CHART_CACHE_SIZE, max_bytes: int = CHART_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._charts: OrderedDict[ChartKey, tuple[bytes | str, float]] = OrderedDict()
+        self._chart_bytes = 0
+        self.chart_hits = self.chart_misses = self.chart_evictions = 0
+
+    # Returns PNG bytes or a Telegram file_id for a still-valid chart
+    def get_chart(self, key: ChartKey) -> bytes | str | None:
+        entry = self._charts.get(key)
+        if entry is None or time.time() >= entry[1]:
+            if entry is not None:
+                self._drop_chart(key)
+            self.chart_misses += 1
+            _MISSES.inc()
+            return None
+        self.chart_hits += 1
+        _HITS.inc()
+        self._charts.move_to_end(key)
+        return entry[0]
+
+    def put_chart(self, key: ChartKey, chart: bytes | str) -> None:
+        self._drop_chart(key)
+        self._charts[key] = (chart, next_candle_close(key[1]))
+        if isinstance(chart, bytes):
+            self._chart_bytes += len(chart)
+        while self._charts and (
+            len(self._charts) > self.max_entries or self._chart_bytes > self.max_bytes
+        ):
+            self._drop_chart(next(iter(self._charts)))
+            self.chart_evictions += 1
+            CHART_CACHE_EVICTIONS.inc()
+
+    def _drop_chart(self, key: ChartKey) -> None:
+        entry = self._charts.pop(key, None)
+        if entry is not None and isinstance(entry[0], bytes):
+            self._chart_bytes -= len(entry[0])
+
+    def stats(self) -> dict[str, float]:
+        chart_lookups = self.chart_hits + self.chart_misses
+        return {
+            "chart_entries": len(self._charts),
+            "chart_bytes": self._chart_bytes,
+            "chart_hit_rate": self.chart_hits / chart_lookups if chart_lookups else 0.0,
+            "chart_evictions": self.chart_evictions,
+        }
+
+
+# Shared cache used by /plot
+chart_cache = ChartCache()
@@ -0,0 +1,105 @@
+import asyncio
+import io
+import multiprocessing
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from config import RENDER_MODE, RENDER_QUEUE_SIZE, RENDER_WORKERS
+
+
+class RendererBusyError(Exception):
+    pass
+
+
+# Function to draw the /plot chart as PNG bytes. Uses the object-oriented Figure API rather
+# than pyplot, whose global state is not safe to share between worker threads. matplotlib
+# is imported on first use, so only processes that actually draw pay for loading it.
+# Without `times` the prices are evenly spaced, one per candle.
+def render_price_chart(
+    crypto_id: str,
+    prices: Sequence[float],
+    period: str = "30 Days",
+    unit: str = "Days",
+    times: Sequence[float] | None = None,
+) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(10, 5))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    # Markers only while the individual candles can still be told apart
+    marker = "o" if len(prices) <= 100 else None
+    if times is None:
+        axes.plot(prices, marker=marker, linestyle="-", color="b")
+    else:
+        axes.plot(times, prices, marker=marker, linestyle="-", color="b")
+    axes.set_title(f"{crypto_id} Price Evolution (Last {period})")
+    axes.set_xlabel(unit)
+    axes.set_ylabel("Price (€)")
+    axes.grid(True)
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+# Bounded pool rendering charts away from the event loop; turns requests away once full
+class ChartRenderer:
+    def __init__(
+        self,
+        mode: str = RENDER_MODE,
+        workers: int = RENDER_WORKERS,
+        queue_size: int = RENDER_QUEUE_SIZE,
+    ) -> None:
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self._executor: Executor
+        if mode == "process":
+            # spawn: forking a process that already runs threads and an event loop is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        elif mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        else:
+            raise ValueError(f"Unknown render mode: {mode}")
+
+    async def render(
+        self,
+        crypto_id: str,
+        prices: Sequence[float],
+        period: str = "30 Days",
+        unit: str = "Days",
+        times: Sequence[float] | None = None,
+    ) -> bytes:
+        if self.pending >= self.capacity:
+            raise RendererBusyError(f"{self.pending} charts already queued")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, render_price_chart, crypto_id, prices, period, unit, times
+            )
+        finally:
+            self.pending -= 1
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_renderer: ChartRenderer | None = None
+
+
+def get_renderer() -> ChartRenderer:
+    global _renderer
+    if _renderer is None:
+        _renderer = ChartRenderer()
+    return _renderer
+
+
+def close_renderer() -> None:
+    global _renderer
+    if _renderer is not None:
+        _renderer.close()
+        _renderer = None
@@ -15,5 +15,108 @@ TOKEN = os.getenv("TOKEN")
 ADMINS = {
     int(admin_id.strip()) for admin_id in os.getenv("ADMINS", "").split(",") if admin_id.strip()
 }
-ALERT_INTERVAL = 30  # seconds
-VALID_SYMBOLS: set[str] = set()
+ALERT_INTERVAL = 30  # seconds; poll interval until volatility is known, and stream staleness
+SYMBOLS_REFRESH_INTERVAL = 3600  # seconds between exchangeInfo reloads
+SYMBOLS_SNAPSHOT_PATH = os.getenv("SYMBOLS_SNAPSHOT_PATH", "data/symbols.json")
+# Restore alerts, load symbols and register commands while already handling updates
+FAST_START = os.getenv("FAST_START", "true").lower() in ("1", "true", "yes")
+
+# Binance REST API and the shared HTTP client used to reach it
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", "https://api.binance.com")
+HTTP_POOL_SIZE = 20  # max open connections
+HTTP_KEEPALIVE = 60  # seconds
+HTTP_TIMEOUT = 10  # seconds per request
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "5"))  # seconds
+PRICE_CACHE_SIZE = 1000  # symbols
+PRICE_MAX_SYMBOLS = 50  # symbols per /price command, all fetched in one request
+
+# Where prices come from: providers in order of preference, each behind a circuit breaker.
+# A request still unanswered after the provider's HEDGE_QUANTILE latency is sent again to
+# the next provider (or the same one if it is the only one) and the first answer wins.
+PRICE_PROVIDERS = os.getenv("PRICE_PROVIDERS", "binance").split(",")
+PRICE_QUOTES = os.getenv("PRICE_QUOTES", "EUR,USDT,USD").upper().split(",")  # /price ... in <quote>
+PRICE_RETRIES = 3  # attempts per lookup
+PRICE_BACKOFF_BASE = 0.25  # seconds; retries wait a random time up to base * 2 ** attempt
+PRICE_BACKOFF_MAX = 4.0  # seconds
+HEDGE_QUANTILE = 0.95
+HEDGE_DEFAULT_DELAY = 1.0  # seconds, until a provider has HEDGE_MIN_SAMPLES latencies
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200  # latest latencies kept per provider
+BREAKER_FAILURES = 5  # consecutive failures that open a provider's circuit
+BREAKER_COOLDOWN = 30  # seconds before an open circuit lets a trial request through
+
+# Binance websocket stream pushing prices for symbols with alerts (REST polling is the fallback)
+PRICE_STREAM = os.getenv("PRICE_STREAM", "true").lower() in ("1", "true", "yes")
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443/ws")
+STREAM_RECONNECT_MIN = 1  # seconds
+STREAM_RECONNECT_MAX = 60  # seconds
+
+# Alert persistence: "sqlite", "log" (append-only JSON lines) or "memory"
+ALERT_STORE = os.getenv("ALERT_STORE", "sqlite")
+ALERT_STORE_PATH = os.getenv(
+    "ALERT_STORE_PATH", "data/alerts.log" if ALERT_STORE == "log" else "data/alerts.db"
+)
+
+# Chart rendering for /plot runs off the event loop in a bounded worker pool
+RENDER_MODE = os.getenv("RENDER_MODE", "process")  # "process" or "thread"
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_QUEUE_SIZE = 8  # charts allowed to wait for a worker before /plot is turned away
+
+# Rendered /plot charts expire at candle close and are bounded by size
+CHART_CACHE_SIZE = 256  # (symbol, interval, candles) entries
+CHART_CACHE_BYTES = 32 * 1024 * 1024  # rendered PNG bytes kept in memory
+
+# Local OHLCV history behind /plot; only candles it does not hold yet are downloaded
+CANDLE_STORE_PATH = os.getenv("CANDLE_STORE_PATH", "data/candles.db")
+CANDLE_CACHE_SERIES = 64  # (symbol, interval) series kept in memory
+# Newest candles kept per symbol and interval, in memory and on disk: about a week of 1m
+# candles, over a year of 1h ones
+CANDLE_RETENTION = 10_000
+PLOT_MAX_CANDLES = 1000  # most candles a single /plot may draw
+
+# Prices seen by the alert path, kept per watched symbol for /plot <coin> live
+PRICE_HISTORY_RESOLUTION = 20  # seconds; later prices within one slot replace the earlier
+PRICE_HISTORY_SAMPLES = 4320  # per symbol: 16 bytes each, so 69 KB covering a day
+
+# Outbound Telegram messages (Bot API allows ~30 msg/s overall and ~1 msg/s per chat)
+SEND_GLOBAL_RATE = 30  # messages per second
+SEND_CHAT_RATE = 1  # messages per second per chat
+SEND_CHAT_BURST = 3  # messages a quiet chat may receive back to back
+SEND_MAX_IN_FLIGHT = 16  # concurrent sendMessage calls
+SEND_MAX_RETRIES = 3  # attempts on network errors
+
+# Admin /broadcast: messages waiting on the send queue at once, seconds between progress
+# reports, and where an unfinished broadcast is kept for /broadcast resume
+BROADCAST_CONCURRENCY = 32
+BROADCAST_PROGRESS_INTERVAL = 15
+BROADCAST_STATE_PATH = os.getenv("BROADCAST_STATE_PATH", "data/broadcast.json")
+LIST_USERS_PAGE_SIZE = 100  # user IDs per /listusers message
+
+# Prometheus-style /metrics endpoint, bound to localhost by default (port 0 disables it)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9090"))
+
+# Adaptive REST polling for symbols the price stream does not cover: each symbol is checked
+# sooner the closer its price is to a threshold relative to recent volatility
+POLL_TICK = 1  # seconds between scheduler passes
+POLL_MIN_INTERVAL = 5  # seconds; the price cache TTL makes faster polling pointless
+POLL_MAX_INTERVAL = 300  # seconds
+POLL_BUDGET = float(os.getenv("POLL_BUDGET", "1"))  # bulk price requests per second
+POLL_SIGMAS = 3  # standard deviations of movement that must fit before the next poll
+
+# Trailing-stop and moving-average alerts, evaluated from price ticks
+MA_SAMPLE_INTERVAL = 60  # seconds per moving-average sample
+MA_MAX_WINDOW = 1440  # samples
+TRAILING_SAVE_INTERVAL = 60  # seconds between saves of trailing stops' running high/low
+
+# Updates are handled concurrently up to this many at once (alert commands stay in order
+# per user). With WEBHOOK_URL set the bot receives updates on its own webhook server
+# instead of long polling; Telegram must be able to reach WEBHOOK_URL, usually through a
+# reverse proxy in front of WEBHOOK_LISTEN:WEBHOOK_PORT.
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "64"))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # e.g. https://bot.example.com/telegram
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_MAX_CONNECTIONS = 40  # concurrent HTTPS connections Telegram may open to us
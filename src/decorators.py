@@ -1,8 +1,10 @@
 import functools
 import logging
+import time
 from collections.abc import Awaitable, Callable
 
 from config import ADMINS
+from metrics import COMMAND_ERRORS, COMMAND_LATENCY, JOB_LATENCY
 from telegram import Update
 from telegram.ext import ContextTypes
 from utils import get_chat_id, safe_send
@@ -11,11 +13,17 @@ from utils import get_chat_id, safe_send
 def command_error_handler(
     func: Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]],
 ) -> Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]:
+    # Bound once here so timing a call only touches preallocated counters
+    latency = COMMAND_LATENCY.labels(func.__name__)
+    errors = COMMAND_ERRORS.labels(func.__name__)
+
     @functools.wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        started = time.perf_counter()
         try:
             await func(update, context)
         except Exception as e:
+            errors.inc()
             logging.exception(f"Unhandled error in command {func.__name__}: {e}")
             if update.effective_chat:
                 await safe_send(
@@ -23,6 +31,8 @@ def command_error_handler(
                     update.effective_chat.id,
                     "An unexpected error occurred. Please try again later.",
                 )
+        finally:
+            latency.observe(time.perf_counter() - started)
 
     return wrapper
 
@@ -49,11 +59,16 @@ def admin_only(
 def alert_job(
     func: Callable[[ContextTypes.DEFAULT_TYPE], Awaitable[None]],
 ) -> Callable[[ContextTypes.DEFAULT_TYPE], Awaitable[None]]:
+    latency = JOB_LATENCY.labels(func.__name__)
+
     @functools.wraps(func)
     async def wrapper(context: ContextTypes.DEFAULT_TYPE) -> None:
+        started = time.perf_counter()
         try:
             await func(context)
         except Exception as e:
             logging.exception(f"Error inside scheduled alert job {func.__name__}: {e}")
+        finally:
+            latency.observe(time.perf_counter() - started)
 
     return wrapper
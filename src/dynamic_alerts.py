@@ -0,0 +1,233 @@
+from array import array
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import replace
+
+from config import MA_SAMPLE_INTERVAL
+from models import Alert, Direction, MovingAverageAlert, TrailingStopAlert, trigger_level
+
+# (user_id, alert)
+Entry = tuple[int, Alert]
+# A fired alert: (user_id, alert_id, symbol, price)
+FiredAlert = tuple[int, int, str, float]
+
+
+class _Trailing:
+    __slots__ = ("user_id", "alert", "extreme", "saved")
+
+    def __init__(self, user_id: int, alert: TrailingStopAlert) -> None:
+        self.user_id = user_id
+        self.alert = alert
+        self.extreme = alert.reference
+        self.saved = alert.reference
+
+    def level(self) -> float:
+        return trigger_level(self.alert.direction, self.alert.percent, self.extreme)
+
+
+# Simple moving average of the last `window` sample closes: the last price seen in each
+# sampling interval that had one. A ring buffer and a running sum make each update O(1).
+class _MovingAverage:
+    __slots__ = ("window", "interval", "closes", "head", "count", "total", "sample", "last")
+
+    def __init__(self, window: int, interval: float) -> None:
+        self.window = window
+        self.interval = interval
+        self.closes = array("d", bytes(8 * window))
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+        self.sample: int | None = None  # index of the interval being sampled
+        self.last = 0.0
+
+    def update(self, price: float, now: float) -> None:
+        sample = int(now // self.interval)
+        if self.sample is not None and sample != self.sample:
+            # The previous interval closed: its last price replaces the oldest close
+            self.total += self.last - self.closes[self.head]
+            self.closes[self.head] = self.last
+            self.head = (self.head + 1) % self.window
+            self.count = min(self.count + 1, self.window)
+        self.sample = sample
+        self.last = price
+
+    # Fills the window from past closes, one per sampling interval and oldest first, given
+    # with their interval start times. Only before any live sample has closed, and without
+    # the interval being sampled now.
+    def seed(self, starts: Sequence[float], closes: Sequence[float]) -> None:
+        if self.count:
+            return
+        if self.sample is not None:
+            closes = [
+                close
+                for start, close in zip(starts, closes, strict=True)
+                if start < self.sample * self.interval
+            ]
+        for close in list(closes)[-self.window :]:
+            self.closes[self.head] = close
+            self.head = (self.head + 1) % self.window
+            self.total += close
+            self.count += 1
+
+    def value(self) -> float | None:
+        return self.total / self.window if self.count == self.window else None
+
+
+class _Cross:
+    __slots__ = ("user_id", "alert", "above")
+
+    def __init__(self, user_id: int, alert: MovingAverageAlert) -> None:
+        self.user_id = user_id
+        self.alert = alert
+        self.above: bool | None = None  # side of the average at the last update
+
+
+class _SymbolDynamic:
+    __slots__ = ("trailing", "crosses", "averages")
+
+    def __init__(self) -> None:
+        self.trailing: dict[int, _Trailing] = {}  # alert_id -> state
+        self.crosses: dict[int, _Cross] = {}  # alert_id -> state
+        self.averages: dict[int, _MovingAverage] = {}  # window -> shared average
+
+    def __bool__(self) -> bool:
+        return bool(self.trailing or self.crosses)
+
+
+# Evaluates alerts whose trigger moves with the price, from the price ticks alone: every
+# tick updates each trailing stop's running extreme and each moving average's rolling sum
+# in O(1), so nothing is refetched. Shares AlertIndex's symbols()/nearest() interface so
+# the poll scheduler and price stream cover these symbols too.
+class DynamicAlerts:
+    def __init__(self, interval: float = MA_SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self._symbols: dict[str, _SymbolDynamic] = {}
+        # Called whenever a symbol gains its first alert or loses its last one
+        self.on_symbols_changed: Callable[[set[str]], None] | None = None
+
+    def _notify(self) -> None:
+        if self.on_symbols_changed is not None:
+            self.on_symbols_changed(self.symbols())
+
+    def add(self, user_id: int, alert: Alert) -> None:
+        new_symbol = alert.crypto not in self._symbols
+        symbol = self._symbols.setdefault(alert.crypto, _SymbolDynamic())
+        if isinstance(alert, TrailingStopAlert):
+            symbol.trailing[alert.alert_id] = _Trailing(user_id, alert)
+        elif isinstance(alert, MovingAverageAlert):
+            symbol.crosses[alert.alert_id] = _Cross(user_id, alert)
+            if alert.window not in symbol.averages:
+                symbol.averages[alert.window] = _MovingAverage(alert.window, self.interval)
+        else:
+            raise ValueError(f"Not a dynamic alert: {alert}")
+        if new_symbol:
+            self._notify()
+
+    def add_many(self, entries: Iterable[Entry]) -> None:
+        for user_id, alert in entries:
+            self.add(user_id, alert)
+
+    def remove(self, alert: Alert) -> None:
+        symbol = self._symbols.get(alert.crypto)
+        if symbol is None:
+            return
+        symbol.trailing.pop(alert.alert_id, None)
+        cross = symbol.crosses.pop(alert.alert_id, None)
+        if cross is not None and not any(
+            other.alert.window == cross.alert.window for other in symbol.crosses.values()
+        ):
+            del symbol.averages[cross.alert.window]
+        if not symbol:
+            del self._symbols[alert.crypto]
+            self._notify()
+
+    # Feeds one price tick and returns the alerts it fires; they stay registered until the
+    # caller removes them
+    def update(self, symbol: str, price: float, now: float) -> list[FiredAlert]:
+        state = self._symbols.get(symbol)
+        if state is None:
+            return []
+        fired: list[FiredAlert] = []
+        for trailing in state.trailing.values():
+            below = trailing.alert.direction is Direction.BELOW
+            if (price > trailing.extreme) if below else (price < trailing.extreme):
+                trailing.extreme = price
+            elif (price <= trailing.level()) if below else (price >= trailing.level()):
+                fired.append((trailing.user_id, trailing.alert.alert_id, symbol, price))
+
+        for average in state.averages.values():
+            average.update(price, now)
+        for cross in state.crosses.values():
+            value = state.averages[cross.alert.window].value()
+            if value is None:
+                continue
+            above = price > value
+            if cross.above is not None and above != cross.above:
+                if above == (cross.alert.direction is Direction.ABOVE):
+                    fired.append((cross.user_id, cross.alert.alert_id, symbol, price))
+            cross.above = above
+        return fired
+
+    # Current trigger price of an alert: the trailing stop level or the moving average
+    def level(self, alert: Alert) -> float | None:
+        state = self._symbols.get(alert.crypto)
+        if state is None:
+            return None
+        trailing = state.trailing.get(alert.alert_id)
+        if trailing is not None:
+            return trailing.level()
+        if isinstance(alert, MovingAverageAlert) and alert.window in state.averages:
+            return state.averages[alert.window].value()
+        return None
+
+    # Moving averages that still lack samples, as (symbol, window)
+    def warming(self) -> list[tuple[str, int]]:
+        return [
+            (symbol, window)
+            for symbol, state in self._symbols.items()
+            for window, average in state.averages.items()
+            if average.value() is None
+        ]
+
+    def seed(
+        self, symbol: str, window: int, starts: Sequence[float], closes: Sequence[float]
+    ) -> None:
+        state = self._symbols.get(symbol)
+        if state is not None and window in state.averages:
+            state.averages[window].seed(starts, closes)
+
+    # Closest trigger to this price, for the poll scheduler
+    def nearest(self, symbol: str, price: float) -> float | None:
+        state = self._symbols.get(symbol)
+        if state is None:
+            return None
+        levels = [trailing.level() for trailing in state.trailing.values()]
+        if state.crosses:
+            averages = [average.value() for average in state.averages.values()]
+            # Until an average is known (seeding failed), samples must keep coming: poll as if
+            # at a threshold
+            levels.extend(price if value is None else value for value in averages)
+        return min(levels, key=lambda level: abs(level - price), default=None)
+
+    # Trailing stops whose extreme moved since last saved, as alerts to persist in their place
+    def unsaved(self) -> list[Entry]:
+        changed = []
+        for state in self._symbols.values():
+            for trailing in state.trailing.values():
+                if trailing.extreme != trailing.saved:
+                    trailing.saved = trailing.extreme
+                    alert = replace(
+                        trailing.alert, target_price=trailing.level(), reference=trailing.extreme
+                    )
+                    changed.append((trailing.user_id, alert))
+        return changed
+
+    def symbols(self) -> set[str]:
+        return set(self._symbols)
+
+    def clear(self) -> None:
+        if self._symbols:
+            self._symbols.clear()
+            self._notify()
+
+    def __len__(self) -> int:
+        return sum(len(state.trailing) + len(state.crosses) for state in self._symbols.values())
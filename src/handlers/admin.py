@@ -1,11 +1,29 @@
-from decorators import admin_only
-from state import price_alerts
+import asyncio
+import os
+
+from broadcast import (
+    Broadcast,
+    discard_broadcast,
+    running_broadcast,
+    start_broadcast,
+    stop_broadcast,
+)
+from config import BROADCAST_STATE_PATH, LIST_USERS_PAGE_SIZE
+from decorators import admin_only, command_error_handler
+from state import alert_chats, price_alerts
 from telegram import Update
+from telegram.constants import MessageLimit
 from telegram.ext import ContextTypes
 from utils import get_chat_id, safe_send
 
+BROADCAST_USAGE = (
+    "Usage: /broadcast <message> to send a message to every chat with alerts, "
+    "/broadcast resume to finish an interrupted one, /broadcast cancel to stop and discard it"
+)
+
 
-# Command handler for the /listusers command
+# Command handler for the /listusers command: /listusers [page]
+@command_error_handler
 @admin_only
 async def list_users(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     chat_id = get_chat_id(update, context)
@@ -13,6 +31,94 @@ async def list_users(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         await safe_send(context.bot, chat_id, "No users have set any alerts.")
         return
 
-    user_ids = list(price_alerts.keys())
-    user_ids_list = "\n".join([str(user_id) for user_id in user_ids])
-    await safe_send(context.bot, chat_id, f"Users with price alerts:\n{user_ids_list}")
+    user_ids = sorted(price_alerts)
+    pages = -(-len(user_ids) // LIST_USERS_PAGE_SIZE)
+    page = 1
+    if context.args:
+        if not context.args[0].isdigit() or not 1 <= int(context.args[0]) <= pages:
+            await safe_send(context.bot, chat_id, f"Page must be a number from 1 to {pages}.")
+            return
+        page = int(context.args[0])
+
+    shown = user_ids[(page - 1) * LIST_USERS_PAGE_SIZE : page * LIST_USERS_PAGE_SIZE]
+    user_ids_list = "\n".join(str(user_id) for user_id in shown)
+    if pages == 1:
+        await safe_send(context.bot, chat_id, f"Users with price alerts:\n{user_ids_list}")
+        return
+    next_page = f"\nNext page: /listusers {page + 1}" if page < pages else ""
+    await safe_send(
+        context.bot,
+        chat_id,
+        f"Users with price alerts ({len(user_ids)}, page {page} of {pages}):\n"
+        f"{user_ids_list}{next_page}",
+    )
+
+
+# Command handler for the /broadcast command: /broadcast <message> | resume | cancel
+@command_error_handler
+@admin_only
+async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    chat_id = get_chat_id(update, context)
+    # Taken from the raw text rather than context.args so that line breaks survive
+    message = update.effective_message
+    parts = message.text.split(maxsplit=1) if message and message.text else []
+    text = parts[1].strip() if len(parts) > 1 else ""
+    if not text:
+        await safe_send(context.bot, chat_id, BROADCAST_USAGE)
+        return
+
+    if text.lower() == "cancel":
+        stopped = await stop_broadcast()
+        discarded = await asyncio.to_thread(discard_broadcast, BROADCAST_STATE_PATH)
+        if stopped is not None:
+            await safe_send(context.bot, chat_id, f"Broadcast cancelled: {stopped.progress()}")
+        elif discarded:
+            await safe_send(context.bot, chat_id, "Interrupted broadcast discarded.")
+        else:
+            await safe_send(context.bot, chat_id, "No broadcast to cancel.")
+        return
+
+    current = running_broadcast()
+    if current is not None:
+        await safe_send(
+            context.bot,
+            chat_id,
+            f"A broadcast is already running ({current.progress()}). "
+            "/broadcast cancel stops it.",
+        )
+        return
+
+    if text.lower() == "resume":
+        saved = await asyncio.to_thread(Broadcast.load, BROADCAST_STATE_PATH)
+        if saved is None:
+            await safe_send(context.bot, chat_id, "There is no interrupted broadcast to resume.")
+            return
+        saved.admin_chat = chat_id
+        start_broadcast(context.bot, saved, BROADCAST_STATE_PATH)
+        await safe_send(context.bot, chat_id, f"Resuming broadcast: {saved.progress()}")
+        return
+
+    if os.path.exists(BROADCAST_STATE_PATH):
+        await safe_send(
+            context.bot,
+            chat_id,
+            "An interrupted broadcast is waiting. /broadcast resume finishes it, "
+            "/broadcast cancel discards it.",
+        )
+        return
+    if len(text) > MessageLimit.MAX_TEXT_LENGTH:
+        await safe_send(
+            context.bot,
+            chat_id,
+            f"The message is too long ({len(text)} characters, at most "
+            f"{MessageLimit.MAX_TEXT_LENGTH}).",
+        )
+        return
+
+    # Every chat some alert was set in, not just each user's latest one
+    chats = sorted(set(alert_chats.values()))
+    if not chats:
+        await safe_send(context.bot, chat_id, "No users have set any alerts.")
+        return
+    start_broadcast(context.bot, Broadcast(text, chat_id, chats), BROADCAST_STATE_PATH)
+    await safe_send(context.bot, chat_id, f"Broadcasting to {len(chats)} chats.")
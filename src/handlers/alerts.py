@@ -1,64 +1,136 @@
-from config import ALERT_INTERVAL
+from config import MA_MAX_WINDOW
 from decorators import command_error_handler
-from jobs import check_alerts
-from models import Alert
-from state import price_alerts
+from jobs import seed_averages
+from models import (
+    Alert,
+    AlertKind,
+    Direction,
+    MovingAverageAlert,
+    PercentMoveAlert,
+    TrailingStopAlert,
+)
+from price_cache import price_cache
+from state import (
+    dynamic_alerts,
+    find_alert,
+    price_alerts,
+    register_alert,
+    unregister_alert,
+    unregister_user,
+)
+from symbols import symbol_registry
 from telegram import Update
-from telegram.ext import ContextTypes, JobQueue
-from utils import get_chat_id, safe_send, job_name_for
+from telegram.ext import ContextTypes
+from utils import get_chat_id, get_crypto_price, job_name_for, safe_send
+
+ADD_USAGE = (
+    "Usage: /addalert <crypto> <above/below> <target>, where <target> is a price (70000), "
+    "a move from the current price (5%), a trailing stop (5% trailing) or a moving-average "
+    "cross (ma20, in one-minute samples)"
+)
+
+
+# Function to parse the percentage of "5%" or "5% trailing"; None if it is not one
+def parse_percent(text: str) -> float | None:
+    if not text.endswith("%"):
+        return None
+    try:
+        percent = float(text[:-1])
+    except ValueError:
+        return None
+    return percent if 0 < percent < 100 else None
+
+
+# Function to parse an /addalert target back into the (kind, amount) it is stored as; None
+# if it is not one
+def parse_target(target: str, modifier: list[str]) -> tuple[AlertKind, float] | None:
+    if target.startswith("ma") and target[2:].isdigit() and not modifier:
+        return AlertKind.MOVING_AVERAGE, float(target[2:])
+    percent = parse_percent(target)
+    if percent is not None and modifier in ([], ["trailing"]):
+        return (AlertKind.TRAILING if modifier else AlertKind.PERCENT), percent
+    if modifier:
+        return None
+    try:
+        return AlertKind.PRICE, float(target)
+    except ValueError:
+        return None
 
 
 @command_error_handler
 async def add_alert(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    user_name = job_name_for(update)
     chat_id = get_chat_id(update, context)
     if update.effective_user is None:
         await safe_send(context.bot, chat_id, "Cannot identify user.")
         return
     user_id = update.effective_user.id
 
-    if not context.args or len(context.args) < 3:
-        await safe_send(
-            context.bot, chat_id, "Usage: /addalert <crypto> <above/below> <target_price>"
-        )
+    if not context.args or len(context.args) not in (3, 4):
+        await safe_send(context.bot, chat_id, ADD_USAGE)
         return
 
     crypto = context.args[0].upper()
-    direction = context.args[1].lower()
-    try:
-        target_price = float(context.args[2])
-    except ValueError:
-        await safe_send(context.bot, chat_id, "Target price must be a valid number.")
+    if not symbol_registry.is_valid(crypto):
+        await safe_send(context.bot, chat_id, f"Unknown symbol {crypto}.")
         return
 
+    direction = context.args[1].lower()
     if direction not in ["above", "below"]:
         await safe_send(context.bot, chat_id, "Direction must be 'above' or 'below'.")
         return
 
-    alert = Alert(crypto=crypto, direction=direction, target_price=target_price)
+    target, *modifier = (arg.lower() for arg in context.args[2:])
+    alert: Alert
+    if target.startswith("ma") and not modifier:
+        window = int(target[2:]) if target[2:].isdigit() else 0
+        if not 2 <= window <= MA_MAX_WINDOW:
+            await safe_send(
+                context.bot, chat_id, f"Moving average window must be 2 to {MA_MAX_WINDOW}."
+            )
+            return
+        alert = MovingAverageAlert(crypto, Direction(direction), 0.0, window=window)
+    elif target.endswith("%") and modifier in ([], ["trailing"]):
+        percent = parse_percent(target)
+        if percent is None:
+            await safe_send(context.bot, chat_id, "Percentage must be between 0% and 100%.")
+            return
+        current = await price_cache.get(crypto, get_crypto_price)
+        if current is None:
+            await safe_send(context.bot, chat_id, f"Couldn't retrieve the price of {crypto}.")
+            return
+        kind = TrailingStopAlert if modifier else PercentMoveAlert
+        alert = kind.from_price(crypto, Direction(direction), percent, current)
+    elif not modifier:
+        try:
+            target_price = float(target)
+        except ValueError:
+            await safe_send(context.bot, chat_id, "Target price must be a valid number.")
+            return
+        alert = Alert(crypto=crypto, direction=Direction(direction), target_price=target_price)
+    else:
+        await safe_send(context.bot, chat_id, ADD_USAGE)
+        return
 
-    price_alerts.setdefault(user_id, []).append(alert)
+    alert = register_alert(user_id, chat_id, alert)
+    if isinstance(alert, MovingAverageAlert):
+        await seed_averages()
 
     await safe_send(
         context.bot,
         chat_id,
-        f"Alert set for {crypto} to be {'above' if direction == 'above' else 'below'} €{target_price}.",
+        f"Alert #{alert.alert_id} set for {crypto} to be {alert.direction} {alert.target_text()}.",
     )
 
-    if isinstance(context.job_queue, JobQueue):
-        context.job_queue.run_repeating(
-            check_alerts,
-            interval=ALERT_INTERVAL,
-            data=alert,
-            name=user_name,
-            chat_id=chat_id,
-            user_id=user_id,
-        )
-    else:
-        await safe_send(context.bot, chat_id, "Job queue is not properly initialized.")
+
+# Function to describe an alert in /listalerts, with the current level of dynamic ones
+def describe(alert: Alert) -> str:
+    line = f"#{alert.alert_id} {alert.crypto} | {alert.direction} | {alert.target_text()}"
+    level = dynamic_alerts.level(alert) if alert.dynamic else None
+    return line if level is None else f"{line} | now €{level:.6g}"
 
 
 # Command handler for the /listalerts command
+@command_error_handler
 async def list_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_name = job_name_for(update)
     user_id = update.effective_user.id if update.effective_user else None
@@ -67,113 +139,68 @@ async def list_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         await safe_send(context.bot, chat_id, f"Hey {user_name}, you have no active alerts.")
         return
 
-    alerts = price_alerts[user_id]
-    alert_list = "\n".join(
-        [f"{alert.crypto} | {alert.direction} | €{alert.target_price}" for alert in alerts]
-    )
+    alerts = price_alerts[user_id].values()
+    alert_list = "\n".join(describe(alert) for alert in alerts)
     await safe_send(context.bot, chat_id, f"Hey {user_name}, your active alerts are:\n{alert_list}")
 
 
 # Command handler for the /removealert command
+@command_error_handler
 async def remove_alert(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id if update.effective_user else None
     chat_id = get_chat_id(update, context)
-    if user_id not in price_alerts:
+    if user_id is None or user_id not in price_alerts:
         await safe_send(context.bot, chat_id, "You have no alerts to remove.")
         return
 
-    if not context.args or len(context.args) < 3:
-        await safe_send(
-            context.bot, chat_id, "Usage: /removealert <crypto> <above/below> <target_price> "
-        )
-        return
-
-    crypto = context.args[0].upper()
-    direction = context.args[1].lower()
-    try:
-        target_price = float(context.args[2])
-    except ValueError:
-        await safe_send(context.bot, chat_id, "Target price must be a number.")
+    usage = "Usage: /removealert <id> or /removealert <crypto> <above/below> <target>"
+    if not context.args or len(context.args) not in (1, 3, 4):
+        await safe_send(context.bot, chat_id, usage)
         return
 
-    try:
-        user_name = job_name_for(update)
-
-        job_queue = context.job_queue
-        if not isinstance(job_queue, JobQueue):
-            await safe_send(context.bot, chat_id, "Job queue is not properly initialized.")
+    # ---------- Find Alert ----------
+    if len(context.args) == 1:
+        try:
+            alert_id = int(context.args[0].lstrip("#"))
+        except ValueError:
+            await safe_send(context.bot, chat_id, usage)
             return
-
-        jobs = list(job_queue.get_jobs_by_name(user_name))
-        flag_removed = False
-
-        for job in jobs:
-            alert = job.data
-            if isinstance(alert, Alert) and (
-                alert.crypto == crypto
-                and alert.direction == direction
-                and alert.target_price == target_price
-            ):
-                job.schedule_removal()
-                flag_removed = True
-                
-        if flag_removed:
-            await safe_send(
-                context.bot, chat_id, f"Removed job for {crypto} to be {direction} €{target_price}."
-            )
-        else:
-            await safe_send(context.bot, chat_id, "Job not found.")
-    except ValueError:
-        await safe_send(context.bot, chat_id, "Job couldn't be removed.")
+        removed_alert = unregister_alert(user_id, alert_id)
+    else:
+        crypto = context.args[0].upper()
+        direction = context.args[1].lower()
+        target, *modifier = (arg.lower() for arg in context.args[2:])
+        parsed = parse_target(target, modifier)
+        if parsed is None:
+            await safe_send(context.bot, chat_id, usage)
+            return
+        found = find_alert(user_id, crypto, direction, *parsed)
+        removed_alert = unregister_alert(user_id, found.alert_id) if found else None
 
     # ---------- Remove Alert ----------
-    try:
-        removed_alert = None
-        for alert in price_alerts.get(user_id, []):
-            if (
-                alert.crypto == crypto
-                and alert.direction == direction
-                and alert.target_price == target_price
-            ):
-                removed_alert = alert
-                break
-
-        if removed_alert:
-            price_alerts[user_id].remove(removed_alert)
-            await safe_send(
-                context.bot,
-                chat_id,
-                f"Removed alert for {removed_alert.crypto} to be {'above' if removed_alert.direction == 'above' else 'below'} €{removed_alert.target_price}.",
-            )
-            await list_alerts(update, context)  # Call list_alerts to show remaining alerts
-            # If there are no alerts left, remove the user entry
-            if not price_alerts[user_id]:  # Cleanup if empty
-                del price_alerts[user_id]
-        else:
-            await safe_send(context.bot, chat_id, "Alert not found.")
-
-    except ValueError:
-        await safe_send(context.bot, chat_id, "Alert couldn't be removed.")
+    if removed_alert:
+        await safe_send(
+            context.bot,
+            chat_id,
+            f"Removed alert for {removed_alert.crypto} to be {removed_alert.direction} {removed_alert.target_text()}.",
+        )
+        await list_alerts(update, context)  # Call list_alerts to show remaining alerts
+    else:
+        await safe_send(context.bot, chat_id, "Alert not found.")
 
 
 # Command handler for the /clearalerts command
+@command_error_handler
 async def clear_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_name = job_name_for(update)
     user_id = update.effective_user.id if update.effective_user else None
     chat_id = get_chat_id(update, context)
-    if user_id not in price_alerts or len(price_alerts[user_id]) == 0:
+    if user_id is None or user_id not in price_alerts or len(price_alerts[user_id]) == 0:
         await safe_send(context.bot, chat_id, f"Hey {user_name}, you have no alerts to clear.")
         return
 
     try:
-        job_queue = context.job_queue
-        if isinstance(job_queue, JobQueue):
-            for job in job_queue.get_jobs_by_name(user_name):
-                job.schedule_removal()
-        else:
-            await safe_send(context.bot, chat_id, "Job queue is not properly initialized.")
-            return
-        del price_alerts[user_id]
+        unregister_user(user_id)
         await safe_send(
             context.bot, chat_id, f"Hey {user_name}, all your alerts have been cleared."
         )
@@ -1,33 +1,48 @@
-import io
+import asyncio
 import logging
+import sys
+import time
+from collections.abc import Awaitable, Callable
 
-import aiohttp
-import matplotlib.pyplot as plt
+from broadcast import stop_broadcast
+from chart_cache import INTERVAL_SECONDS, chart_cache
+from charts import RendererBusyError, close_renderer, get_renderer
+from config import (
+    ALERT_STORE,
+    ALERT_STORE_PATH,
+    FAST_START,
+    PLOT_MAX_CANDLES,
+    POLL_TICK,
+    PRICE_MAX_SYMBOLS,
+    PRICE_QUOTES,
+    PRICE_STREAM,
+    SYMBOLS_REFRESH_INTERVAL,
+    TRAILING_SAVE_INTERVAL,
+)
 from decorators import command_error_handler
-from telegram import InputFile, Update
-from telegram.ext import Application, ContextTypes
-from utils import get_chat_id, get_crypto_price, safe_send
-
-valid_symbols: set[str] = set()
-
-
-async def load_valid_symbols() -> None:
-    url = "https://api.binance.com/api/v3/exchangeInfo"
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    logging.error(f"Could not fetch symbols: {response.status}")
-                    return
-                data = await response.json()
-                valid_symbols = {
-                    s["symbol"].replace("EUR", "")
-                    for s in data["symbols"]
-                    if s["symbol"].endswith("EUR")
-                }
-                logging.info(f"Loaded {len(valid_symbols)} valid symbols")
-    except Exception as e:
-        logging.exception(f"Error loading valid symbols: {e}")
+from jobs import check_alerts, evaluate_price, refresh_symbols, save_trailing, seed_averages
+from market import close_client, start_client
+from metrics import start_metrics_server, stop_metrics_server
+from price_cache import price_cache
+from price_feed import start_feed, stop_feed
+from price_history import price_history
+from sender import start_send_queue, stop_send_queue
+from state import (
+    alert_index,
+    alerts_ready,
+    close_store,
+    dynamic_alerts,
+    fail_restore,
+    restore_alerts,
+    save_trailing_stops,
+    watched_symbols,
+)
+from store import AlertStore, StoredAlert, open_store
+from symbols import symbol_registry
+from telegram import Bot, InputFile, Update
+from telegram.ext import Application, ContextTypes, JobQueue
+from utils import get_chat_id, get_crypto_prices, safe_send, send_photo
+from webhook import stop_webhook
 
 
 # Initialize the bot
@@ -51,20 +66,46 @@ async def help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "Available commands:\n"
         "/start - Start the bot\n"
         "/help - Show this help message\n"
-        "/price <coin> - Get the price of a cryptocurrency\n"
-        "/plot <coin> - Plot the price evolution of a cryptocurrency (last 30 days)\n"
-        "/addalert <crypto> <above/below> <target_price> - Set an alert for a cryptocurrency price\n"
+        "/price <coin> [<coin> ...] [in <currency>] - Get the price of one or more "
+        "cryptocurrencies (in EUR by default, e.g. /price BTC in USDT)\n"
+        "/plot <coin> [interval] [range] - Plot the price evolution of a cryptocurrency "
+        "(default 1d over 30 days, e.g. /plot BTC 1h 7d)\n"
+        "/plot <coin> live [range] - Plot recent prices of a coin that has alerts\n"
+        "/addalert <crypto> <above/below> <target_price | N% | N% trailing | maN> - Set an alert "
+        "on a price, a move from the current price, a trailing stop or a moving-average cross\n"
         "/listalerts - List all your active alerts\n"
-        "/removealert <crypto> <above/below> <target_price> - Remove an alert\n"
+        "/removealert <id> or <crypto> <above/below> <target> - Remove an alert, with the "
+        "target it was added with\n"
         "/clearalerts - Clear all your alerts\n"
-        "/listusers - List all users with alerts",
+        "/listusers [page] - List all users with alerts\n"
+        "/broadcast <message> - Send a message to every user with alerts (admins only)",
     )
 
 
+# Opening a store creates its file and runs schema migrations, so it shares the worker thread
+# with load() rather than blocking the event loop
+def _open_and_load() -> tuple[AlertStore, list[StoredAlert]]:
+    store = open_store(ALERT_STORE, ALERT_STORE_PATH)
+    return store, store.load()
+
+
+# Function to reload persisted alerts; the evaluator and price stream pick them up from the
+# index. Failing is fatal: serving alert commands without the store would lose every change.
+async def load_alerts() -> None:
+    try:
+        store, stored = await asyncio.to_thread(_open_and_load)
+    except BaseException:
+        fail_restore()
+        raise
+    restore_alerts(store, stored)
+    logging.info(f"Restored {len(stored)} alerts from {ALERT_STORE} store")
+    alerts_ready.set()
+    await seed_averages()
+
+
 # Function to set the bot's commands and chat menu button
-async def post_init(application: Application) -> None:
-    await load_valid_symbols()
-    await application.bot.set_my_commands(
+async def set_commands(bot: Bot) -> None:
+    await bot.set_my_commands(
         [
             ("start", "Starts the bot"),
             ("help", "Show some help"),
@@ -75,88 +116,334 @@ async def post_init(application: Application) -> None:
             ("removealert", "Remove an alert"),
             ("clearalerts", "Clear all your alerts"),
             ("listusers", "List all users with alerts"),
+            ("broadcast", "Send a message to every user with alerts"),
         ]
     )
-    await application.bot.set_chat_menu_button()
+    await bot.set_chat_menu_button()
 
 
-# Command handler for the /price command
-@command_error_handler
-async def price(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    chat_id = get_chat_id(update, context)
-    if not context.args:
-        await safe_send(
-            context.bot, chat_id, "Please provide a cryptocurrency symbol. Usage: /price <coin>"
+# Startup steps still running in the background, cancelled if the bot stops first
+_startup_tasks: set[asyncio.Task[None]] = set()
+
+
+async def _run_startup_step(
+    name: str, step: Awaitable[object], on_failure: Callable[[], object] | None = None
+) -> None:
+    started = time.perf_counter()
+    try:
+        await step
+        logging.info(f"Startup step {name} finished in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logging.exception(f"Startup step {name} failed: {e}")
+        if on_failure is not None:
+            on_failure()
+
+
+# Function to shut the bot down from within, whether it polls or serves a webhook
+def stop_application(application: Application) -> None:
+    logging.critical("Stopping the bot")
+    if not stop_webhook():
+        application.stop_running()
+
+
+# Function to start the shared services, then restore alerts, load symbols and register the
+# commands; with FAST_START those last steps run while updates are already being handled
+async def post_init(application: Application) -> None:
+    start_send_queue(application.bot)
+    await start_metrics_server()
+    await start_client()
+    # A snapshot from the previous run validates symbols until the live list arrives
+    symbol_registry.load_snapshot()
+
+    # A single evaluator polls whichever symbols the adaptive scheduler says are due
+    if isinstance(application.job_queue, JobQueue):
+        application.job_queue.run_repeating(
+            check_alerts, interval=POLL_TICK, first=POLL_TICK, name="check_alerts"
+        )
+        application.job_queue.run_repeating(
+            refresh_symbols,
+            interval=SYMBOLS_REFRESH_INTERVAL,
+            first=SYMBOLS_REFRESH_INTERVAL,
+            name="refresh_symbols",
+        )
+        application.job_queue.run_repeating(
+            save_trailing,
+            interval=TRAILING_SAVE_INTERVAL,
+            first=TRAILING_SAVE_INTERVAL,
+            name="save_trailing",
         )
+    else:
+        logging.error("Job queue is not properly initialized, alerts will not be checked.")
+
+    # Stream prices for the symbols with alerts and evaluate them as each tick arrives; alerts
+    # restored below reach the stream through the index callback
+    bot = application.bot
+    feed = (
+        start_feed(lambda symbol, price: evaluate_price(bot, symbol, price), watched_symbols())
+        if PRICE_STREAM
+        else None
+    )
+
+    def watch(_: set[str]) -> None:
+        symbols = watched_symbols()
+        price_history.retain(symbols)
+        if feed is not None:
+            feed.watch(symbols)
+
+    alert_index.on_symbols_changed = dynamic_alerts.on_symbols_changed = watch
+
+    steps: dict[str, Callable[[], Awaitable[object]]] = {
+        "load_alerts": load_alerts,
+        "refresh_symbols": symbol_registry.refresh,
+        "set_commands": lambda: set_commands(application.bot),
+    }
+    if not FAST_START:
+        for step in steps.values():
+            await step()
         return
+    # Alert commands wait for the restore (see update_processor); the rest is served at once
+    alerts_ready.clear()
+    for name, step in steps.items():
+        on_failure = (lambda: stop_application(application)) if name == "load_alerts" else None
+        task = asyncio.create_task(
+            _run_startup_step(name, step(), on_failure), name=f"startup-{name}"
+        )
+        _startup_tasks.add(task)
+        task.add_done_callback(_startup_tasks.discard)
 
-    crypto_id = context.args[0].upper()
-    crypto_price = await get_crypto_price(crypto_id)
-    if crypto_price is None or crypto_price <= 0:
+
+# Function to release shared resources when the bot stops
+async def post_shutdown(application: Application) -> None:
+    for task in list(_startup_tasks):
+        task.cancel()
+    await asyncio.gather(*_startup_tasks, return_exceptions=True)
+    alert_index.on_symbols_changed = dynamic_alerts.on_symbols_changed = None
+    # Saves the chats an unfinished broadcast has not reached, before the send queue stops
+    await stop_broadcast()
+    await stop_feed()
+    await stop_send_queue()
+    await close_client()
+    await stop_metrics_server()
+    save_trailing_stops()
+    await asyncio.to_thread(close_store)
+    close_renderer()
+    # Only loaded once something was plotted
+    if "candles" in sys.modules:
+        sys.modules["candles"].close_candle_store()
+
+
+_CURRENCY_SIGNS = {"EUR": "€", "USD": "$"}
+
+
+def format_price(price: float, quote: str) -> str:
+    amount = round(price, 2)
+    sign = _CURRENCY_SIGNS.get(quote)
+    return f"{sign}{amount}" if sign else f"{amount} {quote}"
+
+
+# Function to look prices up through the shared cache. Alerts are in EUR, so EUR prices are
+# cached under the bare symbol; other quotes under "BTC/USDT".
+async def get_quoted_prices(crypto_ids: list[str], quote: str) -> dict[str, float]:
+    if quote == "EUR":
+        return await price_cache.get_many(crypto_ids, get_crypto_prices)
+
+    async def fetch(keys: set[str]) -> dict[str, float]:
+        fetched = await get_crypto_prices((key.split("/")[0] for key in keys), quote)
+        return {f"{crypto_id}/{quote}": price for crypto_id, price in fetched.items()}
+
+    cached = await price_cache.get_many([f"{crypto_id}/{quote}" for crypto_id in crypto_ids], fetch)
+    return {key.split("/")[0]: price for key, price in cached.items()}
+
+
+# Command handler for the /price command: /price <coin> [<coin> ...] [in <quote>]
+@command_error_handler
+async def price(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    chat_id = get_chat_id(update, context)
+    args = list(context.args or [])
+    quote = "EUR"
+    if len(args) > 2 and args[-2].lower() == "in":
+        quote, args = args[-1].upper(), args[:-2]
+        if quote not in PRICE_QUOTES:
+            await safe_send(
+                context.bot,
+                chat_id,
+                f"Unsupported currency {quote}. Choose one of: {', '.join(PRICE_QUOTES)}",
+            )
+            return
+    if not args:
         await safe_send(
             context.bot,
             chat_id,
-            "Couldn't retrieve price. Please check the symbol and try again later.",
+            "Please provide a cryptocurrency symbol. Usage: /price <coin> [<coin> ...] "
+            "[in <currency>]",
         )
-    else:
+        return
+
+    if len(args) > PRICE_MAX_SYMBOLS:
         await safe_send(
-            context.bot, chat_id, f"The current price of {crypto_id} is €{round(crypto_price, 2)}"
+            context.bot, chat_id, f"Please ask for at most {PRICE_MAX_SYMBOLS} symbols at a time."
         )
+        return
+
+    # Keep the requested order, dropping duplicates
+    crypto_ids = list(dict.fromkeys(arg.upper() for arg in args))
+    unknown = [
+        crypto_id for crypto_id in crypto_ids if not symbol_registry.is_valid(crypto_id, quote)
+    ]
+    if len(crypto_ids) == 1:
+        if unknown:
+            pair = crypto_ids[0] if quote == "EUR" else f"{crypto_ids[0]}/{quote}"
+            await safe_send(context.bot, chat_id, f"Unknown symbol {pair}.")
+            return
+        crypto_id = crypto_ids[0]
+        crypto_price = (await get_quoted_prices([crypto_id], quote)).get(crypto_id)
+        if crypto_price is None or crypto_price <= 0:
+            await safe_send(
+                context.bot,
+                chat_id,
+                "Couldn't retrieve price. Please check the symbol and try again later.",
+            )
+        else:
+            await safe_send(
+                context.bot,
+                chat_id,
+                f"The current price of {crypto_id} is {format_price(crypto_price, quote)}",
+            )
+        return
+
+    # Several symbols: one bulk request and one reply
+    known = [crypto_id for crypto_id in crypto_ids if crypto_id not in unknown]
+    prices = await get_quoted_prices(known, quote)
+    lines = [
+        f"{crypto_id}: {format_price(prices[crypto_id], quote)}"
+        for crypto_id in known
+        if prices.get(crypto_id, 0) > 0
+    ]
+    failed = [crypto_id for crypto_id in known if prices.get(crypto_id, 0) <= 0]
+    if unknown:
+        lines.append(f"Unknown symbols: {', '.join(unknown)}")
+    if failed:
+        lines.append(f"Couldn't retrieve: {', '.join(failed)}")
+    await safe_send(context.bot, chat_id, "Current prices:\n" + "\n".join(lines))
+
+
+_UNIT_NAMES = {"m": "Minutes", "h": "Hours", "d": "Days"}
 
 
-# Function to fetch historical price data
-async def get_historical_prices(crypto_id: str) -> list[float]:
-    url = f"https://api.binance.com/api/v3/klines?symbol={crypto_id}EUR&interval=1d&limit=30"
+# "7 Days", "12 Hours", "90 Minutes" or "1 Week" for a span in seconds
+def describe_span(seconds: int) -> str:
+    for name, unit in (("Week", 7 * 86400), ("Day", 86400), ("Hour", 3600), ("Minute", 60)):
+        if seconds % unit == 0:
+            count = seconds // unit
+            return f"{count} {name}{'s' if count != 1 else ''}"
+    return f"{seconds} Seconds"
+
+
+# Function to chart the prices the alert path recorded for a watched symbol, over `span`
+# seconds or everything held; nothing is fetched and the chart is not cached
+async def plot_live(bot: Bot, chat_id: int, crypto_id: str, span: int | None) -> None:
+    now = time.time()
+    times, prices = price_history.samples(crypto_id, now - span if span else 0.0)
+    if len(prices) < 2:
+        await safe_send(
+            bot,
+            chat_id,
+            f"No live prices recorded for {crypto_id} yet. "
+            "Live charts cover symbols with active alerts.",
+        )
+        return
+    period = describe_span(span or max(60, int(now - times[0]) // 60 * 60))
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    logging.error(f"Could not fetch historical prices: {response.status}")
-                    return []
-                data = await response.json()
-                # Extract closing prices from the response
-                return [float(candle[4]) for candle in data]
-    except Exception as e:
-        logging.exception(f"Error fetching historical prices: {e}")
-        return []
+        chart = await get_renderer().render(
+            crypto_id, prices, period, "Minutes (0 = now)", [(at - now) / 60 for at in times]
+        )
+    except RendererBusyError:
+        await safe_send(
+            bot, chat_id, "Too many charts are being drawn right now. Please try again."
+        )
+        return
+    await send_photo(bot, chat_id, InputFile(chart, filename=f"{crypto_id}_live.png"))
 
 
-# Command handler for the /plot command
+# Command handler for the /plot command: /plot <coin> [interval | live] [range]
 @command_error_handler
 async def plot(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # Imported here so that processes which never plot do not load NumPy
+    from candles import get_candle_store, parse_span
+
     chat_id = get_chat_id(update, context)
-    if not context.args:
-        await safe_send(
-            context.bot, chat_id, "Please provide a cryptocurrency symbol. Usage: /plot <coin>"
-        )
+    usage = "Usage: /plot <coin> [interval | live] [range], e.g. /plot BTC 1h 7d"
+    if not context.args or len(context.args) > 3:
+        await safe_send(context.bot, chat_id, f"Please provide a cryptocurrency symbol. {usage}")
         return
 
     crypto_id = context.args[0].upper()
-    prices = await get_historical_prices(crypto_id)
-    if not prices:
+    if not symbol_registry.is_valid(crypto_id):
+        await safe_send(context.bot, chat_id, f"Unknown symbol {crypto_id}.")
+        return
+
+    interval = context.args[1].lower() if len(context.args) > 1 else "1d"
+    if interval == "live":
+        live_span = parse_span(context.args[2]) if len(context.args) > 2 else None
+        if len(context.args) > 2 and live_span is None:
+            await safe_send(context.bot, chat_id, f"Invalid range. {usage}")
+            return
+        await plot_live(context.bot, chat_id, crypto_id, live_span)
+        return
+
+    if interval not in INTERVAL_SECONDS:
+        await safe_send(
+            context.bot,
+            chat_id,
+            f"Unsupported interval {interval}. Choose one of: {', '.join(INTERVAL_SECONDS)}",
+        )
+        return
+    step = INTERVAL_SECONDS[interval]
+    span = parse_span(context.args[2]) if len(context.args) > 2 else 30 * step
+    if span is None or span < step:
+        await safe_send(context.bot, chat_id, f"Invalid range. {usage}")
+        return
+    count = span // step
+    if count > PLOT_MAX_CANDLES:
         await safe_send(
             context.bot,
             chat_id,
-            "Couldn't retrieve historical prices. Please check the symbol and try again later.",
+            f"That range holds {count} {interval} candles; at most {PLOT_MAX_CANDLES} can be "
+            "plotted. Choose a longer interval or a shorter range.",
         )
         return
 
-    # Generate the plot
-    plt.figure(figsize=(10, 5))
-    plt.plot(prices, marker="o", linestyle="-", color="b")
-    plt.title(f"{crypto_id} Price Evolution (Last 30 Days)")
-    plt.xlabel("Days")
-    plt.ylabel("Price (€)")
-    plt.grid(True)
+    key = (crypto_id, interval, count)
+
+    # Repeat plots within the same candle reuse the uploaded file or the rendered bytes
+    chart = chart_cache.get_chart(key)
+    if chart is None:
+        candles = await get_candle_store().get(crypto_id, interval, time.time() - span)
+        if not len(candles):
+            await safe_send(
+                context.bot,
+                chat_id,
+                "Couldn't retrieve historical prices. Please check the symbol and try again later.",
+            )
+            return
 
-    # Save the plot to a buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    plt.close()
+        # Render off the event loop so other commands and alert checks keep running
+        unit = _UNIT_NAMES[interval[-1]] if interval[:-1] == "1" else f"{interval} Candles"
+        try:
+            chart = await get_renderer().render(
+                crypto_id, candles.close[-count:], describe_span(span), unit
+            )
+        except RendererBusyError:
+            await safe_send(
+                context.bot, chat_id, "Too many charts are being drawn right now. Please try again."
+            )
+            return
+        chart_cache.put_chart(key, chart)
 
     # Send the plot as a photo
-    await context.bot.send_photo(
-        chat_id=chat_id, photo=InputFile(buffer, filename=f"{crypto_id}_plot.png")
+    photo = (
+        InputFile(chart, filename=f"{crypto_id}_plot.png") if isinstance(chart, bytes) else chart
     )
-    buffer.close()
+    message = await send_photo(context.bot, chat_id, photo)
+    if isinstance(chart, bytes) and message.photo:
+        chart_cache.put_chart(key, message.photo[-1].file_id)
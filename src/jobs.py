@@ -1,51 +1,152 @@
 import logging
+import time
 
+from config import MA_SAMPLE_INTERVAL
 from decorators import alert_job
-from models import Alert
-from state import price_alerts
+from metrics import ALERT_EVALUATION, ALERTS_FIRED
+from price_cache import price_cache
+from price_feed import get_feed
+from price_history import price_history
+from sender import PRIORITY_ALERT
+from state import (
+    alert_chats,
+    alert_index,
+    dynamic_alerts,
+    poll_scheduler,
+    save_trailing_stops,
+    unregister_alert,
+)
+from symbols import symbol_registry
+from telegram import Bot
 from telegram.ext import ContextTypes
-from utils import get_chat_id, get_crypto_price, safe_send
+from utils import get_crypto_prices, safe_send
 
+_STREAM_EVALUATION = ALERT_EVALUATION.labels("stream")
+_POLL_EVALUATION = ALERT_EVALUATION.labels("poll")
 
-# Function to check if the alert condition is met
+
+# Function to auto-remove every alert crossed by new prices and collect them per chat.
+# `observed_at` holds the time.monotonic() fetch time of prices that came from the cache.
+def fire_alerts(
+    prices: dict[str, float], observed_at: dict[str, float] | None = None
+) -> dict[int, list[str]]:
+    now = time.time()
+    observed_at = observed_at or {}
+    crossed = []
+    for symbol, price in prices.items():
+        if symbol not in observed_at:
+            price_cache.put(symbol, price)
+        price_history.record(symbol, price, now)
+        crossed.extend(dynamic_alerts.update(symbol, price, now))
+    crossed.extend(
+        (user_id, alert.alert_id, symbol, price)
+        for symbol, price in prices.items()
+        for user_id, alert in alert_index.fired(symbol, price)
+    )
+
+    fired: dict[int, list[str]] = {}
+    for user_id, alert_id, _, price in crossed:
+        # Look the chat up first, removing the alert forgets it
+        chat_id = alert_chats.get(alert_id, user_id)
+        alert = unregister_alert(user_id, alert_id)
+        if alert is not None:
+            ALERTS_FIRED.inc()
+            fired.setdefault(chat_id, []).append(
+                f"Alert: {alert.crypto} {alert.fired_text()} (current price: €{round(price,2)})."
+            )
+    # Reschedule against the thresholds that are left
+    for symbol, price in prices.items():
+        poll_scheduler.observe(symbol, price, observed_at.get(symbol))
+    return fired
+
+
+# Function to send one summary per chat for all the alerts fired in an evaluation pass
+async def notify_fired(bot: Bot, fired: dict[int, list[str]]) -> None:
+    for chat_id, lines in fired.items():
+        removed = (
+            "This alert has been removed."
+            if len(lines) == 1
+            else f"These {len(lines)} alerts have been removed."
+        )
+        await safe_send(
+            bot, chat_id, text="\n".join([*lines, removed]), priority=PRIORITY_ALERT, wait=False
+        )
+
+
+# Function to evaluate a single streamed price tick
+async def evaluate_price(bot: Bot, symbol: str, price: float) -> None:
+    started = time.perf_counter()
+    fired = fire_alerts({symbol: price})
+    _STREAM_EVALUATION.observe(time.perf_counter() - started)
+    await notify_fired(bot, fired)
+
+
+# Function to poll the symbols the scheduler says are due, with a single price snapshot
 @alert_job
 async def check_alerts(context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
-        if context.job is None:
-            logging.error("Job is None, cannot proceed with alert check.")
+        # Symbols with a fresh price from the stream are already evaluated tick by tick
+        feed = get_feed()
+        symbols = poll_scheduler.due(skip=feed.live_symbols() if feed is not None else ())
+        if not symbols:
             return
-        if context.job.data is None:
-            logging.error("Job data is None, cannot proceed with alert check.")
-            return
-        alert: Alert = context.job.data
-        user_id = context.job.user_id
-        price = await get_crypto_price(alert.crypto)
-        if price is None:
-            logging.warning(f"Skipping alert check due to missing price for {alert.crypto}")
-            return
-        if alert.matches(price):
-            chat_id = get_chat_id(None, context)
-            await safe_send(
-                context.bot,
-                chat_id,
-                text=f"Alert: {alert.crypto} is now {'above' if alert.direction == 'above' else 'below'} €{alert.target_price} (current price: €{round(price,2)}).",
-            )
 
-            # Auto-remove
-            user_alerts = price_alerts.get(user_id, [])
-            if alert in user_alerts:
-                user_alerts.remove(alert)
-                await safe_send(
-                    context.bot,
-                    chat_id,
-                    text=f"Alert {alert.crypto} | {alert.direction} | €{alert.target_price} has been removed.",
-                )
-                if not user_alerts:
-                    del price_alerts[user_id]
-                else:
-                    price_alerts[user_id] = user_alerts
-
-            context.job.schedule_removal()
+        prices = await price_cache.get_many(symbols, get_crypto_prices)
+        # Cached prices may be a few seconds old; the volatility estimate needs their real age
+        observed_at = {
+            symbol: stored_at
+            for symbol in prices
+            if (stored_at := price_cache.stored_at(symbol)) is not None
+        }
+        missing = symbols - prices.keys()
+        if missing:
+            logging.warning(f"Skipping alert check due to missing price for {', '.join(missing)}")
+            for symbol in missing:
+                poll_scheduler.failed(symbol)
+
+        started = time.perf_counter()
+        fired = fire_alerts(prices, observed_at)
+        _POLL_EVALUATION.observe(time.perf_counter() - started)
+        await notify_fired(context.bot, fired)
 
     except Exception as e:
         logging.exception(f"Error during alert check: {e}")
+
+
+# Function to fill new moving averages from past 1m candles (MA_SAMPLE_INTERVAL is a
+# minute), so they can fire and be scheduled normally at once instead of after their window
+async def seed_averages() -> None:
+    warming = dynamic_alerts.warming()
+    if not warming:
+        return
+    from candles import get_candle_store
+
+    for symbol, window in warming:
+        now = time.time()
+        try:
+            candles = await get_candle_store().get(
+                symbol, "1m", now - (window + 1) * MA_SAMPLE_INTERVAL
+            )
+        except Exception as e:
+            logging.warning(f"Could not seed {symbol} moving average: {e!r}")
+            continue
+        # The newest candle is still open unless its minute is over
+        closed = candles.open_time // 1000 + MA_SAMPLE_INTERVAL <= now
+        dynamic_alerts.seed(
+            symbol,
+            window,
+            (candles.open_time[closed] // 1000).tolist(),
+            candles.close[closed].tolist(),
+        )
+
+
+# Function to persist how far trailing stops have moved
+@alert_job
+async def save_trailing(context: ContextTypes.DEFAULT_TYPE) -> None:
+    save_trailing_stops()
+
+
+# Function to reload the tradable symbols from Binance in the background
+@alert_job
+async def refresh_symbols(context: ContextTypes.DEFAULT_TYPE) -> None:
+    await symbol_registry.refresh()
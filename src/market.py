@@ -0,0 +1,70 @@
+import logging
+from typing import Any
+
+import aiohttp
+from config import BINANCE_API_URL, HTTP_KEEPALIVE, HTTP_POOL_SIZE, HTTP_TIMEOUT
+
+
+# Long-lived HTTP client for Binance market data, sharing one pooled keep-alive session
+class MarketDataClient:
+    def __init__(
+        self,
+        base_url: str = BINANCE_API_URL,
+        pool_size: int = HTTP_POOL_SIZE,
+        keepalive: float = HTTP_KEEPALIVE,
+        timeout: float = HTTP_TIMEOUT,
+    ) -> None:
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self._session: aiohttp.ClientSession | None = None
+
+    def open(self) -> aiohttp.ClientSession:
+        # Created lazily, as aiohttp sessions must be bound to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size, keepalive_timeout=self.keepalive, ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                raise_for_status=False,
+            )
+        return self._session
+
+    def get(self, path: str, **kwargs: Any) -> Any:
+        return self.open().get(path, **kwargs)
+
+    def ws_connect(self, url: str, **kwargs: Any) -> Any:
+        return self.open().ws_connect(url, **kwargs)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_client: MarketDataClient | None = None
+
+
+def get_client() -> MarketDataClient:
+    global _client
+    if _client is None:
+        _client = MarketDataClient()
+    return _client
+
+
+async def start_client() -> MarketDataClient:
+    client = get_client()
+    client.open()
+    logging.info(f"Market data client ready for {client.base_url}")
+    return client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,257 @@
+import logging
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+
+from aiohttp import web
+from config import METRICS_HOST, METRICS_PORT
+
+# Latency buckets in seconds, from a cached reply up to a slow Binance round trip
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Alert evaluation is in-memory work, so its buckets start much lower
+EVALUATION_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+
+# Metric children are plain attributes mutated from the event loop thread: no locks, and
+# observing a value only bumps preallocated slots. Hot paths bind their child once.
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        registry.append(self)
+
+    def _label_text(self, values: tuple[object, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.label_names, values, strict=True)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        ...
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._children: dict[tuple[object, ...], CounterValue] = {}
+        self._default = None if labels else self.labels()
+
+    def labels(self, *values: object) -> CounterValue:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = CounterValue()
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        assert self._default is not None, f"{self.name} needs label values"
+        self._default.value += amount
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{self._label_text(values)} {_format(child.value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._children: dict[tuple[object, ...], HistogramValue] = {}
+        self._default = None if labels else self.labels()
+
+    def labels(self, *values: object) -> HistogramValue:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = HistogramValue(self.buckets)
+        return child
+
+    def observe(self, value: float) -> None:
+        assert self._default is not None, f"{self.name} needs label values"
+        self._default.observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip((*child.bounds, math.inf), child.counts, strict=True):
+                cumulative += count
+                le = self._label_text(values, f'le="{_format(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(values)} {_format(child.sum)}"
+            yield f"{self.name}_count{self._label_text(values)} {cumulative}"
+
+
+# Read at scrape time from a callback, for values the owning component already tracks
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self.read = read
+
+    def samples(self) -> Iterator[str]:
+        try:
+            value = self.read()
+        except Exception as e:
+            logging.warning(f"Could not read metric {self.name}: {e}")
+            return
+        yield f"{self.name} {_format(value)}"
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry: list[_Metric] = []
+
+
+# Prometheus text exposition format (version 0.0.4)
+def render() -> str:
+    return "".join(metric.render() for metric in registry)
+
+
+COMMAND_LATENCY = Histogram(
+    "bot_command_duration_seconds", "Time to handle a bot command.", ("command",)
+)
+COMMAND_ERRORS = Counter(
+    "bot_command_errors_total", "Commands that raised an unhandled error.", ("command",)
+)
+JOB_LATENCY = Histogram("bot_job_duration_seconds", "Time to run a scheduled job.", ("job",))
+BINANCE_LATENCY = Histogram(
+    "binance_request_duration_seconds", "Binance price request latency.", ("endpoint",)
+)
+BINANCE_RESPONSES = Counter(
+    "binance_responses_total",
+    "Binance price responses by HTTP status (error for network failures).",
+    ("status",),
+)
+# Bound once so counting a response allocates nothing; other statuses fall back to labels()
+_BINANCE_STATUSES = {
+    status: BINANCE_RESPONSES.labels(status)
+    for status in (200, 400, 403, 404, 418, 429, 500, 502, 503, 504)
+}
+PRICE_LOOKUP_RETRIES = Counter(
+    "price_retries_total", "Price lookups retried after every provider failed."
+)
+PRICE_HEDGES = Counter(
+    "price_hedged_requests_total", "Backup price requests sent after a slow response."
+)
+PROVIDER_FAILURES = Counter(
+    "price_provider_failures_total", "Failed price requests by provider.", ("provider",)
+)
+PRICE_CACHE_LOOKUPS = Counter(
+    "price_cache_lookups_total",
+    "Price cache lookups by result (coalesced: joined a fetch already in flight).",
+    ("result",),
+)
+CHART_CACHE_LOOKUPS = Counter(
+    "chart_cache_lookups_total", "/plot chart cache lookups by result.", ("result",)
+)
+CHART_CACHE_EVICTIONS = Counter(
+    "chart_cache_evictions_total", "Charts dropped to stay within the chart cache bounds."
+)
+ALERT_EVALUATION = Histogram(
+    "alert_evaluation_seconds",
+    "Time to evaluate the alerts for one price tick.",
+    ("source",),
+    EVALUATION_BUCKETS,
+)
+ALERTS_FIRED = Counter("alerts_fired_total", "Alerts that fired and were removed.")
+SEND_FAILURES = Counter("telegram_send_failures_total", "Telegram messages that failed to send.")
+
+
+def binance_response(status: int) -> CounterValue:
+    child = _BINANCE_STATUSES.get(status)
+    return BINANCE_RESPONSES.labels(status) if child is None else child
+
+
+class MetricsServer:
+    def __init__(self, host: str = METRICS_HOST, port: int = METRICS_PORT) -> None:
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        return app
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+_server: MetricsServer | None = None
+
+
+async def start_metrics_server() -> MetricsServer | None:
+    global _server
+    if METRICS_PORT == 0:
+        return None
+    if _server is None:
+        _server = MetricsServer()
+        try:
+            await _server.start()
+        except OSError as e:
+            logging.error(f"Could not start metrics server: {e}")
+            _server = None
+    return _server
+
+
+async def stop_metrics_server() -> None:
+    global _server
+    if _server is not None:
+        await _server.stop()
+        _server = None
@@ -1,16 +1,156 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import ClassVar
 
 
-@dataclass
+# A StrEnum, so members still compare equal to "above"/"below" and format as plain text
+class Direction(StrEnum):
+    ABOVE = "above"
+    BELOW = "below"
+
+
+class AlertKind(StrEnum):
+    PRICE = "price"  # fixed target price
+    PERCENT = "percent"  # move by a percentage from the price when the alert was set
+    TRAILING = "trailing"  # retreat by a percentage from the running high (below) or low (above)
+    MOVING_AVERAGE = "ma"  # price crossing its moving average
+
+
+# Slotted and frozen: no per-instance __dict__, and the symbol string is interned so a
+# million alerts on a handful of coins share a handful of strings.
+@dataclass(frozen=True, slots=True)
 class Alert:
+    kind: ClassVar[AlertKind] = AlertKind.PRICE
+    # Fixed-target alerts live in the sorted AlertIndex; dynamic ones, whose trigger moves
+    # with the price, in the DynamicAlerts evaluator
+    dynamic: ClassVar[bool] = False
+
     crypto: str
-    direction: str
+    direction: Direction
     target_price: float
+    # Stable identifier assigned when the alert is registered; not part of equality
+    alert_id: int = field(default=0, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "crypto", sys.intern(self.crypto))
+        object.__setattr__(self, "direction", Direction(self.direction))
 
     def matches(self, price: float) -> bool:
-        return (self.direction == "above" and price >= self.target_price) or (
-            self.direction == "below" and price <= self.target_price
-        )
+        if self.direction is Direction.ABOVE:
+            return price >= self.target_price
+        return price <= self.target_price
+
+    def target_text(self) -> str:
+        return f"€{self.target_price}"
+
+    def fired_text(self) -> str:
+        return f"is now {self.direction} €{self.target_price}"
 
     def __str__(self) -> str:
-        return f"{self.crypto} {self.direction} €{self.target_price}"
+        return f"{self.crypto} {self.direction} {self.target_text()}"
+
+
+# A percentage move from the price when the alert was set. Its target is fixed at creation,
+# so it is indexed and evaluated exactly like a price alert.
+@dataclass(frozen=True, slots=True)
+class PercentMoveAlert(Alert):
+    kind: ClassVar[AlertKind] = AlertKind.PERCENT
+
+    percent: float = 0.0
+    reference: float = 0.0  # price when the alert was set
+
+    @classmethod
+    def from_price(
+        cls, crypto: str, direction: Direction, percent: float, price: float
+    ) -> "PercentMoveAlert":
+        factor = 1 + percent / 100 if direction is Direction.ABOVE else 1 - percent / 100
+        return cls(crypto, direction, round(price * factor, 8), percent=percent, reference=price)
+
+    def target_text(self) -> str:
+        sign = "+" if self.direction is Direction.ABOVE else "-"
+        return f"€{self.target_price:g} ({sign}{self.percent:g}% from €{self.reference:g})"
+
+
+# Trailing stop: "below" fires once the price falls `percent` from its highest point since
+# the alert was set, "above" once it rises `percent` from its lowest
+@dataclass(frozen=True, slots=True)
+class TrailingStopAlert(Alert):
+    kind: ClassVar[AlertKind] = AlertKind.TRAILING
+    dynamic: ClassVar[bool] = True
+
+    percent: float = 0.0
+    reference: float = 0.0  # running high (below) or low (above) when last saved
+
+    @classmethod
+    def from_price(
+        cls, crypto: str, direction: Direction, percent: float, price: float
+    ) -> "TrailingStopAlert":
+        return cls(
+            crypto,
+            direction,
+            trigger_level(direction, percent, price),
+            percent=percent,
+            reference=price,
+        )
+
+    def target_text(self) -> str:
+        extreme = "high" if self.direction is Direction.BELOW else "low"
+        return f"{self.percent:g}% trailing from the {extreme}"
+
+    def fired_text(self) -> str:
+        if self.direction is Direction.BELOW:
+            return f"fell {self.percent:g}% from its high"
+        return f"rose {self.percent:g}% from its low"
+
+
+# Price crossing its simple moving average over `window` samples (one per MA_SAMPLE_INTERVAL).
+# Fires on the first cross in `direction` once the average is known; no fixed target.
+@dataclass(frozen=True, slots=True)
+class MovingAverageAlert(Alert):
+    kind: ClassVar[AlertKind] = AlertKind.MOVING_AVERAGE
+    dynamic: ClassVar[bool] = True
+
+    window: int = 0
+
+    def target_text(self) -> str:
+        return f"MA{self.window}"
+
+    def fired_text(self) -> str:
+        return f"crossed {self.direction} its MA{self.window}"
+
+
+def trigger_level(direction: Direction, percent: float, extreme: float) -> float:
+    return extreme * (1 - percent / 100 if direction is Direction.BELOW else 1 + percent / 100)
+
+
+# Kind-specific parameters as persisted next to the common fields: (kind, amount, reference)
+def alert_params(alert: Alert) -> tuple[AlertKind, float, float]:
+    if isinstance(alert, PercentMoveAlert | TrailingStopAlert):
+        return alert.kind, alert.percent, alert.reference
+    if isinstance(alert, MovingAverageAlert):
+        return alert.kind, alert.window, 0.0
+    return alert.kind, 0.0, 0.0
+
+
+def build_alert(
+    crypto: str,
+    direction: Direction,
+    target_price: float,
+    alert_id: int = 0,
+    kind: AlertKind = AlertKind.PRICE,
+    amount: float = 0.0,
+    reference: float = 0.0,
+) -> Alert:
+    kind = AlertKind(kind)
+    if kind is AlertKind.PERCENT:
+        return PercentMoveAlert(
+            crypto, direction, target_price, alert_id, percent=amount, reference=reference
+        )
+    if kind is AlertKind.TRAILING:
+        return TrailingStopAlert(
+            crypto, direction, target_price, alert_id, percent=amount, reference=reference
+        )
+    if kind is AlertKind.MOVING_AVERAGE:
+        return MovingAverageAlert(crypto, direction, target_price, alert_id, window=int(amount))
+    return Alert(crypto, direction, target_price, alert_id)
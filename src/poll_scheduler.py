@@ -0,0 +1,147 @@
+import math
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Protocol
+
+from config import (
+    ALERT_INTERVAL,
+    POLL_BUDGET,
+    POLL_MAX_INTERVAL,
+    POLL_MIN_INTERVAL,
+    POLL_SIGMAS,
+)
+from sender import TokenBucket
+
+# Floor for the volatility estimate (about 0.03% per day), so a flat price still gets polled
+_MIN_VARIANCE = 1e-12
+# Weight of the newest observation in the volatility average
+_VARIANCE_WEIGHT = 0.3
+
+
+# Where thresholds come from: the AlertIndex, and the dynamic alerts whose triggers move
+class Thresholds(Protocol):
+    def symbols(self) -> set[str]:
+        ...
+
+    def nearest(self, symbol: str, price: float) -> float | None:
+        ...
+
+
+@dataclass
+class _Schedule:
+    due: float
+    price: float | None = None
+    seen: float = 0.0
+    variance: float | None = None  # moving average of squared log return per second
+
+
+# Decides when each symbol with alerts is polled next. The interval is the time the price
+# would need to reach its nearest threshold at POLL_SIGMAS standard deviations of recent
+# volatility, clamped to [min_interval, max_interval]. Every due symbol is looked up in one
+# bulk request, and a token bucket caps how many of those requests are made.
+class PollScheduler:
+    def __init__(
+        self,
+        index: Thresholds,
+        min_interval: float = POLL_MIN_INTERVAL,
+        max_interval: float = POLL_MAX_INTERVAL,
+        default_interval: float = ALERT_INTERVAL,
+        budget: float = POLL_BUDGET,
+        sigmas: float = POLL_SIGMAS,
+        others: Iterable[Thresholds] = (),
+    ) -> None:
+        self.indexes = [index, *others]
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.sigmas = sigmas
+        # Enough burst to catch up on a few requests skipped while the stream covered everything
+        self._budget = TokenBucket(budget, max(1.0, budget * min_interval))
+        self._symbols: dict[str, _Schedule] = {}
+
+    # A new alert may sit right next to the price, so check its symbol on the next pass
+    def wake(self, symbol: str) -> None:
+        schedule = self._symbols.get(symbol)
+        if schedule is None:
+            self._symbols[symbol] = _Schedule(due=0.0)
+        else:
+            schedule.due = 0.0
+
+    def observe(self, symbol: str, price: float, now: float | None = None) -> None:
+        schedule = self._symbols.get(symbol)
+        if schedule is None:
+            return
+        now = time.monotonic() if now is None else now
+        if schedule.price and price > 0 and now > schedule.seen:
+            sample = math.log(price / schedule.price) ** 2 / (now - schedule.seen)
+            schedule.variance = (
+                sample
+                if schedule.variance is None
+                else schedule.variance + _VARIANCE_WEIGHT * (sample - schedule.variance)
+            )
+        schedule.price, schedule.seen = price, now
+        schedule.due = now + self.interval(symbol)
+
+    # Retry soon after a failed lookup rather than waiting out a long interval
+    def failed(self, symbol: str, now: float | None = None) -> None:
+        schedule = self._symbols.get(symbol)
+        if schedule is not None:
+            schedule.due = (time.monotonic() if now is None else now) + self.min_interval
+
+    def interval(self, symbol: str) -> float:
+        schedule = self._symbols.get(symbol)
+        if schedule is None or not schedule.price:
+            return self.default_interval
+        price = schedule.price
+        nearest = min(
+            (
+                level
+                for index in self.indexes
+                if (level := index.nearest(symbol, price)) is not None
+            ),
+            key=lambda level: abs(level - price),
+            default=None,
+        )
+        if nearest is None or nearest <= 0:
+            return self.max_interval
+        if schedule.variance is None:
+            return min(self.default_interval, self.max_interval)
+        distance = abs(math.log(nearest / price))
+        sigma = math.sqrt(max(schedule.variance, _MIN_VARIANCE))
+        seconds = (distance / (self.sigmas * sigma)) ** 2
+        return min(max(seconds, self.min_interval), self.max_interval)
+
+    def volatility(self, symbol: str) -> float | None:
+        schedule = self._symbols.get(symbol)
+        if schedule is None or schedule.variance is None:
+            return None
+        return math.sqrt(schedule.variance)
+
+    # Symbols to poll now, all fetched with a single request, or none while the request
+    # budget is spent. Skipped symbols (covered by the price stream) stay due and are picked
+    # up if the stream goes stale.
+    def due(self, skip: Iterable[str] = (), now: float | None = None) -> set[str]:
+        now = time.monotonic() if now is None else now
+        self._sync()
+        skipped = set(skip)
+        selected = {
+            symbol
+            for symbol, schedule in self._symbols.items()
+            if schedule.due <= now and symbol not in skipped
+        }
+        if not selected or self._budget.delay(now) > 0:
+            return set()
+        self._budget.consume(now)
+        return selected
+
+    def _sync(self) -> None:
+        symbols = set().union(*(index.symbols() for index in self.indexes))
+        for symbol in symbols - self._symbols.keys():
+            self._symbols[symbol] = _Schedule(due=0.0)
+        for symbol in self._symbols.keys() - symbols:
+            del self._symbols[symbol]
+
+    def clear(self) -> None:
+        self._symbols.clear()
+        self._budget.tokens = self._budget.burst
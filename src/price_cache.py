@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+
+from config import PRICE_CACHE_SIZE, PRICE_CACHE_TTL
+from metrics import PRICE_CACHE_LOOKUPS
+
+_HITS = PRICE_CACHE_LOOKUPS.labels("hit")
+_MISSES = PRICE_CACHE_LOOKUPS.labels("miss")
+_COALESCED = PRICE_CACHE_LOOKUPS.labels("coalesced")
+
+
+# In-process TTL + LRU price cache where concurrent misses for a symbol share one fetch
+class PriceCache:
+    def __init__(self, ttl: float = PRICE_CACHE_TTL, max_size: int = PRICE_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()  # price, stored_at
+        self._inflight: dict[str, asyncio.Future[float | None]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_fresh(self, symbol: str) -> float | None:
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return None
+        price, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[symbol]
+            return None
+        self._entries.move_to_end(symbol)
+        return price
+
+    # When the cached price of `symbol` was fetched, on the time.monotonic() clock
+    def stored_at(self, symbol: str) -> float | None:
+        entry = self._entries.get(symbol)
+        return None if entry is None else entry[1]
+
+    def put(self, symbol: str, price: float) -> None:
+        self._entries[symbol] = (price, time.monotonic())
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(
+        self, symbol: str, fetch: Callable[[str], Awaitable[float | None]]
+    ) -> float | None:
+        prices = await self.get_many([symbol], lambda _: self._fetch_one(symbol, fetch))
+        return prices.get(symbol)
+
+    async def get_many(
+        self,
+        symbols: Iterable[str],
+        fetch_many: Callable[[set[str]], Awaitable[dict[str, float]]],
+    ) -> dict[str, float]:
+        prices: dict[str, float] = {}
+        waiting: dict[str, asyncio.Future[float | None]] = {}
+        to_fetch: set[str] = set()
+        for symbol in set(symbols):
+            price = self.get_fresh(symbol)
+            if price is not None:
+                self.hits += 1
+                _HITS.inc()
+                prices[symbol] = price
+            elif symbol in self._inflight:
+                self.coalesced += 1
+                _COALESCED.inc()
+                waiting[symbol] = self._inflight[symbol]
+            else:
+                self.misses += 1
+                _MISSES.inc()
+                to_fetch.add(symbol)
+
+        if to_fetch:
+            loop = asyncio.get_running_loop()
+            futures = {symbol: loop.create_future() for symbol in to_fetch}
+            self._inflight.update(futures)
+            fetched: dict[str, float] = {}
+            try:
+                fetched = await fetch_many(to_fetch)
+                for symbol, price in fetched.items():
+                    self.put(symbol, price)
+                prices.update(fetched)
+            finally:
+                # Waiters get None on failure; the error itself propagates to this caller only
+                for symbol, future in futures.items():
+                    self._inflight.pop(symbol, None)
+                    if not future.done():
+                        future.set_result(fetched.get(symbol))
+
+        for symbol, future in waiting.items():
+            # Shielded so a cancelled waiter does not cancel the shared fetch
+            price = await asyncio.shield(future)
+            if price is not None:
+                prices[symbol] = price
+        return prices
+
+    async def _fetch_one(
+        self, symbol: str, fetch: Callable[[str], Awaitable[float | None]]
+    ) -> dict[str, float]:
+        price = await fetch(symbol)
+        return {} if price is None else {symbol: price}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = self.coalesced = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+# Shared cache used by /price and the alert evaluator
+price_cache = PriceCache()
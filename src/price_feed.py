@@ -0,0 +1,162 @@
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import aiohttp
+from config import ALERT_INTERVAL, BINANCE_WS_URL, STREAM_RECONNECT_MAX, STREAM_RECONNECT_MIN
+from market import get_client
+
+PriceCallback = Callable[[str, float], Awaitable[None]]
+
+
+def stream_name(crypto_id: str) -> str:
+    return f"{crypto_id.lower()}eur@miniTicker"
+
+
+# Websocket subscription to Binance miniTicker streams for the symbols that have alerts
+class PriceFeed:
+    def __init__(
+        self,
+        on_price: PriceCallback,
+        url: str = BINANCE_WS_URL,
+        reconnect_min: float = STREAM_RECONNECT_MIN,
+        reconnect_max: float = STREAM_RECONNECT_MAX,
+    ) -> None:
+        self.on_price = on_price
+        self.url = url
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.connected = False
+        self._wanted: set[str] = set()
+        self._subscribed: set[str] = set()
+        self._last_tick: dict[str, float] = {}  # symbol -> monotonic time of last price
+        self._changed = asyncio.Event()
+        self._request_ids = itertools.count(1)
+        self._task: asyncio.Task[None] | None = None
+
+    def watch(self, symbols: set[str]) -> None:
+        self._wanted = set(symbols)
+        self._changed.set()
+
+    def live_symbols(self, max_age: float = ALERT_INTERVAL) -> set[str]:
+        if not self.connected:
+            return set()
+        now = time.monotonic()
+        return {
+            symbol
+            for symbol in self._subscribed
+            if now - self._last_tick.get(symbol, float("-inf")) <= max_age
+        }
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="price_feed")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        backoff = self.reconnect_min
+        while True:
+            try:
+                async with get_client().ws_connect(self.url, heartbeat=30) as ws:
+                    logging.info(f"Price stream connected to {self.url}")
+                    self.connected = True
+                    backoff = self.reconnect_min
+                    await self._consume(ws)
+                logging.warning("Price stream closed by server")
+            except (aiohttp.ClientError, TimeoutError, OSError) as e:
+                logging.warning(f"Price stream connection failed: {e!r}")
+            finally:
+                self.connected = False
+                self._subscribed.clear()
+
+            # Jittered exponential backoff before reconnecting
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.reconnect_max)
+
+    async def _consume(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        self._changed.set()
+        sync_task = asyncio.create_task(self._sync_subscriptions(ws))
+        try:
+            async for message in ws:
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    await self._handle(json.loads(message.data))
+                elif message.type == aiohttp.WSMsgType.ERROR:
+                    break
+        finally:
+            sync_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await sync_task
+
+    async def _sync_subscriptions(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            wanted = set(self._wanted)
+            added, removed = wanted - self._subscribed, self._subscribed - wanted
+            if removed:
+                await self._send(ws, "UNSUBSCRIBE", removed)
+                for symbol in removed:
+                    self._last_tick.pop(symbol, None)
+            if added:
+                await self._send(ws, "SUBSCRIBE", added)
+            self._subscribed = wanted
+
+    async def _send(
+        self, ws: aiohttp.ClientWebSocketResponse, method: str, symbols: set[str]
+    ) -> None:
+        params = [stream_name(symbol) for symbol in sorted(symbols)]
+        await ws.send_json({"method": method, "params": params, "id": next(self._request_ids)})
+
+    async def _handle(self, payload: Any) -> None:
+        # Subscription acknowledgements look like {"result": null, "id": 1}
+        if not isinstance(payload, dict) or payload.get("e") != "24hrMiniTicker":
+            return
+        pair: str = payload["s"]
+        if not pair.endswith("EUR"):
+            return
+        symbol = pair.removesuffix("EUR")
+        try:
+            price = float(payload["c"])
+        except (KeyError, ValueError) as e:
+            logging.error(f"Error parsing streamed price for {symbol}: {e}")
+            return
+        self._last_tick[symbol] = time.monotonic()
+        try:
+            await self.on_price(symbol, price)
+        except Exception as e:
+            logging.exception(f"Error handling streamed price for {symbol}: {e}")
+
+
+_feed: PriceFeed | None = None
+
+
+def get_feed() -> PriceFeed | None:
+    return _feed
+
+
+def start_feed(on_price: PriceCallback, symbols: set[str]) -> PriceFeed:
+    global _feed
+    if _feed is None:
+        _feed = PriceFeed(on_price)
+    _feed.watch(symbols)
+    _feed.start()
+    return _feed
+
+
+async def stop_feed() -> None:
+    global _feed
+    if _feed is not None:
+        await _feed.stop()
+        _feed = None
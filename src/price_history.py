@@ -0,0 +1,97 @@
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from config import PRICE_HISTORY_RESOLUTION, PRICE_HISTORY_SAMPLES
+
+
+# Fixed-capacity ring of (time, price) samples in two preallocated arrays of doubles
+class _Ring:
+    __slots__ = ("times", "prices", "start", "size")
+
+    def __init__(self, capacity: int) -> None:
+        self.times = array("d", bytes(8 * capacity))
+        self.prices = array("d", bytes(8 * capacity))
+        self.start = 0  # index of the oldest sample
+        self.size = 0
+
+    def last(self) -> int:
+        return (self.start + self.size - 1) % len(self.times)
+
+    def append(self, at: float, price: float) -> None:
+        capacity = len(self.times)
+        if self.size < capacity:
+            index = (self.start + self.size) % capacity
+            self.size += 1
+        else:
+            # Full: the oldest sample makes room
+            index = self.start
+            self.start = (self.start + 1) % capacity
+        self.times[index] = at
+        self.prices[index] = price
+
+    # Samples oldest first, as new arrays
+    def ordered(self) -> tuple[array, array]:
+        end = self.start + self.size
+        if end <= len(self.times):
+            return self.times[self.start : end], self.prices[self.start : end]
+        wrapped = end - len(self.times)
+        return (
+            self.times[self.start :] + self.times[:wrapped],
+            self.prices[self.start :] + self.prices[:wrapped],
+        )
+
+
+# Recent prices of the watched symbols, recorded from the prices the alert path already
+# fetches or streams, so intraday charts cost no requests. At most one sample is kept per
+# `resolution` seconds (the latest) and `capacity` per symbol.
+class PriceHistory:
+    def __init__(
+        self,
+        resolution: float = PRICE_HISTORY_RESOLUTION,
+        capacity: int = PRICE_HISTORY_SAMPLES,
+    ) -> None:
+        self.resolution = resolution
+        self.capacity = capacity
+        self._rings: dict[str, _Ring] = {}
+
+    def record(self, symbol: str, price: float, now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        ring = self._rings.get(symbol)
+        if ring is None:
+            ring = self._rings[symbol] = _Ring(self.capacity)
+        elif ring.size:
+            last = ring.last()
+            if now // self.resolution == ring.times[last] // self.resolution:
+                ring.times[last] = now
+                ring.prices[last] = price
+                return
+            if now < ring.times[last]:
+                return  # out of order, e.g. a slow poll answered after a newer stream tick
+        ring.append(now, price)
+
+    # (times, prices) of the samples recorded at or after `since`, oldest first
+    def samples(self, symbol: str, since: float = 0.0) -> tuple[array, array]:
+        ring = self._rings.get(symbol)
+        if ring is None:
+            return array("d"), array("d")
+        times, prices = ring.ordered()
+        first = bisect_left(times, since)
+        return times[first:], prices[first:]
+
+    # Drops the history of symbols that are no longer watched
+    def retain(self, symbols: Iterable[str]) -> None:
+        keep = set(symbols)
+        for symbol in self._rings.keys() - keep:
+            del self._rings[symbol]
+
+    def symbols(self) -> set[str]:
+        return set(self._rings)
+
+    def clear(self) -> None:
+        self._rings.clear()
+
+
+# Shared history fed by the alert evaluator
+price_history = PriceHistory()
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Sequence
+from typing import Any
+
+import aiohttp
+from config import (
+    BREAKER_COOLDOWN,
+    BREAKER_FAILURES,
+    HEDGE_DEFAULT_DELAY,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_QUANTILE,
+    HEDGE_WINDOW,
+    PRICE_BACKOFF_BASE,
+    PRICE_BACKOFF_MAX,
+    PRICE_PROVIDERS,
+    PRICE_RETRIES,
+)
+from market import MarketDataClient, get_client
+from metrics import (
+    BINANCE_LATENCY,
+    BINANCE_RESPONSES,
+    PRICE_HEDGES,
+    PRICE_LOOKUP_RETRIES,
+    PROVIDER_FAILURES,
+    HistogramValue,
+    binance_response,
+)
+
+PriceTask = asyncio.Task[dict[str, float]]
+
+
+# The provider could not answer (network error, rate limit, server error); worth retrying
+# elsewhere or later. Unknown pairs are not errors: they are just missing from the result.
+class ProviderError(Exception):
+    pass
+
+
+class PriceProvider(ABC):
+    name = "provider"
+
+    # Prices of `bases` quoted in `quote`, leaving out pairs the provider does not list
+    @abstractmethod
+    async def prices(self, bases: Sequence[str], quote: str) -> dict[str, float]:
+        ...
+
+
+_PRICE_LATENCY = BINANCE_LATENCY.labels("ticker_price")
+_BULK_PRICE_LATENCY = BINANCE_LATENCY.labels("ticker_price_bulk")
+_NETWORK_ERRORS = BINANCE_RESPONSES.labels("error")
+
+
+class BinanceProvider(PriceProvider):
+    name = "binance"
+
+    def __init__(self, client: MarketDataClient | None = None) -> None:
+        self._client = client
+
+    @property
+    def client(self) -> MarketDataClient:
+        return self._client or get_client()
+
+    async def prices(self, bases: Sequence[str], quote: str) -> dict[str, float]:
+        if len(bases) == 1:
+            price = await self._ticker(bases[0], quote)
+            return {} if price is None else {bases[0]: price}
+        pairs = json.dumps([f"{base}{quote}" for base in bases], separators=(",", ":"))
+        data = await self._get({"symbols": pairs}, _BULK_PRICE_LATENCY)
+        if data is None:
+            # Binance rejects the whole batch if a single symbol is unknown
+            logging.warning(f"Binance rejected a bulk {quote} price request, asking per symbol")
+            results = await asyncio.gather(*(self._ticker(base, quote) for base in bases))
+            return {
+                base: price for base, price in zip(bases, results, strict=True) if price is not None
+            }
+        try:
+            return {item["symbol"].removesuffix(quote): float(item["price"]) for item in data}
+        except (KeyError, ValueError, TypeError) as e:
+            raise ProviderError(f"Malformed bulk price response: {e!r}") from e
+
+    async def _ticker(self, base: str, quote: str) -> float | None:
+        data = await self._get({"symbol": f"{base}{quote}"}, _PRICE_LATENCY)
+        if data is None:
+            return None
+        try:
+            return float(data["price"])
+        except (KeyError, ValueError, TypeError) as e:
+            raise ProviderError(f"Malformed price response for {base}{quote}: {e!r}") from e
+
+    # Decoded JSON, or None for a request Binance refuses (e.g. an unknown symbol)
+    async def _get(self, params: dict[str, str], latency: HistogramValue) -> Any:
+        started = time.perf_counter()
+        try:
+            async with self.client.get("/api/v3/ticker/price", params=params) as response:
+                latency.observe(time.perf_counter() - started)
+                binance_response(response.status).inc()
+                # 429 and 418 are rate limits; 4xx otherwise means the request itself is bad
+                if response.status in (418, 429) or response.status >= 500:
+                    raise ProviderError(f"Binance API responded with {response.status}")
+                if response.status != 200:
+                    return None
+                return await response.json()
+        except (aiohttp.ClientError, TimeoutError) as e:
+            _NETWORK_ERRORS.inc()
+            raise ProviderError(f"Network error: {e!r}") from e
+
+
+# Stops sending requests to a provider after `failures` consecutive failures. Once `cooldown`
+# has passed a single trial request goes through: success closes the circuit, failure keeps it
+# open for another cooldown.
+class CircuitBreaker:
+    def __init__(
+        self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN
+    ) -> None:
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+
+    @property
+    def open(self) -> bool:
+        return self.failures >= self.threshold
+
+    def allow(self, now: float | None = None) -> bool:
+        if not self.open:
+            return True
+        now = time.monotonic() if now is None else now
+        if now - self.opened_at < self.cooldown:
+            return False
+        self.opened_at = now  # the trial; others wait for its outcome or another cooldown
+        return True
+
+    def success(self) -> None:
+        self.failures = 0
+
+    def failure(self, now: float | None = None) -> None:
+        self.failures += 1
+        if self.open:
+            self.opened_at = time.monotonic() if now is None else now
+
+
+# Breaker and recent response times of one provider
+class _Health:
+    def __init__(self) -> None:
+        self.breaker = CircuitBreaker()
+        self.latencies: deque[float] = deque(maxlen=HEDGE_WINDOW)
+
+    # How long to wait for this provider before hedging: its HEDGE_QUANTILE latency
+    def hedge_delay(self) -> float:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(HEDGE_QUANTILE * len(ordered)))]
+
+
+# Full jitter: a random wait up to an exponentially growing, capped bound
+def backoff_delay(attempt: int) -> float:
+    return random.uniform(0, min(PRICE_BACKOFF_MAX, PRICE_BACKOFF_BASE * 2**attempt))
+
+
+# Looks prices up from a list of providers in order of preference. A slow request is hedged
+# with a second one, a failed request fails over to the next provider with a closed circuit,
+# and when all of them fail the lookup is retried after a jittered exponential backoff.
+class PriceService:
+    def __init__(self, providers: Sequence[PriceProvider], retries: int = PRICE_RETRIES) -> None:
+        if not providers:
+            raise ValueError("At least one price provider is required")
+        self.providers = list(providers)
+        self.retries = retries
+        self.health = {provider: _Health() for provider in self.providers}
+
+    async def price(self, base: str, quote: str) -> float | None:
+        return (await self.prices([base], quote)).get(base)
+
+    async def prices(self, bases: Sequence[str], quote: str) -> dict[str, float]:
+        bases = list(bases)
+        for attempt in range(self.retries):
+            if attempt:
+                PRICE_LOOKUP_RETRIES.inc()
+                await asyncio.sleep(backoff_delay(attempt))
+            try:
+                return await self._request(bases, quote)
+            except ProviderError as e:
+                logging.warning(f"Price lookup failed (attempt {attempt + 1}): {e}")
+        logging.error(f"Failed to get {quote} prices for {', '.join(bases)}")
+        return {}
+
+    def _next(self, untried: list[PriceProvider]) -> PriceProvider | None:
+        while untried:
+            provider = untried.pop(0)
+            if self.health[provider].breaker.allow():
+                return provider
+        return None
+
+    async def _call(
+        self, provider: PriceProvider, bases: list[str], quote: str
+    ) -> dict[str, float]:
+        health = self.health[provider]
+        started = time.monotonic()
+        try:
+            result = await provider.prices(bases, quote)
+        except asyncio.CancelledError:
+            # Lost to a hedge: the provider took at least this long. Leaving the slow request
+            # out would pull the quantile down and hedge ever more often.
+            health.latencies.append(time.monotonic() - started)
+            raise
+        except ProviderError as e:
+            PROVIDER_FAILURES.labels(provider.name).inc()
+            health.breaker.failure()
+            raise ProviderError(f"{provider.name}: {e}") from e
+        health.breaker.success()
+        health.latencies.append(time.monotonic() - started)
+        return result
+
+    async def _request(self, bases: list[str], quote: str) -> dict[str, float]:
+        untried = list(self.providers)
+        primary = self._next(untried)
+        if primary is None:
+            raise ProviderError("every provider's circuit is open")
+        pending: set[PriceTask] = {asyncio.create_task(self._call(primary, bases, quote))}
+        hedge_delay: float | None = self.health[primary].hedge_delay()
+        error = ProviderError("no provider answered")
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Slower than usual: ask again, elsewhere if possible, and take the first
+                    hedge_delay = None
+                    backup = self._next(untried) or primary
+                    PRICE_HEDGES.inc()
+                    pending.add(asyncio.create_task(self._call(backup, bases, quote)))
+                    continue
+                for task in done:
+                    exception = task.exception()
+                    if exception is None:
+                        return task.result()
+                    if not isinstance(exception, ProviderError):
+                        raise exception
+                    error = exception
+                if not pending:
+                    failover = self._next(untried)
+                    if failover is not None:
+                        pending.add(asyncio.create_task(self._call(failover, bases, quote)))
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            # Let the losers unwind, recording their latency, before the caller moves on
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+_PROVIDERS: dict[str, type[PriceProvider]] = {"binance": BinanceProvider}
+
+
+def open_providers(names: Sequence[str]) -> list[PriceProvider]:
+    providers = []
+    for name in names:
+        if name.strip() not in _PROVIDERS:
+            raise ValueError(f"Unknown price provider: {name}")
+        providers.append(_PROVIDERS[name.strip()]())
+    return providers
+
+
+_service: PriceService | None = None
+
+
+def get_price_service() -> PriceService:
+    global _service
+    if _service is None:
+        _service = PriceService(open_providers(PRICE_PROVIDERS))
+    return _service
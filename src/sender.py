@@ -0,0 +1,340 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import time
+import warnings
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from config import (
+    SEND_CHAT_BURST,
+    SEND_CHAT_RATE,
+    SEND_GLOBAL_RATE,
+    SEND_MAX_IN_FLIGHT,
+    SEND_MAX_RETRIES,
+)
+from metrics import SEND_FAILURES, Gauge
+from telegram import Bot, InputFile, Message
+from telegram.constants import MessageLimit
+from telegram.error import NetworkError, RetryAfter, TelegramError, TimedOut
+from telegram.warnings import PTBDeprecationWarning
+
+PRIORITY_ALERT = 0
+PRIORITY_REPLY = 1
+PRIORITY_BROADCAST = 2
+
+MESSAGE_SENT = "Message sent successfully"
+SHUTTING_DOWN = "Failed to send message: bot is shutting down"
+
+
+# Seconds a RetryAfter asks to wait, whichever type this PTB version reports it as
+def retry_seconds(error: RetryAfter) -> float:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", PTBDeprecationWarning)
+        retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Seconds until a token is available (0 if one is available now)
+    def delay(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    # Used after a RetryAfter: no tokens until the given time
+    def block_until(self, until: float) -> None:
+        self.tokens = min(self.tokens, 0.0) - (until - time.monotonic()) * self.rate
+
+
+@dataclass
+class _Message:
+    text: str
+    priority: int
+    future: asyncio.Future[str]
+
+
+@dataclass
+class _Chat:
+    bucket: TokenBucket
+    pending: deque[_Message] = field(default_factory=deque)
+    scheduled: bool = False  # in the delayed or ready heap, or being sent
+
+
+# Outbound Telegram scheduler: a global and a per-chat token bucket keep within the Bot API
+# limits, alerts go ahead of command replies, RetryAfter is honoured automatically and
+# messages queued for the same chat are merged into one send.
+class SendQueue:
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = SEND_GLOBAL_RATE,
+        chat_rate: float = SEND_CHAT_RATE,
+        chat_burst: float = SEND_CHAT_BURST,
+        max_in_flight: int = SEND_MAX_IN_FLIGHT,
+        max_retries: int = SEND_MAX_RETRIES,
+    ) -> None:
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        # No global burst: a full second's worth at once would overshoot the rolling limit
+        self._global = TokenBucket(global_rate, 1)
+        self._chats: dict[int, _Chat] = {}
+        self._delayed: list[tuple[float, int, int]] = []  # (ready_at, seq, chat_id)
+        self._ready: list[tuple[int, int, int]] = []  # (priority, seq, chat_id)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._sending: set[asyncio.Task[None]] = set()
+        self._task: asyncio.Task[None] | None = None
+        self._pruned_at = 0.0
+        self.sent = 0
+        self.merged = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def depth(self) -> int:
+        return sum(len(chat.pending) for chat in self._chats.values())
+
+    def submit(
+        self, chat_id: int, text: str, priority: int = PRIORITY_REPLY
+    ) -> asyncio.Future[str]:
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        chat = self._chat(chat_id)
+        chat.pending.append(_Message(text, priority, future))
+        if not chat.scheduled:
+            self._schedule(chat_id, chat)
+        return future
+
+    async def send(self, chat_id: int, text: str, priority: int = PRIORITY_REPLY) -> str:
+        return await asyncio.shield(self.submit(chat_id, text, priority))
+
+    # Photos are not batched, but each one waits for a global and a per-chat token like a
+    # text send, and a RetryAfter holds the whole queue before the one retry
+    async def send_photo(self, chat_id: int, photo: str | InputFile) -> Message:
+        retried = False
+        while True:
+            await self._reserve(chat_id)
+            try:
+                return await self.bot.send_photo(chat_id=chat_id, photo=photo)
+            except RetryAfter as e:
+                self._hold(self._chat(chat_id), retry_seconds(e))
+                if retried:
+                    raise
+                retried = True
+                self.retried += 1
+
+    async def _reserve(self, chat_id: int) -> None:
+        chat = self._chat(chat_id)
+        while True:
+            now = time.monotonic()
+            delay = max(self._global.delay(now), chat.bucket.delay(now))
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        self._global.consume(now)
+        chat.bucket.consume(now)
+
+    def _chat(self, chat_id: int) -> _Chat:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat(TokenBucket(self.chat_rate, self.chat_burst))
+        return chat
+
+    # Flood control applies to the whole bot: nothing goes out until the penalty is over
+    def _hold(self, chat: _Chat, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        chat.bucket.block_until(until)
+        self._global.block_until(until)
+
+    def _schedule(self, chat_id: int, chat: _Chat) -> None:
+        chat.scheduled = True
+        delay = chat.bucket.delay(time.monotonic())
+        if delay > 0:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), chat_id))
+        else:
+            priority = min(message.priority for message in chat.pending)
+            heapq.heappush(self._ready, (priority, next(self._seq), chat_id))
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch(), name="send_queue")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        # Give queued messages a chance to go out before shutting down
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(timeout):
+                while self.depth or self._sending:
+                    await asyncio.sleep(0.05)
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        sending = list(self._sending)
+        for task in sending:
+            task.cancel()
+        await asyncio.gather(*sending, return_exceptions=True)
+        for chat in self._chats.values():
+            self._resolve(list(chat.pending), SHUTTING_DOWN)
+            chat.pending.clear()
+
+    async def _dispatch(self) -> None:
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._delayed)
+                chat = self._chats[chat_id]
+                priority = min(message.priority for message in chat.pending)
+                heapq.heappush(self._ready, (priority, next(self._seq), chat_id))
+
+            if not self._ready:
+                self._prune(now)
+                self._wakeup.clear()
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+
+            delay = self._global.delay(now)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            await self._slots.acquire()
+            _, _, chat_id = heapq.heappop(self._ready)
+            chat = self._chats[chat_id]
+            now = time.monotonic()
+            self._global.consume(now)
+            chat.bucket.consume(now)
+            task = asyncio.create_task(self._send(chat_id, chat))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, chat_id: int, chat: _Chat) -> None:
+        batch: list[_Message] = []
+        try:
+            batch = self._take_batch(chat)
+            text = "\n\n".join(message.text for message in batch)
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    await self.bot.send_message(chat_id=chat_id, text=text)
+                    self.sent += 1
+                    self.merged += len(batch) - 1
+                    self._resolve(batch, MESSAGE_SENT)
+                    break
+                except RetryAfter as e:
+                    # Put the batch back in front and hold all sends until Telegram allows them
+                    self.retried += 1
+                    seconds = retry_seconds(e)
+                    logging.warning(f"Rate limited sending to {chat_id}, retrying in {seconds}s")
+                    chat.pending.extendleft(reversed(batch))
+                    self._hold(chat, seconds)
+                    break
+                except TimedOut as e:
+                    # Telegram may have delivered it anyway; a retry could send it twice
+                    self._fail(chat_id, batch, e)
+                    break
+                except NetworkError as e:
+                    if attempt == self.max_retries:
+                        self._fail(chat_id, batch, e)
+                    else:
+                        self.retried += 1
+                        await asyncio.sleep(attempt)
+                except TelegramError as e:
+                    self._fail(chat_id, batch, e)
+                    break
+        except asyncio.CancelledError:
+            # Only on shutdown; senders waiting on these messages must not hang
+            self._resolve(batch, SHUTTING_DOWN)
+            raise
+        except Exception as e:
+            logging.exception(f"Unexpected error in send queue for {chat_id}: {e}")
+            self._fail(chat_id, batch, e)
+        finally:
+            self._slots.release()
+            chat.scheduled = False
+            if chat.pending:
+                self._schedule(chat_id, chat)
+
+    # Forget idle chats whose bucket has refilled; they would start from a full bucket anyway
+    def _prune(self, now: float) -> None:
+        if now - self._pruned_at < 1.0:
+            return
+        self._pruned_at = now
+        for chat_id, chat in list(self._chats.items()):
+            if (
+                not chat.scheduled
+                and chat.bucket.delay(now) == 0
+                and chat.bucket.tokens >= chat.bucket.burst
+            ):
+                del self._chats[chat_id]
+
+    def _take_batch(self, chat: _Chat) -> list[_Message]:
+        batch = [chat.pending.popleft()]
+        length = len(batch[0].text)
+        while chat.pending:
+            extra = len(chat.pending[0].text) + 2
+            if length + extra > MessageLimit.MAX_TEXT_LENGTH:
+                break
+            batch.append(chat.pending.popleft())
+            length += extra
+        return batch
+
+    def _resolve(self, batch: list[_Message], result: str) -> None:
+        for message in batch:
+            if not message.future.done():
+                message.future.set_result(result)
+
+    def _fail(self, chat_id: int, batch: list[_Message], error: Exception) -> None:
+        self.failed += 1
+        SEND_FAILURES.inc()
+        logging.warning(f"Failed to send message to {chat_id}: {error}")
+        self._resolve(batch, f"Failed to send message: {error}")
+
+
+_queue: SendQueue | None = None
+
+Gauge(
+    "telegram_send_queue_depth",
+    "Messages waiting in the outbound send queue.",
+    lambda: _queue.depth if _queue is not None else 0,
+)
+
+
+def get_send_queue() -> SendQueue | None:
+    return _queue
+
+
+def start_send_queue(bot: Bot) -> SendQueue:
+    global _queue
+    if _queue is None:
+        _queue = SendQueue(bot)
+        _queue.start()
+    return _queue
+
+
+async def stop_send_queue() -> None:
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue = None
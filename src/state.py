@@ -1,4 +1,165 @@
-from models import Alert
+import asyncio
+import itertools
+from dataclasses import replace
 
-# Dictionary to store user alerts
-price_alerts: dict[int, list[Alert]] = {}  # int = user_id
+from alert_index import AlertIndex
+from dynamic_alerts import DynamicAlerts
+from metrics import Gauge
+from models import Alert, AlertKind, alert_params
+from poll_scheduler import PollScheduler
+from store import AlertStore, MemoryAlertStore, StoredAlert
+
+# Dictionary to store user alerts, indexed by alert ID in creation order
+price_alerts: dict[int, dict[int, Alert]] = {}  # user_id -> {alert_id: alert}
+
+# Reverse index from alert ID to its owner, for O(1) lookup and removal
+alerts_by_id: dict[int, tuple[int, Alert]] = {}  # alert_id -> (user_id, alert)
+
+# Chat where each alert was set and its notification is delivered
+alert_chats: dict[int, int] = {}  # alert_id -> chat_id
+
+# Sorted thresholds per symbol, kept in sync with price_alerts
+alert_index = AlertIndex()
+
+# Trailing-stop and moving-average alerts, whose triggers move with the price
+dynamic_alerts = DynamicAlerts()
+
+# When each symbol with alerts is next polled over REST
+poll_scheduler = PollScheduler(alert_index, others=[dynamic_alerts])
+
+# Where alerts are persisted across restarts (replaced in post_init)
+alert_store: AlertStore = MemoryAlertStore()
+
+# Cleared while persisted alerts are restored in the background at startup; alert commands
+# wait for it so they neither see a partial list nor get wiped by the restore
+alerts_ready = asyncio.Event()
+alerts_ready.set()
+# Set with alerts_ready when the restore failed; the bot is then stopping and alert commands
+# are dropped rather than run against an empty, unpersisted state
+_restore_failed = False
+
+
+def fail_restore() -> None:
+    global _restore_failed
+    _restore_failed = True
+    alerts_ready.set()
+
+
+def restore_failed() -> bool:
+    return _restore_failed
+
+
+Gauge("alerts_active", "Alerts currently registered.", lambda: len(alerts_by_id))
+
+# Source of alert IDs; never reused, so an ID always refers to the same alert
+_alert_ids = itertools.count(1)
+
+
+def register_alert(user_id: int, chat_id: int, alert: Alert) -> Alert:
+    alert = replace(alert, alert_id=next(_alert_ids))
+    price_alerts.setdefault(user_id, {})[alert.alert_id] = alert
+    alerts_by_id[alert.alert_id] = (user_id, alert)
+    alert_chats[alert.alert_id] = chat_id
+    alert_store.add(user_id, chat_id, alert)
+    poll_scheduler.wake(alert.crypto)
+    if alert.dynamic:
+        dynamic_alerts.add(user_id, alert)
+        return alert
+    alert_index.add(user_id, alert)
+    return alert
+
+
+def unregister_alert(user_id: int, alert_id: int) -> Alert | None:
+    owner = alerts_by_id.get(alert_id)
+    if owner is None or owner[0] != user_id:
+        return None
+    del alerts_by_id[alert_id]
+    del alert_chats[alert_id]
+    alert = owner[1]
+    user_alerts = price_alerts[user_id]
+    del user_alerts[alert_id]
+    alert_store.remove(user_id, alert)
+    if alert.dynamic:
+        dynamic_alerts.remove(alert)
+    else:
+        alert_index.remove(alert)
+    if not user_alerts:
+        del price_alerts[user_id]
+    return alert
+
+
+def unregister_user(user_id: int) -> list[Alert]:
+    user_alerts = list(price_alerts.pop(user_id, {}).values())
+    for alert in user_alerts:
+        del alerts_by_id[alert.alert_id]
+        del alert_chats[alert.alert_id]
+        if alert.dynamic:
+            dynamic_alerts.remove(alert)
+        else:
+            alert_index.remove(alert)
+    alert_store.clear_user(user_id)
+    return user_alerts
+
+
+# Function to find one of a user's alerts by the fields /addalert was given (the /removealert
+# long form): the target price of price alerts, the percent or window of the other kinds
+def find_alert(
+    user_id: int, crypto: str, direction: str, kind: AlertKind, amount: float
+) -> Alert | None:
+    for alert in price_alerts.get(user_id, {}).values():
+        alert_kind, alert_amount, _ = alert_params(alert)
+        if alert_kind is AlertKind.PRICE:
+            alert_amount = alert.target_price
+        if (alert.crypto, alert.direction, alert_kind, alert_amount) == (
+            crypto,
+            direction,
+            kind,
+            amount,
+        ):
+            return alert
+    return None
+
+
+# Rebuild the in-memory state from persisted alerts without writing them back
+def restore_alerts(store: AlertStore, stored: list[StoredAlert]) -> None:
+    global alert_store, _alert_ids
+    reset()
+    alert_store = store
+    for user_id, chat_id, alert in stored:
+        price_alerts.setdefault(user_id, {})[alert.alert_id] = alert
+        alerts_by_id[alert.alert_id] = (user_id, alert)
+        alert_chats[alert.alert_id] = chat_id
+    alert_index.add_many((user_id, alert) for user_id, _, alert in stored if not alert.dynamic)
+    dynamic_alerts.add_many((user_id, alert) for user_id, _, alert in stored if alert.dynamic)
+    _alert_ids = itertools.count(max(store.last_id, max(alerts_by_id, default=0)) + 1)
+
+
+# Persist the running high/low of trailing stops that moved, so a restart resumes from it
+def save_trailing_stops() -> int:
+    unsaved = dynamic_alerts.unsaved()
+    for user_id, alert in unsaved:
+        if alert.alert_id in alerts_by_id:
+            alert_store.add(user_id, alert_chats[alert.alert_id], alert)
+    return len(unsaved)
+
+
+# All symbols whose price matters to some alert
+def watched_symbols() -> set[str]:
+    return alert_index.symbols() | dynamic_alerts.symbols()
+
+
+def close_store() -> None:
+    global alert_store
+    alert_store.close()
+    alert_store = MemoryAlertStore()
+
+
+def reset() -> None:
+    global _restore_failed
+    _restore_failed = False
+    price_alerts.clear()
+    alerts_by_id.clear()
+    alert_chats.clear()
+    alert_index.clear()
+    dynamic_alerts.clear()
+    poll_scheduler.clear()
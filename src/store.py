@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+from models import Alert, AlertKind, Direction, alert_params, build_alert
+
+# (user_id, chat_id, alert) as persisted by a store
+StoredAlert = tuple[int, int, Alert]
+
+# Pending write operation: (op, user_id, chat_id, alert)
+Operation = tuple[str, int, int | None, Alert | None]
+
+
+# Persistence for alerts. Writes are queued and applied in batches by a background thread,
+# so add/remove/clear never block the event loop on disk I/O.
+class AlertStore(ABC):
+    batch_size = 500
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue[Operation | None] = queue.Queue()
+        self._writer: threading.Thread | None = None
+        # Highest alert ID ever stored, removed alerts included; known once load() has run
+        self.last_id = 0
+
+    @abstractmethod
+    def load(self) -> list[StoredAlert]:
+        ...
+
+    @abstractmethod
+    def _open_writer(self) -> None:
+        ...
+
+    @abstractmethod
+    def _write_batch(self, batch: list[Operation]) -> None:
+        ...
+
+    @abstractmethod
+    def _close_writer(self) -> None:
+        ...
+
+    def add(self, user_id: int, chat_id: int, alert: Alert) -> None:
+        self._submit(("add", user_id, chat_id, alert))
+
+    def remove(self, user_id: int, alert: Alert) -> None:
+        self._submit(("remove", user_id, None, alert))
+
+    def clear_user(self, user_id: int) -> None:
+        self._submit(("clear", user_id, None, None))
+
+    def _submit(self, operation: Operation) -> None:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self._writer.start()
+        self._queue.put(operation)
+
+    def _run(self) -> None:
+        self._open_writer()
+        stopping = False
+        while not stopping:
+            batch: list[Operation] = []
+            item = self._queue.get()
+            # Drain whatever else is pending so it lands in the same transaction
+            while True:
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                logging.exception(f"Failed to persist {len(batch)} alert operations: {e}")
+            finally:
+                for _ in range(len(batch) + stopping):
+                    self._queue.task_done()
+        self._close_writer()
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+# Store that keeps nothing, for tests and throwaway runs
+class MemoryAlertStore(AlertStore):
+    def load(self) -> list[StoredAlert]:
+        return []
+
+    def _submit(self, operation: Operation) -> None:
+        pass
+
+    def _open_writer(self) -> None:
+        pass
+
+    def _write_batch(self, batch: list[Operation]) -> None:
+        pass
+
+    def _close_writer(self) -> None:
+        pass
+
+
+class SQLiteAlertStore(AlertStore):
+    _kind_columns = {
+        "kind": f"TEXT NOT NULL DEFAULT '{AlertKind.PRICE}'",
+        "amount": "REAL NOT NULL DEFAULT 0",
+        "reference": "REAL NOT NULL DEFAULT 0",
+    }
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS alerts ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, "
+                "chat_id INTEGER NOT NULL, crypto TEXT NOT NULL, direction TEXT NOT NULL, "
+                "target_price REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS alerts_user ON alerts (user_id)")
+            # Columns added with alert kinds; older databases hold only price alerts
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(alerts)")}
+            for column, definition in self._kind_columns.items():
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE alerts ADD COLUMN {column} {definition}")
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def load(self) -> list[StoredAlert]:
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT id, user_id, chat_id, crypto, direction, target_price, kind, amount, "
+                "reference FROM alerts ORDER BY id"
+            ).fetchall()
+            # AUTOINCREMENT keeps the highest ID ever inserted, explicit ones included; the
+            # sequence table only exists once something has been inserted
+            sequence = None
+            if connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'"
+            ).fetchone():
+                sequence = connection.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name = 'alerts'"
+                ).fetchone()
+        finally:
+            connection.close()
+        self.last_id = max(sequence[0] if sequence else 0, rows[-1][0] if rows else 0)
+        return [
+            (
+                user_id,
+                chat_id,
+                build_alert(
+                    crypto, Direction(direction), target, alert_id, kind, amount, reference
+                ),
+            )
+            for alert_id, user_id, chat_id, crypto, direction, target, kind, amount, reference in rows
+        ]
+
+    def _open_writer(self) -> None:
+        self._connection = self._connect()
+
+    def _write_batch(self, batch: list[Operation]) -> None:
+        assert self._connection is not None
+        with self._connection:
+            for op, user_id, chat_id, alert in batch:
+                if op == "add" and alert is not None:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO alerts (id, user_id, chat_id, crypto, direction, "
+                        "target_price, kind, amount, reference) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            alert.alert_id,
+                            user_id,
+                            chat_id,
+                            alert.crypto,
+                            alert.direction,
+                            alert.target_price,
+                            *alert_params(alert),
+                        ),
+                    )
+                elif op == "remove" and alert is not None:
+                    self._connection.execute("DELETE FROM alerts WHERE id = ?", (alert.alert_id,))
+                elif op == "clear":
+                    self._connection.execute("DELETE FROM alerts WHERE user_id = ?", (user_id,))
+
+    def _close_writer(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# Append-only JSON lines log, replayed and compacted on load. Compaction starts the log with
+# an "ids" record so the highest alert ID survives the removal of that alert.
+class LogAlertStore(AlertStore):
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self._file: Any = None
+
+    def load(self) -> list[StoredAlert]:
+        alerts: dict[int, StoredAlert] = {}  # alert_id -> stored alert, in insertion order
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as log:
+                for line_number, line in enumerate(log, 1):
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-write; everything before it is intact
+                        logging.warning(f"Skipping corrupt alert log line {line_number}")
+                        continue
+                    self._replay(alerts, record)
+
+        stored = list(alerts.values())
+        self._compact(stored)
+        return stored
+
+    def _replay(self, alerts: dict[int, StoredAlert], record: dict[str, Any]) -> None:
+        if "id" in record:
+            self.last_id = max(self.last_id, record["id"])
+        if record["op"] == "ids":
+            return
+        user_id = record["user_id"]
+        if record["op"] == "clear":
+            for alert_id in [key for key, stored in alerts.items() if stored[0] == user_id]:
+                del alerts[alert_id]
+            return
+        alert_id = record["id"]
+        if record["op"] == "add":
+            alert = build_alert(
+                record["crypto"],
+                Direction(record["direction"]),
+                record["target_price"],
+                alert_id,
+                record.get("kind", AlertKind.PRICE),
+                record.get("amount", 0.0),
+                record.get("reference", 0.0),
+            )
+            alerts[alert_id] = (user_id, record["chat_id"], alert)
+        elif record["op"] == "remove":
+            alerts.pop(alert_id, None)
+
+    def _compact(self, stored: list[StoredAlert]) -> None:
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as log:
+            log.write(json.dumps({"op": "ids", "id": self.last_id}, separators=(",", ":")) + "\n")
+            for user_id, chat_id, alert in stored:
+                log.write(self._encode(("add", user_id, chat_id, alert)))
+            log.flush()
+            os.fsync(log.fileno())
+        os.replace(temporary, self.path)
+
+    def _encode(self, operation: Operation) -> str:
+        op, user_id, chat_id, alert = operation
+        record: dict[str, Any] = {"op": op, "user_id": user_id}
+        if chat_id is not None:
+            record["chat_id"] = chat_id
+        if alert is not None:
+            record["id"] = alert.alert_id
+            if op == "add":
+                record.update(
+                    crypto=alert.crypto, direction=alert.direction, target_price=alert.target_price
+                )
+                kind, amount, reference = alert_params(alert)
+                if kind is not AlertKind.PRICE:
+                    record.update(kind=kind, amount=amount, reference=reference)
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+    def _open_writer(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _write_batch(self, batch: list[Operation]) -> None:
+        self._file.write("".join(self._encode(operation) for operation in batch))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _close_writer(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_store(backend: str, path: str) -> AlertStore:
+    if backend == "memory":
+        return MemoryAlertStore()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if backend == "sqlite":
+        return SQLiteAlertStore(path)
+    if backend == "log":
+        return LogAlertStore(path)
+    raise ValueError(f"Unknown alert store backend: {backend}")
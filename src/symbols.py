@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+from config import SYMBOLS_SNAPSHOT_PATH
+from market import get_client
+
+
+# Tradable Binance pairs indexed by base and quote asset, loaded from exchangeInfo
+class SymbolRegistry:
+    def __init__(self, snapshot_path: str | None = SYMBOLS_SNAPSHOT_PATH) -> None:
+        self.snapshot_path = snapshot_path
+        self.pairs: set[tuple[str, str]] = set()  # (base, quote)
+        self.by_base: dict[str, set[str]] = {}  # base -> quotes
+        self.by_quote: dict[str, set[str]] = {}  # quote -> bases
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.pairs)
+
+    # Unknown until the first load, so nothing is rejected before the registry is ready
+    def is_valid(self, base: str, quote: str = "EUR") -> bool:
+        return not self.loaded or (base, quote) in self.pairs
+
+    def bases(self, quote: str = "EUR") -> set[str]:
+        return self.by_quote.get(quote, set())
+
+    def replace(self, pairs: set[tuple[str, str]]) -> None:
+        by_base: dict[str, set[str]] = {}
+        by_quote: dict[str, set[str]] = {}
+        for base, quote in pairs:
+            by_base.setdefault(base, set()).add(quote)
+            by_quote.setdefault(quote, set()).add(base)
+        # Swap whole structures so readers never see a half-built index
+        self.pairs, self.by_base, self.by_quote = pairs, by_base, by_quote
+
+    def update_from_exchange_info(self, data: dict[str, Any]) -> None:
+        self.replace(
+            {
+                (symbol["baseAsset"], symbol["quoteAsset"])
+                for symbol in data["symbols"]
+                if symbol.get("status", "TRADING") == "TRADING"
+            }
+        )
+
+    async def refresh(self) -> bool:
+        try:
+            async with get_client().get("/api/v3/exchangeInfo") as response:
+                if response.status != 200:
+                    logging.error(f"Could not fetch symbols: {response.status}")
+                    return False
+                data = await response.json()
+            self.update_from_exchange_info(data)
+        except (aiohttp.ClientError, TimeoutError, KeyError, ValueError) as e:
+            logging.error(f"Error loading valid symbols: {e!r}")
+            return False
+        logging.info(f"Loaded {len(self.pairs)} trading pairs ({len(self.bases())} in EUR)")
+        if self.snapshot_path:
+            await asyncio.to_thread(self.save_snapshot)
+        return True
+
+    def load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as snapshot:
+                self.replace({(str(base), str(quote)) for base, quote in json.load(snapshot)})
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable symbol snapshot: {e}")
+            return False
+        logging.info(f"Loaded {len(self.pairs)} trading pairs from snapshot")
+        return True
+
+    def save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        Path(self.snapshot_path).parent.mkdir(parents=True, exist_ok=True)
+        temporary = f"{self.snapshot_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as snapshot:
+            json.dump(sorted(self.pairs), snapshot, separators=(",", ":"))
+        os.replace(temporary, self.snapshot_path)
+
+
+# Shared registry used to validate symbols before any network request
+symbol_registry = SymbolRegistry()
@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import inspect
+import logging
+from collections.abc import Awaitable
+from typing import Any
+
+from config import UPDATE_CONCURRENCY
+from state import alerts_ready, restore_failed
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Commands that read or change a user's alerts must apply in the order they were sent
+ORDERED_COMMANDS = frozenset({"addalert", "listalerts", "removealert", "clearalerts"})
+# Commands that need every persisted alert loaded
+RESTORED_COMMANDS = ORDERED_COMMANDS | {"listusers", "broadcast"}
+
+
+def command_of(update: object) -> str | None:
+    if not isinstance(update, Update) or update.message is None or not update.message.text:
+        return None
+    text = update.message.text
+    if not text.startswith("/"):
+        return None
+    return text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower()
+
+
+# Runs up to max_concurrent_updates handlers at once. Alert commands from the same user are
+# chained through a per-user lock (FIFO in arrival order) and held back while alerts are
+# still being restored at startup; everything else runs freely.
+class OrderedUpdateProcessor(BaseUpdateProcessor):
+    __slots__ = ("_deferred", "_locks", "_waiters")
+
+    def __init__(self, max_concurrent_updates: int = UPDATE_CONCURRENCY) -> None:
+        super().__init__(max_concurrent_updates)
+        self._deferred: set[asyncio.Task[None]] = set()
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._waiters: dict[int, int] = {}  # user_id -> updates holding or awaiting the lock
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        command = command_of(update)
+        if command in RESTORED_COMMANDS and not alerts_ready.is_set():
+            # Give the concurrency slot back and queue the update up again once the restore is
+            # done, so a burst of alert commands during startup cannot hold up /price and /start
+            task = asyncio.create_task(self._after_restore(update, coroutine))
+            self._deferred.add(task)
+            task.add_done_callback(functools.partial(self._forget, coroutine=coroutine))
+            return
+        if command in RESTORED_COMMANDS and restore_failed():
+            logging.warning(f"Dropping /{command}: alerts could not be restored")
+            if inspect.iscoroutine(coroutine):
+                coroutine.close()
+            return
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None or command not in ORDERED_COMMANDS:
+            await coroutine
+            return
+
+        lock = self._locks.setdefault(user.id, asyncio.Lock())
+        self._waiters[user.id] = self._waiters.get(user.id, 0) + 1
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            # Drop the lock once nobody is queued on it, so idle users cost nothing
+            self._waiters[user.id] -= 1
+            if not self._waiters[user.id]:
+                del self._waiters[user.id]
+                del self._locks[user.id]
+
+    async def _after_restore(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await alerts_ready.wait()
+        # Event waiters wake in arrival order, so per-user ordering survives the detour
+        await self.process_update(update, coroutine)
+
+    # A deferred update cancelled before it ran never awaits its handler coroutine
+    def _forget(self, task: asyncio.Task[None], coroutine: Awaitable[Any]) -> None:
+        self._deferred.discard(task)
+        if task.cancelled() and inspect.iscoroutine(coroutine):
+            coroutine.close()
+
+    async def initialize(self) -> None:
+        pass
+
+    # Updates still waiting for a restore that never finished are dropped; the rest finish
+    async def shutdown(self) -> None:
+        if not alerts_ready.is_set():
+            for task in self._deferred:
+                task.cancel()
+        await asyncio.gather(*self._deferred, return_exceptions=True)
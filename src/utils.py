@@ -1,20 +1,40 @@
 import asyncio
 import logging
+from collections.abc import Iterable
 
-import aiohttp
-from telegram import Bot, Update
+from metrics import SEND_FAILURES
+from price_providers import get_price_service
+from sender import MESSAGE_SENT, PRIORITY_REPLY, get_send_queue
+from telegram import Bot, InputFile, Message, Update
 from telegram.ext import ContextTypes
 
 
-async def safe_send(bot: Bot, chat_id: int, text: str) -> str:
+# Sends go through the rate-limited send queue once it is running; with wait=False the
+# message is only queued (used by alerts so evaluation never waits on Telegram)
+async def safe_send(
+    bot: Bot, chat_id: int, text: str, priority: int = PRIORITY_REPLY, wait: bool = True
+) -> str:
+    queue = get_send_queue()
+    if queue is not None and queue.bot is bot:
+        future = queue.submit(chat_id, text, priority)
+        return await asyncio.shield(future) if wait else "Message queued"
     try:
         await bot.send_message(chat_id=chat_id, text=text)
-        return "Message sent successfully"
+        return MESSAGE_SENT
     except Exception as e:
+        SEND_FAILURES.inc()
         logging.warning(f"Failed to send message to {chat_id}: {e}")
         return f"Failed to send message: {e}"
 
 
+# Photos take the send queue's tokens too, so they count against the same rate limits
+async def send_photo(bot: Bot, chat_id: int, photo: str | InputFile) -> Message:
+    queue = get_send_queue()
+    if queue is not None and queue.bot is bot:
+        return await queue.send_photo(chat_id, photo)
+    return await bot.send_photo(chat_id=chat_id, photo=photo)
+
+
 def get_chat_id(
     update: Update | None = None, context: ContextTypes.DEFAULT_TYPE | None = None
 ) -> int:
@@ -29,33 +49,21 @@ def get_chat_id(
         raise ValueError("Unable to determine chat_id")
 
 
-# Async function to get the price of a cryptocurrency from Binance API
-async def get_crypto_price(crypto_id: str, retries: int = 3, delay: int = 1) -> float | None:
-    url = f"https://api.binance.com/api/v3/ticker/price?symbol={crypto_id}EUR"
-    for attempt in range(1, retries + 1):
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        logging.warning(
-                            f"Binance API responded with {response.status} for {crypto_id} (Attempt {attempt})"
-                        )
-                        await asyncio.sleep(delay)
-                        continue
-                    data = await response.json()
-                    return float(data.get("price", 0))
-        except aiohttp.ClientError as e:
-            logging.warning(f"Network error on attempt {attempt} for {crypto_id}: {e}")
-            await asyncio.sleep(delay)
-        except (KeyError, ValueError, TypeError) as e:
-            logging.error(f"Error parsing price for {crypto_id}: {e}")
-            return None
-    logging.error(f"Failed to get price for {crypto_id} after {retries} attempts")
-    return None
+# Async function to get the price of a cryptocurrency from the configured price providers
+async def get_crypto_price(crypto_id: str, quote: str = "EUR") -> float | None:
+    return await get_price_service().price(crypto_id, quote)
+
+
+# Async function to get the prices of several cryptocurrencies, batched where the provider can
+async def get_crypto_prices(crypto_ids: Iterable[str], quote: str = "EUR") -> dict[str, float]:
+    symbols = sorted(set(crypto_ids))
+    if not symbols:
+        return {}
+    return await get_price_service().prices(symbols, quote)
 
 
 def job_name_for(update: Update) -> str:
     user = update.effective_user
     if user is None:
         return "Unknown"
-    return user.username or f"user-{user.id}"
\ No newline at end of file
+    return user.username or f"user-{user.id}"
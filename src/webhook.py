@@ -0,0 +1,114 @@
+import asyncio
+import contextlib
+import hmac
+import logging
+import signal
+from json import JSONDecodeError
+
+from aiohttp import web
+from config import (
+    WEBHOOK_LISTEN,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+from telegram import Update
+from telegram.ext import Application
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+# Receives Telegram updates over HTTP and hands them to the application's update queue.
+# Replies are immediate; handlers run later under the application's update processor.
+class WebhookServer:
+    def __init__(
+        self,
+        application: Application,
+        host: str = WEBHOOK_LISTEN,
+        port: int = WEBHOOK_PORT,
+        path: str = WEBHOOK_PATH,
+        secret: str = WEBHOOK_SECRET,
+    ) -> None:
+        self.application = application
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret
+        self._runner: web.AppRunner | None = None
+
+    async def _receive(self, request: web.Request) -> web.Response:
+        if self.secret and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self.secret
+        ):
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except (JSONDecodeError, TypeError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring malformed webhook update: {e!r}")
+            return web.Response(status=400)
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self._receive)
+        return app
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Receiving updates on http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+_stopping: asyncio.Event | None = None
+
+
+# Asks a running run_webhook() to shut down, as Application.stop_running() does for polling;
+# False if the bot is not serving a webhook
+def stop_webhook() -> bool:
+    if _stopping is None:
+        return False
+    _stopping.set()
+    return True
+
+
+# Counterpart of Application.run_polling() that serves a webhook with aiohttp instead
+async def run_webhook(application: Application, url: str = WEBHOOK_URL) -> None:
+    global _stopping
+    stopping = _stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signum, stopping.set)
+
+    server = WebhookServer(application)
+    await application.initialize()
+    try:
+        if application.post_init is not None:
+            await application.post_init(application)
+        await application.start()
+        await server.start()
+        await application.bot.set_webhook(
+            url=url,
+            secret_token=server.secret or None,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        await stopping.wait()
+    finally:
+        await server.stop()
+        if application.running:
+            await application.stop()
+        if application.post_shutdown is not None:
+            await application.post_shutdown(application)
+        await application.shutdown()
+        _stopping = None
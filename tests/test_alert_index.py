@@ -0,0 +1,56 @@
+from alert_index import AlertIndex
+from models import Alert
+
+
+def test_fired_alerts_match_linear_scan() -> None:
+    index = AlertIndex()
+    alerts = [Alert("BTC", "above", float(target)) for target in range(0, 100, 10)] + [
+        Alert("BTC", "below", float(target)) for target in range(0, 100, 10)
+    ]
+    for user_id, alert in enumerate(alerts):
+        index.add(user_id, alert)
+
+    for price in (-1.0, 0.0, 35.0, 50.0, 99.0, 120.0):
+        fired = {id(alert) for _, alert in index.fired("BTC", price)}
+        expected = {id(alert) for alert in alerts if alert.matches(price)}
+        assert fired == expected
+
+
+def test_remove_keeps_other_users_alerts() -> None:
+    index = AlertIndex()
+    first, second = Alert("ETH", "below", 1500, 1), Alert("ETH", "below", 1500, 2)
+    index.add(1, first)
+    index.add(2, second)
+
+    index.remove(first)
+    assert index.fired("ETH", 1000) == [(2, second)]
+    assert len(index) == 1
+
+    index.remove(second)
+    assert index.symbols() == set()
+
+
+def test_removed_alerts_never_fire_after_compaction() -> None:
+    index = AlertIndex()
+    alerts = [Alert("BTC", "above", float(target), target + 1) for target in range(200)]
+    for alert in alerts:
+        index.add(1, alert)
+    for alert in alerts[:150]:
+        index.remove(alert)
+
+    assert len(index) == 50
+    assert sorted(alert.alert_id for _, alert in index.fired("BTC", 1000.0)) == list(
+        range(151, 201)
+    )
+
+
+def test_add_many_matches_incremental_add() -> None:
+    entries = [(user_id, Alert("SOL", "above", float(user_id % 7))) for user_id in range(50)]
+    bulk, incremental = AlertIndex(), AlertIndex()
+    bulk.add_many(entries)
+    for user_id, alert in entries:
+        incremental.add(user_id, alert)
+
+    assert len(bulk) == len(incremental) == 50
+    assert sorted(bulk.fired("SOL", 3.0)) == sorted(incremental.fired("SOL", 3.0))
+    assert bulk.fired("BTC", 3.0) == []
@@ -1,11 +1,32 @@
 from collections.abc import AsyncGenerator
+from types import SimpleNamespace
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock
 
+import numpy as np
 import pytest
 import pytest_asyncio
-
-from src.handlers.alerts import Alert, check_alerts, price_alerts
+from handlers.alerts import add_alert, remove_alert
+from jobs import check_alerts, evaluate_price, seed_averages
+from models import (
+    Alert,
+    Direction,
+    MovingAverageAlert,
+    PercentMoveAlert,
+    TrailingStopAlert,
+)
+from price_cache import price_cache
+from sender import PRIORITY_ALERT
+from state import (
+    alert_chats,
+    alert_index,
+    alerts_by_id,
+    dynamic_alerts,
+    price_alerts,
+    register_alert,
+    reset,
+    save_trailing_stops,
+)
 
 
 @pytest_asyncio.fixture
@@ -14,110 +35,283 @@ async def context_mock() -> AsyncGenerator[MagicMock, None]:
     context.bot = AsyncMock()
     context.job_queue = MagicMock()
     context.job = MagicMock()
-    context.job.schedule_removal = MagicMock()
-    context.job.user_id = 12345
-    context.job.data = Alert(crypto="BTC", direction="above", target_price=50000)
     yield context
 
 
 @pytest_asyncio.fixture(autouse=True)
 def clear_price_alerts() -> Any:
-    price_alerts.clear()
+    reset()
+    price_cache.clear()
     yield
-    price_alerts.clear()
+    reset()
+    price_cache.clear()
 
 
 @pytest_asyncio.fixture
-def mock_get_crypto_price(mocker: Any) -> AsyncMock:
-    return mocker.patch("src.utils.get_crypto_price")
+def mock_get_crypto_prices(mocker: Any) -> AsyncMock:
+    return mocker.patch("jobs.get_crypto_prices", new_callable=AsyncMock)
 
 
 @pytest_asyncio.fixture
 def mock_safe_send(mocker: Any) -> AsyncMock:
-    return mocker.patch("src.utils.safe_send", new_callable=AsyncMock)
-
-
-@pytest_asyncio.fixture
-def mock_get_chat_id(mocker: Any) -> MagicMock:
-    return mocker.patch("src.utils.get_chat_id", return_value=111111)
+    return mocker.patch("jobs.safe_send", new_callable=AsyncMock)
 
 
 @pytest.mark.asyncio
 async def test_alert_triggers_correctly(
     context_mock: MagicMock,
-    mock_get_crypto_price: AsyncMock,
+    mock_get_crypto_prices: AsyncMock,
     mock_safe_send: AsyncMock,
-    mock_get_chat_id: MagicMock,
 ) -> None:
-    mock_get_crypto_price.return_value = 51000
+    mock_get_crypto_prices.return_value = {"BTC": 51000}
 
-    user_id = context_mock.job.user_id
-    alert = Alert(crypto="BTC", direction="above", target_price=50000)
-    alert.matches = MagicMock(return_value=True)
-    context_mock.job.data = alert
-    context_mock.job.chat_id = 111111
-    price_alerts[user_id] = [alert]
-
-    mock_get_chat_id.return_value = 111111
+    user_id = 12345
+    register_alert(user_id, 111111, Alert(crypto="BTC", direction="above", target_price=50000))
 
     await check_alerts(context_mock)
 
     mock_safe_send.assert_awaited_once_with(
-        context_mock.bot, 111111, text="Alert: BTC is now above €50000 (current price: €51000)."
+        context_mock.bot,
+        111111,
+        text="Alert: BTC is now above €50000 (current price: €51000).\n"
+        "This alert has been removed.",
+        priority=PRIORITY_ALERT,
+        wait=False,
     )
-
     assert user_id not in price_alerts
-    context_mock.job.schedule_removal.assert_called_once()
+    assert not alert_chats
+    assert len(alert_index) == 0
 
 
 @pytest.mark.asyncio
 async def test_alert_not_triggered_due_to_price(
     context_mock: MagicMock,
-    mock_get_crypto_price: AsyncMock,
+    mock_get_crypto_prices: AsyncMock,
     mock_safe_send: AsyncMock,
-    mock_get_chat_id: MagicMock,
 ) -> None:
-    mock_get_crypto_price.return_value = 49000  # Below threshold
+    mock_get_crypto_prices.return_value = {"BTC": 49000}  # Below threshold
 
-    user_id = context_mock.job.user_id
-    alert = context_mock.job.data
-    price_alerts[user_id] = [alert]
+    user_id = 12345
+    register_alert(user_id, user_id, Alert(crypto="BTC", direction="above", target_price=50000))
 
     await check_alerts(context_mock)
 
     mock_safe_send.assert_not_called()
     assert user_id in price_alerts
-    context_mock.job.schedule_removal.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_price_is_none(
+async def test_price_is_missing(
     context_mock: MagicMock,
-    mock_get_crypto_price: AsyncMock,
+    mock_get_crypto_prices: AsyncMock,
     mock_safe_send: AsyncMock,
-    mock_get_chat_id: MagicMock,
 ) -> None:
-    mock_get_crypto_price.return_value = None
+    mock_get_crypto_prices.return_value = {}
+
+    register_alert(12345, 12345, Alert(crypto="BTC", direction="above", target_price=50000))
 
     await check_alerts(context_mock)
 
     mock_safe_send.assert_not_called()
-    context_mock.job.schedule_removal.assert_not_called()
+    assert 12345 in price_alerts
+
+
+@pytest.mark.asyncio
+async def test_no_alerts_skips_fetch(
+    context_mock: MagicMock,
+    mock_get_crypto_prices: AsyncMock,
+    mock_safe_send: AsyncMock,
+) -> None:
+    await check_alerts(context_mock)
+
+    mock_get_crypto_prices.assert_not_called()
+    mock_safe_send.assert_not_called()
 
 
 @pytest.mark.asyncio
-async def test_context_job_is_none(context_mock: MagicMock, mock_safe_send: AsyncMock) -> None:
-    context_mock.job = None
+async def test_each_symbol_fetched_once_per_tick(
+    context_mock: MagicMock,
+    mock_get_crypto_prices: AsyncMock,
+    mock_safe_send: AsyncMock,
+) -> None:
+    mock_get_crypto_prices.return_value = {"BTC": 49000, "ETH": 2000}
+    for user_id in range(100):
+        register_alert(user_id, user_id, Alert("BTC", "above", 50000 + user_id))
+        register_alert(user_id, user_id, Alert("ETH", "below", 1000 + user_id))
 
     await check_alerts(context_mock)
 
+    mock_get_crypto_prices.assert_awaited_once_with({"BTC", "ETH"})
     mock_safe_send.assert_not_called()
+    assert len(price_alerts) == 100
+
+
+@pytest.mark.asyncio
+async def test_streamed_symbols_are_not_polled(
+    context_mock: MagicMock,
+    mock_get_crypto_prices: AsyncMock,
+    mock_safe_send: AsyncMock,
+    mocker: Any,
+) -> None:
+    feed = MagicMock()
+    feed.live_symbols.return_value = {"BTC"}
+    mocker.patch("jobs.get_feed", return_value=feed)
+    mock_get_crypto_prices.return_value = {"ETH": 2000}
+    register_alert(1, 1, Alert("BTC", "above", 50000))
+    register_alert(1, 1, Alert("ETH", "above", 3000))
+
+    await check_alerts(context_mock)
+
+    mock_get_crypto_prices.assert_awaited_once_with({"ETH"})
 
 
 @pytest.mark.asyncio
-async def test_context_job_data_is_none(context_mock: MagicMock, mock_safe_send: AsyncMock) -> None:
-    context_mock.job.data = None
+async def test_alerts_fired_in_one_pass_are_sent_as_one_message(
+    context_mock: MagicMock,
+    mock_get_crypto_prices: AsyncMock,
+    mock_safe_send: AsyncMock,
+) -> None:
+    mock_get_crypto_prices.return_value = {"BTC": 51000, "ETH": 1000}
+    register_alert(1, 10, Alert("BTC", "above", 50000))
+    register_alert(1, 10, Alert("ETH", "below", 1500))
+    register_alert(1, 10, Alert("ETH", "below", 500))
+    register_alert(2, 20, Alert("BTC", "above", 40000))
+    # Same user, set from a group: notified there, not in the private chat
+    register_alert(2, -30, Alert("ETH", "below", 1200))
 
     await check_alerts(context_mock)
 
+    assert mock_safe_send.await_count == 3
+    texts = {call.args[1]: call.kwargs["text"] for call in mock_safe_send.await_args_list}
+    assert texts[10].splitlines() == [
+        "Alert: BTC is now above €50000 (current price: €51000).",
+        "Alert: ETH is now below €1500 (current price: €1000).",
+        "These 2 alerts have been removed.",
+    ]
+    assert texts[20].startswith("Alert: BTC")
+    assert texts[-30].startswith("Alert: ETH")
+    assert list(price_alerts[1].values()) == [Alert("ETH", "below", 500)]
+    assert len(price_alerts) == 1
+
+
+@pytest.mark.asyncio
+async def test_remove_alert_by_id_or_fields(context_mock: MagicMock, mocker: Any) -> None:
+    send = mocker.patch("handlers.alerts.safe_send", new_callable=AsyncMock)
+    update = MagicMock()
+    update.effective_user.id = 1
+    update.effective_chat.id = 10
+    btc = register_alert(1, 10, Alert("BTC", "above", 50000))
+    eth = register_alert(1, 10, Alert("ETH", "below", 1500))
+    other = register_alert(2, 20, Alert("SOL", "above", 100))
+
+    # Another user's ID is not found rather than removed
+    context_mock.args = [str(other.alert_id)]
+    await remove_alert(update, context_mock)
+    assert send.await_args_list[-1].args[2] == "Alert not found."
+    assert other.alert_id in alerts_by_id
+
+    context_mock.args = [f"#{btc.alert_id}"]
+    await remove_alert(update, context_mock)
+    assert list(price_alerts[1]) == [eth.alert_id]
+
+    context_mock.args = ["eth", "below", "1500"]
+    await remove_alert(update, context_mock)
+    assert 1 not in price_alerts
+    assert set(alerts_by_id) == {other.alert_id}
+    assert alert_index.fired("ETH", 1000) == []
+
+
+@pytest.mark.asyncio
+async def test_remove_alert_by_fields_matches_every_kind(
+    context_mock: MagicMock, mocker: Any
+) -> None:
+    send = mocker.patch("handlers.alerts.safe_send", new_callable=AsyncMock)
+    update = MagicMock()
+    update.effective_user.id = 1
+    update.effective_chat.id = 10
+    register_alert(1, 10, PercentMoveAlert.from_price("BTC", Direction.ABOVE, 5, 100.0))
+    register_alert(1, 10, TrailingStopAlert.from_price("BTC", Direction.ABOVE, 5, 100.0))
+    register_alert(1, 10, MovingAverageAlert("BTC", Direction.ABOVE, 0.0, window=20))
+    kept = register_alert(1, 10, MovingAverageAlert("BTC", Direction.ABOVE, 0.0, window=50))
+
+    for args in (
+        ["btc", "above", "5%", "trailing"],
+        ["btc", "above", "5%"],
+        ["btc", "above", "ma20"],
+    ):
+        context_mock.args = args
+        await remove_alert(update, context_mock)
+    assert list(price_alerts[1]) == [kept.alert_id]
+
+    context_mock.args = ["btc", "above", "5%"]
+    await remove_alert(update, context_mock)
+    assert send.await_args_list[-1].args[2] == "Alert not found."
+
+
+@pytest.mark.asyncio
+async def test_trailing_stop_added_by_command_fires_after_retreat(
+    context_mock: MagicMock,
+    mock_safe_send: AsyncMock,
+    mocker: Any,
+) -> None:
+    send = mocker.patch("handlers.alerts.safe_send", new_callable=AsyncMock)
+    mocker.patch("handlers.alerts.get_crypto_price", new_callable=AsyncMock, return_value=100.0)
+    update = MagicMock()
+    update.effective_user.id = 1
+    update.effective_chat.id = 10
+
+    context_mock.args = ["btc", "below", "10%", "trailing"]
+    await add_alert(update, context_mock)
+    assert (
+        send.await_args_list[-1]
+        .args[2]
+        .endswith("set for BTC to be below 10% trailing from the high.")
+    )
+    context_mock.args = ["btc", "above", "5%"]
+    await add_alert(update, context_mock)
+    assert (
+        send.await_args_list[-1].args[2].endswith("set for BTC to be above €105 (+5% from €100).")
+    )
+    assert alert_index.fired("BTC", 105.0) != []
+
+    # Streamed ticks: the high moves to 104, so the stop is at 93.6
+    await evaluate_price(context_mock.bot, "BTC", 104.0)
+    await evaluate_price(context_mock.bot, "BTC", 94.0)
     mock_safe_send.assert_not_called()
+    await evaluate_price(context_mock.bot, "BTC", 93.0)
+
+    mock_safe_send.assert_awaited_once()
+    assert mock_safe_send.await_args.kwargs["text"].startswith(
+        "Alert: BTC fell 10% from its high (current price: €93.0)."
+    )
+    assert [alert.kind for alert in price_alerts[1].values()] == ["percent"]
+
+
+def test_trailing_stops_are_saved_with_their_own_chat(mocker: Any) -> None:
+    stop = register_alert(1, -10, TrailingStopAlert.from_price("BTC", Direction.BELOW, 10, 100.0))
+    register_alert(1, 10, Alert("ETH", "above", 5000))
+    store = mocker.patch("state.alert_store")
+
+    dynamic_alerts.update("BTC", 120.0, 0)
+    assert save_trailing_stops() == 1
+
+    [(user_id, chat_id, saved)] = [call.args for call in store.add.call_args_list]
+    assert (user_id, chat_id, saved.alert_id, saved.reference) == (1, -10, stop.alert_id, 120.0)
+
+
+@pytest.mark.asyncio
+async def test_moving_averages_are_seeded_from_past_candles(mocker: Any) -> None:
+    now = 1_000_000 * 60 + 30.0
+    mocker.patch("jobs.time.time", return_value=now)
+    minutes = np.arange(999_995, 1_000_001) * 60
+    candles = SimpleNamespace(open_time=minutes * 1000, close=np.arange(6, dtype=float) + 100)
+    store = mocker.patch("candles.get_candle_store").return_value
+    store.get = AsyncMock(return_value=candles)
+    cross = register_alert(1, 10, MovingAverageAlert("ETH", Direction.ABOVE, 0.0, window=3))
+
+    await seed_averages()
+
+    # The last three closed minutes; the open one (105) is left to the live samples
+    assert dynamic_alerts.level(cross) == 103.0
+    assert dynamic_alerts.nearest("ETH", 90.0) == 103.0
+    assert dynamic_alerts.warming() == []
@@ -0,0 +1,137 @@
+import asyncio
+import json
+from collections.abc import Collection
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import broadcast as broadcast_module
+import pytest
+from broadcast import Broadcast, start_broadcast, stop_broadcast
+from handlers import admin
+from models import Alert
+from sender import MESSAGE_SENT
+from state import register_alert, reset
+
+
+# Stand-in for safe_send that records deliveries and the most sends waiting at once
+class Deliveries:
+    def __init__(self, failing: Collection[int] = (), delay: float = 0.0) -> None:
+        self.failing = failing
+        self.delay = delay
+        self.sent: list[tuple[int, str]] = []
+        self.waiting = 0
+        self.most_waiting = 0
+
+    async def __call__(self, bot: Any, chat_id: int, text: str, **kwargs: Any) -> str:
+        self.waiting += 1
+        self.most_waiting = max(self.most_waiting, self.waiting)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.waiting -= 1
+        self.sent.append((chat_id, text))
+        return "Failed to send message: Forbidden" if chat_id in self.failing else MESSAGE_SENT
+
+
+@pytest.mark.asyncio
+async def test_fans_out_with_bounded_concurrency(tmp_path: Path, mocker: Any) -> None:
+    deliveries = Deliveries(failing={3, 7}, delay=0.001)
+    mocker.patch.object(broadcast_module, "safe_send", deliveries)
+    path = str(tmp_path / "broadcast.json")
+    job = Broadcast("Maintenance at 22:00", admin_chat=1000, pending=list(range(100)))
+
+    await job.run(MagicMock(), path, concurrency=8, interval=60)
+
+    assert (job.delivered, job.failed) == (98, 2)
+    assert deliveries.most_waiting == 8
+    assert sorted(chat_id for chat_id, _ in deliveries.sent[:-1]) == list(range(100))
+    assert deliveries.sent[-1] == (
+        1000,
+        "Broadcast finished: 100/100 chats reached: 98 delivered, 2 failed",
+    )
+    assert not Path(path).exists()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_broadcast_resumes_where_it_stopped(tmp_path: Path, mocker: Any) -> None:
+    deliveries = Deliveries(delay=0.1)
+    mocker.patch.object(broadcast_module, "safe_send", deliveries)
+    path = str(tmp_path / "broadcast.json")
+    # The first 32 sends complete, the next ones are interrupted mid-send
+    start_broadcast(MagicMock(), Broadcast("Hello", 1000, list(range(50))), path)
+    await asyncio.sleep(0.15)
+
+    stopped = await stop_broadcast()
+    assert stopped is not None and stopped.delivered == 32
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file)["pending"] == list(range(32, 50))
+
+    resumed = Broadcast.load(path)
+    assert resumed is not None
+    await resumed.run(MagicMock(), path, concurrency=4, interval=60)
+    assert resumed.progress() == "50/50 chats reached: 50 delivered, 0 failed"
+    assert sorted(chat_id for chat_id, _ in deliveries.sent if chat_id < 1000) == list(range(50))
+
+
+@pytest.mark.asyncio
+async def test_list_users_is_paged(mocker: Any) -> None:
+    mocker.patch("decorators.ADMINS", {1})
+    mocker.patch.object(admin, "LIST_USERS_PAGE_SIZE", 2)
+    send = mocker.patch.object(admin, "safe_send", new_callable=AsyncMock)
+    update, context = MagicMock(), MagicMock()
+    update.effective_user.id = 1
+    update.effective_chat.id = 10
+    context.job = None
+    reset()
+    try:
+        for user_id in (30, 10, 20):
+            register_alert(user_id, user_id, Alert("BTC", "above", 100000.0))
+
+        context.args = []
+        await admin.list_users(update, context)
+        context.args = ["2"]
+        await admin.list_users(update, context)
+        context.args = ["3"]
+        await admin.list_users(update, context)
+    finally:
+        reset()
+
+    replies = [call.args[2] for call in send.await_args_list]
+    assert replies[0] == (
+        "Users with price alerts (3, page 1 of 2):\n10\n20\nNext page: /listusers 2"
+    )
+    assert replies[1] == "Users with price alerts (3, page 2 of 2):\n30"
+    assert replies[2] == "Page must be a number from 1 to 2."
+
+
+@pytest.mark.asyncio
+async def test_broadcast_command_reaches_every_alert_chat(tmp_path: Path, mocker: Any) -> None:
+    mocker.patch("decorators.ADMINS", {1})
+    mocker.patch.object(admin, "BROADCAST_STATE_PATH", str(tmp_path / "broadcast.json"))
+    deliveries = Deliveries()
+    mocker.patch.object(broadcast_module, "safe_send", deliveries)
+    send = mocker.patch.object(admin, "safe_send", new_callable=AsyncMock)
+    update, context = MagicMock(), MagicMock()
+    update.effective_user.id = 1
+    update.effective_chat.id = 10
+    update.effective_message.text = "/broadcast Maintenance tonight\nBack by 23:00"
+    context.job = None
+    reset()
+    try:
+        register_alert(5, 50, Alert("BTC", "above", 100000.0))
+        register_alert(6, -60, Alert("BTC", "above", 100000.0))
+        register_alert(6, 60, Alert("BTC", "above", 100000.0))
+        register_alert(6, 60, Alert("BTC", "above", 100000.0))
+        await admin.broadcast(update, context)
+        assert send.await_args.args[2] == "Broadcasting to 3 chats."
+        await asyncio.wait_for(broadcast_module._task, 1)  # type: ignore[arg-type]
+    finally:
+        reset()
+
+    assert deliveries.sent[:3] == [
+        (-60, "Maintenance tonight\nBack by 23:00"),
+        (50, "Maintenance tonight\nBack by 23:00"),
+        (60, "Maintenance tonight\nBack by 23:00"),
+    ]
+    assert deliveries.sent[3][0] == 10
@@ -0,0 +1,171 @@
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import candles as candles_module
+import market
+import numpy as np
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from candles import CandleStore, parse_span
+from market import MarketDataClient
+
+HOUR = 3600
+HOUR_MS = HOUR * 1000
+NOW = 1_000 * HOUR + 120  # two minutes into a candle
+
+
+@pytest_asyncio.fixture
+def requests() -> list[dict[str, str]]:
+    return []
+
+
+@pytest_asyncio.fixture
+def status() -> dict[str, int]:
+    return {"code": 200}
+
+
+@pytest_asyncio.fixture
+async def client(
+    requests: list[dict[str, str]], status: dict[str, int]
+) -> AsyncGenerator[MarketDataClient, None]:
+    # Hourly candles whose close is the candle's hour number
+    async def klines(request: web.Request) -> web.Response:
+        requests.append(dict(request.query))
+        if status["code"] != 200:
+            return web.json_response({"code": -1003}, status=status["code"])
+        start, end = int(request.query["startTime"]), int(request.query["endTime"])
+        limit = int(request.query["limit"])
+        first = -(-start // HOUR_MS) * HOUR_MS
+        return web.json_response(
+            [
+                [t, "1", "2", "0.5", str(t // HOUR_MS), "10", t + HOUR_MS - 1]
+                for t in range(first, end + 1, HOUR_MS)
+            ][:limit]
+        )
+
+    app = web.Application()
+    app.router.add_get("/api/v3/klines", klines)
+    server = TestServer(app)
+    await server.start_server()
+    client = MarketDataClient(base_url=str(server.make_url("")), pool_size=2)
+    market._client = client
+    yield client
+    await market.close_client()
+    await server.close()
+
+
+@pytest.fixture
+def clock(mocker: Any) -> Any:
+    return mocker.patch.object(candles_module.time, "time", return_value=NOW)
+
+
+def test_parse_span() -> None:
+    assert parse_span("90m") == 90 * 60
+    assert parse_span("7D") == 7 * 86400
+    assert parse_span("2w") == 14 * 86400
+    assert parse_span("0d") is None
+    assert parse_span("7x") is None
+
+
+@pytest.mark.asyncio
+async def test_only_missing_candles_are_fetched(
+    client: MarketDataClient, requests: list[dict[str, str]], clock: Any
+) -> None:
+    store = CandleStore(":memory:")
+    result = await store.get("BTC", "1h", NOW - 24 * HOUR)
+    assert len(result) == 25
+    assert result.close[-1] == 1000.0
+    assert len(requests) == 1
+
+    # Within the same candle the store answers from memory, sharing its buffers
+    again = await store.get("BTC", "1h", NOW - 6 * HOUR)
+    assert len(requests) == 1
+    assert len(again) == 7
+    assert np.shares_memory(again.close, result.close)
+    assert not again.close.flags.writeable
+
+    # After the candle closes only the tail is fetched, starting at the last stored candle
+    clock.return_value = NOW + 2 * HOUR
+    latest = await store.get("BTC", "1h", NOW - 24 * HOUR)
+    assert requests[-1]["startTime"] == str(1000 * HOUR_MS)
+    assert list(latest.close[-3:]) == [1000.0, 1001.0, 1002.0]
+
+    # An earlier range only fetches what comes before the stored candles
+    older = await store.get("BTC", "1h", NOW - 48 * HOUR)
+    assert requests[-1]["endTime"] == str(976 * HOUR_MS - 1)
+    assert list(older.close[:2]) == [952.0, 953.0]
+    assert len(older) == 51
+    assert len(requests) == 3
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_history_survives_restart(
+    client: MarketDataClient, requests: list[dict[str, str]], clock: Any, tmp_path: Any
+) -> None:
+    path = str(tmp_path / "candles.db")
+    store = CandleStore(path)
+    await store.get("ETH", "1h", NOW - 24 * HOUR)
+    store.close()
+
+    restarted = CandleStore(path)
+    result = await restarted.get("ETH", "1h", NOW - 24 * HOUR)
+    restarted.close()
+
+    assert len(result) == 25
+    assert len(requests) == 2
+    assert requests[-1]["startTime"] == str(1000 * HOUR_MS)
+
+
+@pytest.mark.asyncio
+async def test_pages_through_long_ranges(
+    client: MarketDataClient, requests: list[dict[str, str]], clock: Any, mocker: Any
+) -> None:
+    mocker.patch.object(candles_module, "KLINES_PAGE", 10)
+    store = CandleStore(":memory:")
+    result = await store.get("BTC", "1h", NOW - 24 * HOUR)
+    store.close()
+
+    assert len(result) == 25
+    assert np.all(np.diff(result.open_time) == HOUR_MS)
+    assert len(requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_retried(
+    client: MarketDataClient, requests: list[dict[str, str]], status: dict[str, int], clock: Any
+) -> None:
+    store = CandleStore(":memory:")
+    status["code"] = 429
+    assert len(await store.get("BTC", "1h", NOW - 24 * HOUR)) == 0
+
+    status["code"] = 200
+    assert len(await store.get("BTC", "1h", NOW - 24 * HOUR)) == 25
+    assert len(requests) == 2
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_series_skips_the_gap_and_keeps_only_recent_candles(
+    client: MarketDataClient, requests: list[dict[str, str]], clock: Any, tmp_path: Any
+) -> None:
+    path = str(tmp_path / "candles.db")
+    store = CandleStore(path, retention=10)
+    assert len(await store.get("BTC", "1h", NOW - 24 * HOUR)) == 10
+
+    # Weeks later, a short range is fetched without the candles in between
+    clock.return_value = NOW + 500 * HOUR
+    result = await store.get("BTC", "1h", NOW + 498 * HOUR)
+    store.close()
+
+    assert list(result.close) == [1498, 1499, 1500]
+    assert len(requests) == 2
+    assert requests[-1]["startTime"] == str(1498 * HOUR_MS)
+
+    restarted = CandleStore(path, retention=10)
+    result = await restarted.get("BTC", "1h", NOW + 490 * HOUR)
+    restarted.close()
+    assert len(result) == 10
+    assert np.all(np.diff(result.open_time) == HOUR_MS)
@@ -0,0 +1,28 @@
+from chart_cache import ChartCache, next_candle_close
+from metrics import CHART_CACHE_EVICTIONS, CHART_CACHE_LOOKUPS
+
+
+def test_next_candle_close_is_aligned_to_interval() -> None:
+    assert next_candle_close("1d", now=86400 * 3 + 5) == 86400 * 4
+    assert next_candle_close("1h", now=3600 * 2) == 3600 * 3
+
+
+def test_charts_are_bounded_by_bytes_and_file_id_replaces_bytes() -> None:
+    cache = ChartCache(max_bytes=25)
+    hits, misses = (CHART_CACHE_LOOKUPS.labels(result).value for result in ("hit", "miss"))
+    evictions = CHART_CACHE_EVICTIONS.labels().value
+    cache.put_chart(("BTC", "1d", 30), b"x" * 10)
+    cache.put_chart(("ETH", "1d", 30), b"y" * 10)
+    cache.put_chart(("SOL", "1d", 30), b"z" * 10)
+
+    assert cache.get_chart(("BTC", "1d", 30)) is None
+    assert cache.get_chart(("SOL", "1d", 30)) == b"z" * 10
+    assert cache.stats()["chart_bytes"] == 20
+    assert cache.stats()["chart_evictions"] == 1
+    assert CHART_CACHE_LOOKUPS.labels("hit").value - hits == 1
+    assert CHART_CACHE_LOOKUPS.labels("miss").value - misses == 1
+    assert CHART_CACHE_EVICTIONS.labels().value - evictions == 1
+
+    cache.put_chart(("SOL", "1d", 30), "telegram-file-id")
+    assert cache.get_chart(("SOL", "1d", 30)) == "telegram-file-id"
+    assert cache.stats()["chart_bytes"] == 10
@@ -0,0 +1,64 @@
+import asyncio
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import charts
+import pytest
+from charts import ChartRenderer, RendererBusyError, render_price_chart
+
+
+def test_render_price_chart_returns_png() -> None:
+    png = render_price_chart("BTC", [float(price) for price in range(30)])
+
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+
+
+@pytest.mark.asyncio
+async def test_renderer_turns_away_work_beyond_capacity(monkeypatch: pytest.MonkeyPatch) -> None:
+    release = threading.Event()
+
+    def slow_render(crypto_id: str, *args: object) -> bytes:
+        release.wait(timeout=5)
+        return crypto_id.encode()
+
+    monkeypatch.setattr(charts, "render_price_chart", slow_render)
+    renderer = ChartRenderer(mode="thread", workers=1, queue_size=1)
+    try:
+        first = asyncio.create_task(renderer.render("BTC", []))
+        second = asyncio.create_task(renderer.render("ETH", []))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(RendererBusyError):
+            await renderer.render("SOL", [])
+
+        release.set()
+        assert await asyncio.gather(first, second) == [b"BTC", b"ETH"]
+        assert renderer.pending == 0
+    finally:
+        renderer.close()
+
+
+@pytest.mark.asyncio
+async def test_process_renderer_produces_png() -> None:
+    renderer = ChartRenderer(mode="process", workers=1, queue_size=0)
+    try:
+        png = await renderer.render("ETH", [1.0, 2.0, 3.0])
+    finally:
+        renderer.close()
+
+    assert png.startswith(b"\x89PNG")
+
+
+def test_bot_starts_without_loading_matplotlib() -> None:
+    code = (
+        "import sys; import bot; "
+        "print(','.join(m for m in ('matplotlib', 'numpy') if m in sys.modules))"
+    )
+    src = Path(__file__).resolve().parent.parent / "src"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=src, capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == ""
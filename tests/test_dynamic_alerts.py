@@ -0,0 +1,63 @@
+from dataclasses import replace
+
+from dynamic_alerts import DynamicAlerts
+from models import Direction, MovingAverageAlert, TrailingStopAlert
+
+
+def test_trailing_stop_follows_the_high_and_fires_on_the_retreat() -> None:
+    alerts = DynamicAlerts()
+    stop = replace(TrailingStopAlert.from_price("BTC", Direction.BELOW, 10, 100.0), alert_id=1)
+    alerts.add(7, stop)
+
+    assert alerts.update("BTC", 95.0, 0) == []
+    assert alerts.update("BTC", 120.0, 1) == []
+    assert alerts.level(stop) == 108.0
+    # 95 would have fired against the original high, not against the new one
+    assert alerts.update("BTC", 110.0, 2) == []
+    assert alerts.update("BTC", 108.0, 3) == [(7, 1, "BTC", 108.0)]
+
+
+def test_moving_average_cross_fires_once_the_average_is_known() -> None:
+    alerts = DynamicAlerts(interval=60)
+    cross = MovingAverageAlert("ETH", Direction.ABOVE, 0.0, 2, window=3)
+    alerts.add(1, cross)
+
+    # One close per minute: 100, 100, 100 completes the window of 3
+    for minute in range(3):
+        assert alerts.update("ETH", 100.0, minute * 60) == []
+    assert alerts.level(cross) is None
+    assert alerts.update("ETH", 90.0, 3 * 60) == []
+    assert alerts.level(cross) == 100.0
+    assert alerts.update("ETH", 101.0, 3 * 60 + 1) == [(1, 2, "ETH", 101.0)]
+
+
+def test_unsaved_reports_moved_extremes_once() -> None:
+    alerts = DynamicAlerts()
+    changed: list[set[str]] = []
+    alerts.on_symbols_changed = changed.append
+    stop = TrailingStopAlert("SOL", Direction.ABOVE, 110.0, 3, percent=10, reference=100.0)
+    alerts.add(5, stop)
+
+    assert alerts.unsaved() == []
+    alerts.update("SOL", 80.0, 0)
+    [(user_id, saved)] = alerts.unsaved()
+    assert (user_id, saved.alert_id, saved.reference, saved.target_price) == (5, 3, 80.0, 88.0)
+    assert alerts.unsaved() == []
+
+    alerts.remove(stop)
+    assert changed == [{"SOL"}, set()]
+    assert len(alerts) == 0
+
+
+def test_seeded_average_skips_the_interval_already_sampled_live() -> None:
+    alerts = DynamicAlerts(interval=60)
+    cross = MovingAverageAlert("ETH", Direction.ABOVE, 0.0, 2, window=3)
+    alerts.add(1, cross)
+    assert alerts.warming() == [("ETH", 3)]
+    alerts.update("ETH", 50.0, 4 * 60 + 1)
+
+    alerts.seed("ETH", 3, [0, 60, 120, 180, 240], [10.0, 20.0, 30.0, 40.0, 99.0])
+    assert alerts.level(cross) == 30.0
+    # Once seeded, live closes carry on from the seed
+    alerts.update("ETH", 60.0, 5 * 60)
+    assert alerts.level(cross) == 40.0
@@ -0,0 +1,129 @@
+from collections.abc import AsyncGenerator
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import market
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from handlers import base
+from market import MarketDataClient
+from price_cache import PriceCache
+from utils import get_crypto_price, get_crypto_prices
+
+PRICES = {"BTCEUR": "51000.5", "ETHEUR": "2500.25", "BTCUSDT": "55000.1", "ETHUSDT": "2700"}
+
+
+@pytest_asyncio.fixture
+def peers() -> list[Any]:
+    return []
+
+
+@pytest_asyncio.fixture
+async def binance_server(peers: list[Any]) -> AsyncGenerator[TestServer, None]:
+    async def ticker_price(request: web.Request) -> web.Response:
+        peers.append(request.transport.get_extra_info("peername") if request.transport else None)
+        if "symbols" in request.query:
+            symbols = request.query["symbols"].strip("[]").replace('"', "").split(",")
+            if any(symbol not in PRICES for symbol in symbols):
+                return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+            return web.json_response([{"symbol": s, "price": PRICES[s]} for s in symbols])
+        symbol = request.query["symbol"]
+        if symbol not in PRICES:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+        return web.json_response({"symbol": symbol, "price": PRICES[symbol]})
+
+    app = web.Application()
+    app.router.add_get("/api/v3/ticker/price", ticker_price)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+@pytest_asyncio.fixture
+async def client(binance_server: TestServer) -> AsyncGenerator[MarketDataClient, None]:
+    client = MarketDataClient(base_url=str(binance_server.make_url("")), pool_size=2)
+    market._client = client
+    yield client
+    await market.close_client()
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(peers: list[Any], client: MarketDataClient) -> None:
+    for _ in range(10):
+        assert await get_crypto_price("BTC") == 51000.5
+
+    assert len(peers) == 10
+    assert len(set(peers)) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_prices_use_one_request(peers: list[Any], client: MarketDataClient) -> None:
+    prices = await get_crypto_prices(["BTC", "ETH"])
+
+    assert prices == {"BTC": 51000.5, "ETH": 2500.25}
+    assert len(peers) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_prices_fall_back_on_unknown_symbol(
+    client: MarketDataClient, mocker: Any
+) -> None:
+    mocker.patch("utils.asyncio.sleep", new_callable=AsyncMock)
+    prices = await get_crypto_prices(["BTC", "NOPE"])
+
+    assert prices == {"BTC": 51000.5}
+
+
+@pytest.mark.asyncio
+async def test_close_client_releases_session(client: MarketDataClient) -> None:
+    session = client.open()
+
+    await market.close_client()
+
+    assert session.closed
+    assert market._client is None
+
+
+@pytest.mark.asyncio
+async def test_price_command_batches_symbols(
+    peers: list[Any], client: MarketDataClient, mocker: Any
+) -> None:
+    mocker.patch.object(base, "price_cache", PriceCache())
+    send = mocker.patch.object(base, "safe_send", new_callable=AsyncMock)
+    update, context = MagicMock(), MagicMock()
+    update.effective_chat.id = 1
+    context.job = None
+    context.args = ["btc", "eth", "BTC"]
+
+    await base.price(update, context)
+
+    assert len(peers) == 1
+    send.assert_awaited_once_with(context.bot, 1, "Current prices:\nBTC: €51000.5\nETH: €2500.25")
+
+
+@pytest.mark.asyncio
+async def test_price_command_in_another_quote(
+    peers: list[Any], client: MarketDataClient, mocker: Any
+) -> None:
+    mocker.patch.object(base, "price_cache", PriceCache())
+    send = mocker.patch.object(base, "safe_send", new_callable=AsyncMock)
+    update, context = MagicMock(), MagicMock()
+    update.effective_chat.id = 1
+    context.job = None
+
+    context.args = ["btc", "eth", "in", "usdt"]
+    await base.price(update, context)
+    context.args = ["btc", "in", "USDT"]
+    await base.price(update, context)
+    context.args = ["btc", "in", "GBP"]
+    await base.price(update, context)
+
+    replies = [call.args[2] for call in send.await_args_list]
+    assert replies[0] == "Current prices:\nBTC: 55000.1 USDT\nETH: 2700.0 USDT"
+    assert replies[1] == "The current price of BTC is 55000.1 USDT"
+    assert replies[2].startswith("Unsupported currency GBP.")
+    # The second lookup was answered from the cache
+    assert len(peers) == 1
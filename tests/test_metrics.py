@@ -0,0 +1,86 @@
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import metrics
+import pytest
+import state  # noqa: F401 - registers the alerts_active gauge
+from aiohttp.test_utils import TestClient, TestServer
+from decorators import command_error_handler
+from handlers.admin import broadcast
+from handlers.alerts import list_alerts
+from metrics import COMMAND_ERRORS, COMMAND_LATENCY, Histogram, MetricsServer, binance_response
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("test_duration_seconds", "Test.", ("op",), buckets=(0.1, 1.0))
+    try:
+        child = histogram.labels("read")
+        for value in (0.05, 0.5, 0.7, 3.0):
+            child.observe(value)
+
+        assert histogram.render().splitlines() == [
+            "# HELP test_duration_seconds Test.",
+            "# TYPE test_duration_seconds histogram",
+            'test_duration_seconds_bucket{op="read",le="0.1"} 1',
+            'test_duration_seconds_bucket{op="read",le="1"} 3',
+            'test_duration_seconds_bucket{op="read",le="+Inf"} 4',
+            'test_duration_seconds_sum{op="read"} 4.25',
+            'test_duration_seconds_count{op="read"} 4',
+        ]
+    finally:
+        metrics.registry.remove(histogram)
+
+
+@pytest.mark.asyncio
+async def test_command_decorator_records_latency_and_errors(mocker: Any) -> None:
+    mocker.patch("decorators.safe_send", new_callable=AsyncMock)
+
+    @command_error_handler
+    async def metrics_probe(update: Any, context: Any) -> None:
+        raise RuntimeError("boom")
+
+    await metrics_probe(MagicMock(), MagicMock())
+    await metrics_probe(MagicMock(), MagicMock())
+
+    assert sum(COMMAND_LATENCY.labels("metrics_probe").counts) == 2
+    assert COMMAND_ERRORS.labels("metrics_probe").value == 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_text_format() -> None:
+    metrics.ALERTS_FIRED.inc()
+    async with TestClient(TestServer(MetricsServer().make_app())) as client:
+        response = await client.get("/metrics")
+        body = await response.text()
+
+    assert response.status == 200
+    assert response.content_type == "text/plain"
+    assert "# TYPE alerts_fired_total counter" in body
+    assert "alerts_active " in body
+    assert "telegram_send_queue_depth 0" in body
+
+
+@pytest.mark.asyncio
+async def test_every_command_records_latency_including_admin_ones(mocker: Any) -> None:
+    mocker.patch("decorators.safe_send", new_callable=AsyncMock)
+    mocker.patch("decorators.ADMINS", set())
+    mocker.patch("handlers.alerts.safe_send", new_callable=AsyncMock)
+    update, context = MagicMock(), MagicMock()
+    update.effective_user.id = 1
+    context.job = None
+    before = {
+        name: sum(COMMAND_LATENCY.labels(name).counts) for name in ("list_alerts", "broadcast")
+    }
+
+    await list_alerts(update, context)
+    await broadcast(update, context)  # refused, but still timed
+
+    for name, count in before.items():
+        assert sum(COMMAND_LATENCY.labels(name).counts) == count + 1
+
+
+def test_common_binance_statuses_are_bound_once() -> None:
+    assert binance_response(200) is binance_response(200)
+    assert binance_response(429) is metrics.BINANCE_RESPONSES.labels(429)
+    with pytest.raises(TypeError):
+        metrics._Metric("abstract", "Not renderable.")  # type: ignore[abstract]
@@ -0,0 +1,36 @@
+import dataclasses
+
+import pytest
+from models import Alert, Direction
+
+
+def test_direction_behaves_like_the_plain_string() -> None:
+    alert = Alert("BTC", "above", 50000.0)
+
+    assert alert.direction is Direction.ABOVE
+    assert alert.direction == "above"
+    assert str(alert) == "BTC above €50000.0"
+    assert f"{alert.direction}" == "above"
+
+
+def test_matches_is_inclusive_on_both_sides() -> None:
+    above, below = Alert("BTC", "above", 100.0), Alert("BTC", "below", 100.0)
+
+    assert [above.matches(price) for price in (99.0, 100.0, 101.0)] == [False, True, True]
+    assert [below.matches(price) for price in (99.0, 100.0, 101.0)] == [True, True, False]
+
+
+def test_alerts_are_compact_and_share_symbols() -> None:
+    first = Alert("".join(["E", "TH"]), "below", 1500.0)
+    second = Alert("".join(["ET", "H"]), "below", 1500.0, alert_id=2)
+
+    assert first.crypto is second.crypto
+    assert first == second
+    assert not hasattr(first, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.target_price = 1.0  # type: ignore[misc]
+
+
+def test_unknown_direction_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        Alert("BTC", "sideways", 1.0)  # type: ignore[arg-type]
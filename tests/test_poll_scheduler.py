@@ -0,0 +1,69 @@
+import time
+
+from alert_index import AlertIndex
+from models import Alert
+from poll_scheduler import PollScheduler
+
+
+def make_scheduler(*alerts: Alert, budget: float = 100.0) -> PollScheduler:
+    index = AlertIndex()
+    for user_id, alert in enumerate(alerts):
+        index.add(user_id, Alert(alert.crypto, alert.direction, alert.target_price, user_id + 1))
+    return PollScheduler(
+        index, min_interval=5, max_interval=300, default_interval=30, budget=budget
+    )
+
+
+def observe_walk(scheduler: PollScheduler, symbol: str, prices: list[float], start: float) -> None:
+    for step, price in enumerate(prices):
+        scheduler.observe(symbol, price, now=start + step)
+
+
+def test_new_symbols_are_due_immediately_and_then_wait() -> None:
+    scheduler = make_scheduler(Alert("BTC", "above", 60000))
+    now = time.monotonic()
+
+    assert scheduler.due(now=now) == {"BTC"}
+    scheduler.observe("BTC", 50000, now=now)
+    # No volatility yet: the default interval applies
+    assert scheduler.due(now=now + 1) == set()
+    assert scheduler.due(now=now + 31) == {"BTC"}
+
+
+def test_interval_shrinks_near_threshold_and_with_volatility() -> None:
+    scheduler = make_scheduler(Alert("BTC", "above", 50500), Alert("ETH", "above", 4000))
+    start = time.monotonic()
+    scheduler.due(now=start)
+    calm = [50000 * (1 + 0.0001 * (-1) ** step) for step in range(10)]
+    observe_walk(scheduler, "BTC", calm, start)
+    observe_walk(scheduler, "ETH", [2000 * price / 50000 for price in calm], start)
+
+    near, far = scheduler.interval("BTC"), scheduler.interval("ETH")
+    assert near < far
+    assert far == 300
+
+    wild = [50000 * (1 + 0.003 * (-1) ** step) for step in range(10)]
+    observe_walk(scheduler, "BTC", wild, start + 10)
+    assert scheduler.interval("BTC") < near
+    assert scheduler.interval("BTC") == 5
+
+
+def test_budget_limits_requests_and_each_request_polls_every_due_symbol() -> None:
+    alerts = [Alert(f"C{i}", "above", 100) for i in range(300)]
+    scheduler = make_scheduler(*alerts, budget=0.2)
+    now = time.monotonic()
+
+    assert len(scheduler.due(now=now)) == 300  # one bulk request covers them all
+    assert scheduler.due(now=now + 1) == set()  # the request budget is spent
+    assert len(scheduler.due(now=now + 5)) == 300
+
+
+def test_streamed_symbols_stay_due_and_failures_retry_soon() -> None:
+    scheduler = make_scheduler(Alert("BTC", "above", 60000), Alert("ETH", "below", 1000))
+    now = time.monotonic()
+
+    assert scheduler.due(skip={"BTC"}, now=now) == {"ETH"}
+    scheduler.failed("ETH", now=now)
+    assert scheduler.due(now=now + 1) == {"BTC"}
+    scheduler.observe("BTC", 50000, now=now + 1)
+    assert scheduler.due(now=now + 6) == {"ETH"}
@@ -0,0 +1,69 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from metrics import PRICE_CACHE_LOOKUPS
+from price_cache import PriceCache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch() -> None:
+    cache = PriceCache(ttl=60, max_size=10)
+    exported = {
+        result: PRICE_CACHE_LOOKUPS.labels(result).value for result in ("hit", "miss", "coalesced")
+    }
+    release = asyncio.Event()
+
+    async def fetch(symbol: str) -> float:
+        await release.wait()
+        return 100.0
+
+    fetch_mock = AsyncMock(side_effect=fetch)
+    tasks = [asyncio.create_task(cache.get("BTC", fetch_mock)) for _ in range(20)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [100.0] * 20
+    assert fetch_mock.await_count == 1
+    assert cache.stats() == {"size": 1, "hits": 0, "misses": 1, "coalesced": 19}
+
+    assert await cache.get("BTC", fetch_mock) == 100.0
+    assert cache.hits == 1
+    assert {
+        result: PRICE_CACHE_LOOKUPS.labels(result).value - before
+        for result, before in exported.items()
+    } == {"hit": 1, "miss": 1, "coalesced": 19}
+
+
+@pytest.mark.asyncio
+async def test_get_many_fetches_only_missing_symbols() -> None:
+    cache = PriceCache(ttl=60, max_size=10)
+    cache.put("BTC", 50000.0)
+    stored_at = cache.stored_at("BTC")
+    fetch_many = AsyncMock(return_value={"ETH": 2000.0})
+
+    prices = await cache.get_many(["BTC", "ETH", "NOPE"], fetch_many)
+
+    assert prices == {"BTC": 50000.0, "ETH": 2000.0}
+    # A hit keeps the time the price was fetched
+    assert cache.stored_at("BTC") == stored_at
+    fetch_many.assert_awaited_once_with({"ETH", "NOPE"})
+    # Failed lookups are not cached
+    assert cache.get_fresh("NOPE") is None
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_evict_least_recently_used() -> None:
+    cache = PriceCache(ttl=0, max_size=2)
+    cache.put("BTC", 1.0)
+    await asyncio.sleep(0.01)
+    assert cache.get_fresh("BTC") is None
+
+    cache = PriceCache(ttl=60, max_size=2)
+    cache.put("BTC", 1.0)
+    cache.put("ETH", 2.0)
+    cache.get_fresh("BTC")
+    cache.put("SOL", 3.0)
+    assert cache.get_fresh("ETH") is None
+    assert cache.get_fresh("BTC") == 1.0
+    assert cache.get_fresh("SOL") == 3.0
@@ -0,0 +1,122 @@
+import asyncio
+import json
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import market
+import pytest
+import pytest_asyncio
+from aiohttp import WSMsgType, web
+from aiohttp.test_utils import TestServer
+from market import MarketDataClient
+from price_feed import PriceFeed
+
+
+class StreamStandIn:
+    def __init__(self) -> None:
+        self.requests: list[dict[str, Any]] = []
+        self.sockets: list[web.WebSocketResponse] = []
+        self.subscribed = asyncio.Event()
+
+    async def handler(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        async for message in ws:
+            if message.type == WSMsgType.TEXT:
+                payload = json.loads(message.data)
+                self.requests.append(payload)
+                await ws.send_json({"result": None, "id": payload["id"]})
+                self.subscribed.set()
+        return ws
+
+    async def push(self, pair: str, price: float) -> None:
+        await self.sockets[-1].send_json({"e": "24hrMiniTicker", "s": pair, "c": str(price)})
+
+
+@pytest_asyncio.fixture
+async def stream() -> AsyncGenerator[tuple[StreamStandIn, str], None]:
+    stand_in = StreamStandIn()
+    app = web.Application()
+    app.router.add_get("/ws", stand_in.handler)
+    server = TestServer(app)
+    await server.start_server()
+    market._client = MarketDataClient(base_url=str(server.make_url("")))
+    yield stand_in, str(server.make_url("/ws"))
+    await market.close_client()
+    await server.close()
+
+
+async def wait_for(condition: Any, timeout: float = 2.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_subscribes_and_delivers_ticks(stream: tuple[StreamStandIn, str]) -> None:
+    stand_in, url = stream
+    ticks: list[tuple[str, float]] = []
+
+    async def on_price(symbol: str, price: float) -> None:
+        ticks.append((symbol, price))
+
+    feed = PriceFeed(on_price, url=url, reconnect_min=0.01)
+    feed.watch({"BTC", "ETH"})
+    feed.start()
+    try:
+        await wait_for(lambda: stand_in.subscribed.is_set())
+        assert stand_in.requests[0]["method"] == "SUBSCRIBE"
+        assert stand_in.requests[0]["params"] == ["btceur@miniTicker", "etheur@miniTicker"]
+
+        await stand_in.push("BTCEUR", 51000.5)
+        await wait_for(lambda: ticks)
+        assert ticks == [("BTC", 51000.5)]
+        assert feed.live_symbols() == {"BTC"}
+
+        feed.watch({"BTC"})
+        await wait_for(lambda: len(stand_in.requests) == 2)
+        assert stand_in.requests[1]["method"] == "UNSUBSCRIBE"
+        assert stand_in.requests[1]["params"] == ["etheur@miniTicker"]
+    finally:
+        await feed.stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnects_and_resubscribes(stream: tuple[StreamStandIn, str]) -> None:
+    stand_in, url = stream
+
+    async def on_price(symbol: str, price: float) -> None:
+        pass
+
+    feed = PriceFeed(on_price, url=url, reconnect_min=0.01)
+    feed.watch({"SOL"})
+    feed.start()
+    try:
+        await wait_for(lambda: len(stand_in.requests) == 1)
+        await stand_in.sockets[0].close()
+        await wait_for(lambda: len(stand_in.requests) == 2)
+
+        assert len(stand_in.sockets) == 2
+        assert stand_in.requests[1]["method"] == "SUBSCRIBE"
+        assert stand_in.requests[1]["params"] == ["soleur@miniTicker"]
+        assert feed.connected
+    finally:
+        await feed.stop()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_stream_reports_no_live_symbols() -> None:
+    async def on_price(symbol: str, price: float) -> None:
+        pass
+
+    feed = PriceFeed(on_price, url="ws://127.0.0.1:9/ws", reconnect_min=0.01)
+    feed.watch({"BTC"})
+    feed.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert not feed.connected
+        assert feed.live_symbols() == set()
+    finally:
+        await feed.stop()
+        await market.close_client()
@@ -0,0 +1,65 @@
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from handlers.base import plot
+from jobs import fire_alerts
+from models import Alert
+from price_history import PriceHistory, price_history
+from state import register_alert, reset
+
+
+def test_keeps_the_latest_price_per_slot_up_to_capacity() -> None:
+    history = PriceHistory(resolution=10, capacity=3)
+    history.record("BTC", 100.0, now=0)
+    history.record("BTC", 101.0, now=5)  # same slot: replaces the first
+    history.record("BTC", 99.0, now=4)  # older than the last sample: dropped
+    for step in range(1, 4):
+        history.record("BTC", 100.0 + step, now=10 * step)
+
+    times, prices = history.samples("BTC")
+    assert list(times) == [10, 20, 30]
+    assert list(prices) == [101.0, 102.0, 103.0]
+    assert list(history.samples("BTC", since=15)[1]) == [102.0, 103.0]
+    assert len(history.samples("ETH")[0]) == 0
+
+
+def test_retain_drops_unwatched_symbols() -> None:
+    history = PriceHistory(resolution=1, capacity=100)
+    history.record("ETH", 100.0, now=0)
+
+    history.retain({"BTC"})
+    assert history.symbols() == set()
+
+
+@pytest.mark.asyncio
+async def test_alert_path_records_prices_for_live_plots(mocker: Any) -> None:
+    reset()
+    price_history.clear()
+    send = mocker.patch("handlers.base.safe_send", new_callable=AsyncMock)
+    renderer = MagicMock()
+    renderer.render = AsyncMock(return_value=b"png")
+    mocker.patch("handlers.base.get_renderer", return_value=renderer)
+    context = MagicMock()
+    context.bot = AsyncMock()
+    context.args = ["sol", "live"]
+    update = MagicMock()
+    update.effective_chat.id = 10
+    try:
+        register_alert(1, 10, Alert("SOL", "above", 500.0))
+        await plot(update, context)
+        assert send.await_args.args[2].startswith("No live prices recorded for SOL")
+
+        for minute, price in enumerate([150.0, 151.0, 149.0]):
+            mocker.patch("jobs.time.time", return_value=1000.0 + 60 * minute)
+            fire_alerts({"SOL": price})
+        mocker.patch("handlers.base.time.time", return_value=1120.0)
+        await plot(update, context)
+
+        crypto_id, prices, period, _, minutes = renderer.render.await_args.args
+        assert (crypto_id, list(prices), period) == ("SOL", [150.0, 151.0, 149.0], "2 Minutes")
+        assert minutes == [-2.0, -1.0, 0.0]
+        context.bot.send_photo.assert_awaited_once()
+    finally:
+        reset()
+        price_history.clear()
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections.abc import Sequence
+from typing import Any
+from unittest.mock import MagicMock
+
+import price_providers
+import pytest
+from price_providers import CircuitBreaker, PriceProvider, PriceService, ProviderError
+
+
+# Local provider answering after `latency` seconds, failing the first `errors` requests
+class StandIn(PriceProvider):
+    def __init__(self, name: str, price: float, latency: float = 0.0, errors: int = 0) -> None:
+        self.name = name
+        self.price = price
+        self.latency = latency
+        self.errors = errors
+        self.calls = 0
+
+    async def prices(self, bases: Sequence[str], quote: str) -> dict[str, float]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.errors:
+            self.errors -= 1
+            raise ProviderError("injected failure")
+        return {base: self.price for base in bases if base != "NOPE"}
+
+
+@pytest.fixture
+def backoff(mocker: Any) -> MagicMock:
+    return mocker.patch("price_providers.backoff_delay", return_value=0.0)
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_at_its_p95() -> None:
+    primary, backup = StandIn("primary", 1.0, latency=0.5), StandIn("backup", 2.0)
+    service = PriceService([primary, backup])
+    # The primary usually answers in 20 ms
+    service.health[primary].latencies.extend([0.02] * 50)
+
+    started = time.monotonic()
+    assert await service.prices(["BTC", "ETH"], "EUR") == {"BTC": 2.0, "ETH": 2.0}
+    assert time.monotonic() - started < 0.3
+    assert (primary.calls, backup.calls) == (1, 1)
+    # The cancelled slow request still counts, as long as it had been running
+    assert len(service.health[primary].latencies) == 51
+    assert service.health[primary].latencies[-1] > 0.02
+
+
+@pytest.mark.asyncio
+async def test_single_provider_is_hedged_with_a_second_request() -> None:
+    provider = StandIn("only", 1.0, latency=0.05)
+    service = PriceService([provider])
+    service.health[provider].latencies.extend([0.01] * 50)
+
+    assert await service.price("BTC", "USDT") == 1.0
+    assert provider.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_fail_over_and_open_the_circuit(backoff: MagicMock) -> None:
+    primary, backup = StandIn("primary", 1.0, errors=100), StandIn("backup", 2.0)
+    service = PriceService([primary, backup])
+    breaker = service.health[primary].breaker
+
+    for _ in range(breaker.threshold + 3):
+        assert await service.price("BTC", "EUR") == 2.0
+    # Once open, the primary is skipped until the cooldown passes
+    assert primary.calls == breaker.threshold
+    backoff.assert_not_called()
+
+    breaker.opened_at -= breaker.cooldown
+    primary.errors = 0
+    assert await service.price("BTC", "EUR") == 1.0
+    assert not breaker.open
+
+
+@pytest.mark.asyncio
+async def test_retries_back_off_with_jitter(backoff: MagicMock) -> None:
+    provider = StandIn("flaky", 1.0, errors=2)
+    service = PriceService([provider], retries=3)
+
+    assert await service.prices(["BTC", "NOPE"], "EUR") == {"BTC": 1.0}
+    assert [call.args[0] for call in backoff.call_args_list] == [1, 2]
+
+    provider.errors = 3
+    assert await service.price("BTC", "EUR") is None
+
+
+def test_backoff_is_random_up_to_a_capped_exponential(mocker: Any) -> None:
+    mocker.patch("price_providers.random.uniform", side_effect=lambda low, high: high)
+    assert [price_providers.backoff_delay(attempt) for attempt in (1, 2, 3, 10)] == [
+        0.5,
+        1.0,
+        2.0,
+        4.0,
+    ]
+
+
+def test_circuit_breaker_lets_one_trial_through_after_cooldown() -> None:
+    breaker = CircuitBreaker(failures=2, cooldown=10)
+    breaker.failure(now=0)
+    assert breaker.allow(now=0)
+    breaker.failure(now=1)
+    assert not breaker.allow(now=5)
+
+    assert breaker.allow(now=11)
+    assert not breaker.allow(now=12)  # the trial is in flight
+    breaker.failure(now=12)
+    assert not breaker.allow(now=21)
+    assert breaker.allow(now=22)
+    breaker.success()
+    assert breaker.allow(now=22) and breaker.allow(now=22)
+
+
+def test_unknown_provider_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        price_providers.open_providers(["binance", "nowhere"])
@@ -0,0 +1,150 @@
+import asyncio
+import time
+from typing import Any
+
+import pytest
+from sender import PRIORITY_ALERT, PRIORITY_REPLY, SendQueue
+from telegram.error import Forbidden, RetryAfter, TimedOut
+
+
+class FakeBot:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.messages: list[tuple[int, str, float]] = []
+        self.fail_once: dict[int, Exception] = {}
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        await asyncio.sleep(self.latency)
+        error = self.fail_once.pop(chat_id, None)
+        if error is not None:
+            raise error
+        self.messages.append((chat_id, text, time.monotonic()))
+
+    async def send_photo(self, chat_id: int, photo: Any, **kwargs: Any) -> None:
+        await self.send_message(chat_id, "<photo>")
+
+
+@pytest.mark.asyncio
+async def test_sustains_global_rate_without_drops() -> None:
+    bot = FakeBot(latency=0.005)
+    queue = SendQueue(bot, global_rate=200, chat_rate=100, chat_burst=1)  # type: ignore[arg-type]
+    queue.start()
+    try:
+        start = time.monotonic()
+        futures = [queue.submit(chat_id, f"hello {chat_id}") for chat_id in range(300)]
+        results = await asyncio.gather(*futures)
+        elapsed = time.monotonic() - start
+    finally:
+        await queue.stop()
+
+    assert results == ["Message sent successfully"] * 300
+    assert len(bot.messages) == 300
+    # Paced at 200/s with no drops
+    assert 1.3 <= elapsed < 2.5
+
+
+@pytest.mark.asyncio
+async def test_merges_burst_to_same_chat_and_honours_chat_rate() -> None:
+    bot = FakeBot()
+    queue = SendQueue(bot, global_rate=100, chat_rate=10, chat_burst=1)  # type: ignore[arg-type]
+    first = queue.submit(1, "one")
+    rest = [queue.submit(1, text) for text in ("two", "three")]
+    queue.start()
+    try:
+        await asyncio.gather(first, *rest)
+        later = queue.submit(1, "four")
+        await later
+    finally:
+        await queue.stop()
+
+    assert [text for _, text, _ in bot.messages] == ["one\n\ntwo\n\nthree", "four"]
+    assert bot.messages[1][2] - bot.messages[0][2] >= 0.09
+    assert queue.merged == 2
+
+
+@pytest.mark.asyncio
+async def test_alerts_go_before_replies() -> None:
+    bot = FakeBot()
+    queue = SendQueue(bot, global_rate=1, chat_rate=100, chat_burst=1)  # type: ignore[arg-type]
+    queue._global.tokens = 0
+    futures = [queue.submit(chat_id, "reply", PRIORITY_REPLY) for chat_id in range(3)]
+    futures.append(queue.submit(99, "alert", PRIORITY_ALERT))
+    queue._global.rate = 1000
+    queue.start()
+    try:
+        await asyncio.gather(*futures)
+    finally:
+        await queue.stop()
+
+    assert bot.messages[0][:2] == (99, "alert")
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_retried_and_other_errors_reported() -> None:
+    bot = FakeBot()
+    bot.fail_once[1] = RetryAfter(0)
+    bot.fail_once[2] = Forbidden("bot was blocked by the user")
+    queue = SendQueue(bot, global_rate=100, chat_rate=100, chat_burst=1)  # type: ignore[arg-type]
+    queue.start()
+    try:
+        retried, blocked = await asyncio.gather(queue.send(1, "hi"), queue.send(2, "hi"))
+    finally:
+        await queue.stop()
+
+    assert retried == "Message sent successfully"
+    assert blocked.startswith("Failed to send message")
+    assert [chat_id for chat_id, _, _ in bot.messages] == [1]
+    assert queue.retried == 1
+    assert queue.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_timeouts_are_not_resent_and_stop_resolves_messages_in_flight() -> None:
+    bot = FakeBot()
+    bot.fail_once[1] = TimedOut()
+    queue = SendQueue(bot, global_rate=100, chat_rate=100, chat_burst=1)  # type: ignore[arg-type]
+    queue.start()
+    assert (await queue.send(1, "hi")).startswith("Failed to send message")
+    assert bot.messages == []
+    assert queue.retried == 0
+
+    bot.latency = 10
+    waiting = asyncio.create_task(queue.send(2, "hi"))
+    await asyncio.sleep(0.05)
+    await queue.stop(timeout=0.05)
+    assert await asyncio.wait_for(waiting, 1) == "Failed to send message: bot is shutting down"
+
+
+@pytest.mark.asyncio
+async def test_unexpected_errors_resolve_the_batch() -> None:
+    bot = FakeBot()
+    bot.fail_once[1] = RuntimeError("client closed")
+    queue = SendQueue(bot, global_rate=100, chat_rate=100, chat_burst=1)  # type: ignore[arg-type]
+    queue.start()
+    try:
+        result = await asyncio.wait_for(queue.send(1, "hi"), 1)
+    finally:
+        await queue.stop()
+
+    assert result == "Failed to send message: client closed"
+    assert queue.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_holds_every_chat_and_photos_take_tokens() -> None:
+    bot = FakeBot()
+    bot.fail_once[1] = RetryAfter(1)
+    queue = SendQueue(bot, global_rate=100, chat_rate=10, chat_burst=1)  # type: ignore[arg-type]
+    queue.start()
+    try:
+        started = time.monotonic()
+        await asyncio.gather(queue.send(1, "hi"), queue.send(2, "hi"), queue.send_photo(3, "x"))
+        await queue.send_photo(3, "x")
+    finally:
+        await queue.stop()
+
+    sent_at = {(chat_id, text): at - started for chat_id, text, at in bot.messages}
+    assert sent_at[(2, "hi")] >= 0.9
+    assert sorted(chat_id for chat_id, _, _ in bot.messages) == [1, 2, 3, 3]
+    first, second = (at for chat_id, _, at in bot.messages if chat_id == 3)
+    assert second - first >= 0.09
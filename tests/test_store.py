@@ -0,0 +1,144 @@
+import sqlite3
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+import state
+from models import Alert, Direction, MovingAverageAlert, PercentMoveAlert, TrailingStopAlert
+from store import AlertStore, LogAlertStore, SQLiteAlertStore, open_store
+
+
+@pytest.fixture(params=["sqlite", "log"])
+def store_path(request: pytest.FixtureRequest, tmp_path: Path) -> tuple[str, str]:
+    return request.param, str(tmp_path / "nested" / f"alerts.{request.param}")
+
+
+def test_round_trip_add_remove_clear(store_path: tuple[str, str]) -> None:
+    backend, path = store_path
+    store = open_store(backend, path)
+    btc, eth = Alert("BTC", "above", 50000.0, 1), Alert("ETH", "below", 1500.0, 2)
+    other_btc, other_eth = Alert("BTC", "above", 50000.0, 3), Alert("ETH", "below", 1500.0, 4)
+    store.add(1, 10, btc)
+    store.add(1, 10, eth)
+    store.add(2, 20, other_btc)
+    store.add(3, 30, other_eth)
+    store.remove(1, btc)
+    store.clear_user(3)
+    store.close()
+
+    reopened = open_store(backend, path)
+    loaded = reopened.load()
+    assert loaded == [(1, 10, eth), (2, 20, other_btc)]
+    assert [alert.alert_id for _, _, alert in loaded] == [2, 3]
+    reopened.close()
+
+
+def test_removed_highest_id_is_not_reused(store_path: tuple[str, str]) -> None:
+    backend, path = store_path
+    store = open_store(backend, path)
+    newest = Alert("ETH", "below", 1500.0, 3)
+    store.add(1, 10, Alert("BTC", "above", 50000.0, 1))
+    store.add(1, 10, newest)
+    store.remove(1, newest)
+    store.close()
+
+    # Twice: the log store compacts the removal away on the first load
+    for restart in range(2):
+        reopened = open_store(backend, path)
+        try:
+            state.restore_alerts(reopened, reopened.load())
+            assert reopened.last_id == 3 + restart
+            registered = state.register_alert(1, 10, Alert("SOL", "above", 1.0))
+            assert registered.alert_id == 4 + restart
+            state.unregister_alert(1, registered.alert_id)
+        finally:
+            state.close_store()
+            state.reset()
+
+
+def test_flush_persists_without_closing(store_path: tuple[str, str]) -> None:
+    backend, path = store_path
+    store = open_store(backend, path)
+    for target in range(1000):
+        store.add(1, 1, Alert("SOL", "above", float(target), target + 1))
+    store.flush()
+
+    assert len(open_store(backend, path).load()) == 1000
+    store.close()
+
+
+def test_log_store_skips_torn_tail(tmp_path: Path) -> None:
+    path = tmp_path / "alerts.log"
+    store = LogAlertStore(str(path))
+    store.add(1, 1, Alert("BTC", "above", 1.0))
+    store.close()
+    with open(path, "a", encoding="utf-8") as log:
+        log.write('{"op":"add","user_id":2,')
+
+    assert LogAlertStore(str(path)).load() == [(1, 1, Alert("BTC", "above", 1.0))]
+
+
+def test_state_restores_and_persists(tmp_path: Path) -> None:
+    store: AlertStore = SQLiteAlertStore(str(tmp_path / "alerts.db"))
+    store.add(7, 70, Alert("BTC", "above", 50000.0, 41))
+    store.add(7, -71, Alert("BTC", "above", 90000.0, 40))
+    store.close()
+
+    try:
+        state.restore_alerts(store, store.load())
+        assert state.price_alerts[7][41] == Alert("BTC", "above", 50000.0)
+        # Each alert keeps the chat it was set in
+        assert state.alert_chats == {40: -71, 41: 70}
+        assert state.alert_index.fired("BTC", 60000.0) == [(7, Alert("BTC", "above", 50000.0))]
+        state.unregister_alert(7, 40)
+
+        # New IDs continue after the restored ones so they never collide
+        eth = state.register_alert(8, 80, Alert("ETH", "below", 1000.0))
+        assert eth.alert_id == 42
+        state.unregister_user(7)
+        state.alert_store.flush()
+        assert store.load() == [(8, 80, eth)]
+        assert store.load()[0][2].alert_id == 42
+    finally:
+        state.close_store()
+        state.reset()
+
+
+def test_alert_kinds_round_trip(store_path: tuple[str, str]) -> None:
+    backend, path = store_path
+    alerts = [
+        PercentMoveAlert.from_price("BTC", Direction.ABOVE, 5, 60000.0),
+        TrailingStopAlert.from_price("ETH", Direction.BELOW, 10, 3000.0),
+        MovingAverageAlert("SOL", Direction.ABOVE, 0.0, window=20),
+    ]
+    store = open_store(backend, path)
+    for alert_id, alert in enumerate(alerts, 1):
+        store.add(1, 1, replace(alert, alert_id=alert_id))
+    store.close()
+
+    loaded = [alert for _, _, alert in open_store(backend, path).load()]
+    assert loaded == alerts
+    assert [type(alert) for alert in loaded] == [type(alert) for alert in alerts]
+    assert loaded[1].target_price == 2700.0
+
+
+def test_sqlite_store_upgrades_price_only_databases(tmp_path: Path) -> None:
+    path = str(tmp_path / "alerts.db")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE alerts (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+        "chat_id INTEGER NOT NULL, crypto TEXT NOT NULL, direction TEXT NOT NULL, "
+        "target_price REAL NOT NULL)"
+    )
+    connection.execute("INSERT INTO alerts VALUES (1, 7, 70, 'BTC', 'above', 50000.0)")
+    connection.commit()
+    connection.close()
+
+    store = SQLiteAlertStore(path)
+    store.add(7, 70, MovingAverageAlert("ETH", Direction.BELOW, 0.0, 2, window=60))
+    store.close()
+
+    assert SQLiteAlertStore(path).load() == [
+        (7, 70, Alert("BTC", "above", 50000.0)),
+        (7, 70, MovingAverageAlert("ETH", Direction.BELOW, 0.0, window=60)),
+    ]
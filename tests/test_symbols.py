@@ -0,0 +1,74 @@
+from collections.abc import AsyncGenerator
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import market
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from handlers import base
+from market import MarketDataClient
+from symbols import SymbolRegistry
+
+EXCHANGE_INFO = {
+    "symbols": [
+        {"symbol": "BTCEUR", "baseAsset": "BTC", "quoteAsset": "EUR", "status": "TRADING"},
+        {"symbol": "BTCUSDT", "baseAsset": "BTC", "quoteAsset": "USDT", "status": "TRADING"},
+        {"symbol": "ETHEUR", "baseAsset": "ETH", "quoteAsset": "EUR", "status": "TRADING"},
+        {"symbol": "LUNAEUR", "baseAsset": "LUNA", "quoteAsset": "EUR", "status": "BREAK"},
+    ]
+}
+
+
+@pytest_asyncio.fixture
+async def binance_server() -> AsyncGenerator[TestServer, None]:
+    async def exchange_info(request: web.Request) -> web.Response:
+        return web.json_response(EXCHANGE_INFO)
+
+    app = web.Application()
+    app.router.add_get("/api/v3/exchangeInfo", exchange_info)
+    server = TestServer(app)
+    await server.start_server()
+    market._client = MarketDataClient(base_url=str(server.make_url("")))
+    yield server
+    await market.close_client()
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_indexes_trading_pairs(binance_server: TestServer, tmp_path: Path) -> None:
+    registry = SymbolRegistry(snapshot_path=str(tmp_path / "symbols.json"))
+    assert registry.is_valid("ANYTHING")
+
+    assert await registry.refresh()
+
+    assert registry.is_valid("BTC")
+    assert registry.is_valid("BTC", "USDT")
+    assert not registry.is_valid("ETH", "USDT")
+    assert not registry.is_valid("LUNA")
+    assert registry.bases("EUR") == {"BTC", "ETH"}
+    assert registry.by_base["BTC"] == {"EUR", "USDT"}
+
+    restored = SymbolRegistry(snapshot_path=str(tmp_path / "symbols.json"))
+    assert restored.load_snapshot()
+    assert restored.pairs == registry.pairs
+
+
+@pytest.mark.asyncio
+async def test_unknown_symbol_is_rejected_without_fetching(mocker: Any) -> None:
+    registry = SymbolRegistry(snapshot_path=None)
+    registry.replace({("BTC", "EUR")})
+    mocker.patch.object(base, "symbol_registry", registry)
+    fetch = mocker.patch.object(base.price_cache, "get", new_callable=AsyncMock)
+    send = mocker.patch.object(base, "safe_send", new_callable=AsyncMock)
+    update, context = MagicMock(), MagicMock()
+    update.effective_chat.id = 1
+    context.job = None
+    context.args = ["btcc"]
+
+    await base.price(update, context)
+
+    fetch.assert_not_called()
+    send.assert_awaited_once_with(context.bot, 1, "Unknown symbol BTCC.")
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from bot import build_application
+from handlers import base
+from state import alerts_ready, reset
+from store import MemoryAlertStore
+from telegram import Update
+from update_processor import OrderedUpdateProcessor
+from webhook import SECRET_HEADER, WebhookServer
+
+
+def recorded_update(update_id: int, user_id: int, text: str) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_posted_updates_reach_the_update_queue() -> None:
+    application = build_application("123456:TEST")
+    server = WebhookServer(application, path="/telegram", secret="s3cret")
+
+    async with TestClient(TestServer(server.make_app())) as client:
+        accepted = await client.post(
+            "/telegram",
+            json=recorded_update(1, 42, "/price BTC"),
+            headers={SECRET_HEADER: "s3cret"},
+        )
+        forged = await client.post("/telegram", json=recorded_update(2, 42, "/clearalerts"))
+        malformed = await client.post(
+            "/telegram", data="not json", headers={SECRET_HEADER: "s3cret"}
+        )
+
+    assert (accepted.status, forged.status, malformed.status) == (200, 403, 400)
+    update = application.update_queue.get_nowait()
+    assert isinstance(update, Update)
+    assert update.message is not None and update.message.text == "/price BTC"
+    assert application.update_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_alert_commands_keep_per_user_order_while_others_run_concurrently() -> None:
+    processor = OrderedUpdateProcessor(max_concurrent_updates=8)
+    events: list[str] = []
+
+    async def handle(name: str, delay: float) -> None:
+        events.append(f"start {name}")
+        await asyncio.sleep(delay)
+        events.append(f"end {name}")
+
+    commands = [
+        (1, "/addalert BTC above 1", 0.03),
+        (1, "/removealert 1", 0.0),
+        (2, "/addalert ETH below 1", 0.0),
+        (1, "/price BTC", 0.0),
+    ]
+    await asyncio.gather(
+        *(
+            processor.process_update(
+                Update.de_json(recorded_update(index, user_id, text), None),
+                handle(f"{user_id}{text.split()[0]}", delay),
+            )
+            for index, (user_id, text, delay) in enumerate(commands)
+        )
+    )
+
+    # User 1's removal waits for the slow add; other users and /price do not
+    assert events.index("end 1/addalert") < events.index("start 1/removealert")
+    assert events.index("end 2/addalert") < events.index("end 1/addalert")
+    assert events.index("end 1/price") < events.index("end 1/addalert")
+    assert processor._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_alert_commands_wait_for_restored_alerts() -> None:
+    # Fewer slots than waiting alert commands: they must not starve /price
+    processor = OrderedUpdateProcessor(max_concurrent_updates=2)
+    handled: list[str] = []
+
+    async def handle(text: str) -> None:
+        handled.append(text)
+
+    alerts_ready.clear()
+    try:
+        pending = [
+            asyncio.create_task(
+                processor.process_update(
+                    Update.de_json(recorded_update(index, 1, text), None), handle(text)
+                )
+            )
+            for index, text in enumerate(
+                ["/listalerts", "/listusers", "/clearalerts", "/price BTC"]
+            )
+        ]
+        await asyncio.sleep(0.01)
+        assert handled == ["/price BTC"]
+        assert processor.current_concurrent_updates == 0
+    finally:
+        alerts_ready.set()
+    await asyncio.gather(*pending)
+    await processor.shutdown()
+    assert handled == ["/price BTC", "/listalerts", "/listusers", "/clearalerts"]
+
+
+@pytest.mark.asyncio
+async def test_shutdown_drops_alert_commands_still_waiting_for_the_restore() -> None:
+    processor = OrderedUpdateProcessor(max_concurrent_updates=2)
+    handled: list[str] = []
+
+    async def handle(text: str) -> None:
+        handled.append(text)
+
+    alerts_ready.clear()
+    try:
+        await processor.process_update(
+            Update.de_json(recorded_update(1, 1, "/listalerts"), None), handle("/listalerts")
+        )
+        await processor.shutdown()
+    finally:
+        alerts_ready.set()
+    await asyncio.sleep(0)
+    assert handled == []
+
+
+@pytest.mark.asyncio
+async def test_failed_restore_stops_the_bot_and_drops_alert_commands(mocker: Any) -> None:
+    mocker.patch.object(base, "open_store", side_effect=OSError("disk full"))
+    stop = mocker.patch.object(base, "stop_application")
+    processor = OrderedUpdateProcessor(max_concurrent_updates=2)
+    handled: list[str] = []
+
+    async def handle(text: str) -> None:
+        handled.append(text)
+
+    alerts_ready.clear()
+    try:
+        await base._run_startup_step("load_alerts", base.load_alerts(), lambda: stop(None))
+        stop.assert_called_once()
+        for index, text in enumerate(["/addalert BTC above 1", "/price BTC"]):
+            await processor.process_update(
+                Update.de_json(recorded_update(index, 1, text), None), handle(text)
+            )
+        assert handled == ["/price BTC"]
+    finally:
+        reset()
+
+
+@pytest.mark.asyncio
+async def test_store_is_opened_off_the_event_loop(mocker: Any) -> None:
+    loop_thread = threading.get_ident()
+    opened_in: list[int] = []
+
+    def open_store(backend: str, path: str) -> MemoryAlertStore:
+        opened_in.append(threading.get_ident())
+        return MemoryAlertStore()
+
+    mocker.patch.object(base, "open_store", side_effect=open_store)
+    mocker.patch.object(base, "seed_averages", new_callable=AsyncMock)
+    try:
+        await base.load_alerts()
+        assert opened_in and opened_in[0] != loop_thread
+        assert alerts_ready.is_set()
+    finally:
+        reset()